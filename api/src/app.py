@@ -1,9 +1,25 @@
+from time import perf_counter
+
 from fastapi import FastAPI
 
+from src.core.auth import (
+    ASYMMETRIC_SIGNING,
+    REVOCATION_STORE,
+    TOKEN_EPOCHS,
+    get_key_ring,
+)
 from src.db.connection import build_client
+from src.helpers.container import CONTAINER, USER_REPOSITORY_BACKEND
 from src.routes.auth import router as auth_router
 from src.routes.hello_world import router as hello_world_router
+from src.routes.metrics import router as metrics_router
 from src.routes.user import router as user_router
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.invalidation.interfaces.i_invalidation_bus import IInvalidationBus
+from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.enums.backend import RepositoryBackend
+from src.services.session.interfaces.i_session_store import ISessionStore
+from src.services.throttle.interfaces.i_login_throttle import ILoginThrottle
 
 fastapi_app = FastAPI()
 
@@ -11,9 +27,54 @@ fastapi_app = FastAPI()
 fastapi_app.include_router(hello_world_router, prefix="/cdrt", tags=["Hello, world!"])
 fastapi_app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 fastapi_app.include_router(user_router, prefix="/user", tags=["User"])
+fastapi_app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
 
 
 @fastapi_app.on_event("startup")
 async def app_init():
+    started = perf_counter()
+
+    # With the in-memory users the api runs without a database, the refresh tokens
+    # revocation and the cross-node invalidations are then unavailable.
+    in_memory = USER_REPOSITORY_BACKEND == RepositoryBackend.MEMORY
+
+    # A node without signing keys fails now rather than at its first login.
+    if ASYMMETRIC_SIGNING:
+        get_key_ring().signer()
+
     # Execute db connection.
-    await build_client()
+    if not in_memory:
+        await build_client()
+
+        # Keep the revoked refresh tokens filter in sync with the db.
+        REVOCATION_STORE.start()
+
+    # Keep the users token versions in sync with the db.
+    TOKEN_EPOCHS.start()
+
+    # Drop the expired opaque token sessions.
+    CONTAINER.get(ISessionStore).start()
+
+    # Share the login lockouts with the other nodes, if enabled.
+    CONTAINER.get(ILoginThrottle).start()
+
+    # Evict the users changed by the other nodes from the local caches, if enabled.
+    if not in_memory:
+        CONTAINER.get(IInvalidationBus).start()
+
+    logger = CONTAINER.get(ILogger)
+    logger.info(
+        "core", f"Startup completed in {(perf_counter() - started) * 1000:.0f} ms"
+    )
+
+
+@fastapi_app.on_event("shutdown")
+async def app_shutdown():
+    REVOCATION_STORE.stop()
+    TOKEN_EPOCHS.stop()
+    CONTAINER.get(ISessionStore).stop()
+    CONTAINER.get(ILoginThrottle).stop()
+    CONTAINER.get(IInvalidationBus).stop()
+
+    # Release the password hasher workers.
+    CONTAINER.get(IPasswordHasher).shutdown()
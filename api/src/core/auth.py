@@ -1,18 +1,34 @@
 import sys
 from datetime import datetime, timedelta
+from hashlib import sha256
 from os import environ
 from os.path import join
-from typing import Any, Dict, Final, List, Tuple
+from secrets import token_hex
+from time import time
+from typing import Any, Dict, Final, Iterable, Mapping, Optional, Tuple, Union
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
 from passlib.context import CryptContext
+from src.core.cache import ExpiringLRUCache
+from src.core.epochs import TokenEpochs
 from src.core.exceptions import DecodeTokenError
+from src.core.keyring import KeyRing
+from src.core.principal import Principal
+from src.core.revocation import RevocationStore
+from src.core.roles import roles_mask
+from src.core.signing import TokenSigner, serialize_claims_prefix
+from src.core.users import USERS_CONFIG
 from src.helpers.container import CONTAINER
+from src.models.auth import TokenIntrospection
 from src.models.user import Role
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.invalidation.enums.kind import InvalidationKind
+from src.services.invalidation.interfaces.i_invalidation_bus import IInvalidationBus
 from src.services.logger.interfaces.i_logger import ILogger
+from src.services.session.interfaces.i_session_store import ISessionStore
 from yaml import safe_load
 
 # This is instance will be injected in routes when those have to be secured.
@@ -25,7 +41,8 @@ OAUTH2_SCHEME: Final = OAuth2PasswordBearer(
     tokenUrl="/auth/login",
 )
 
-_PWD_CONTEX: Final = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Same scheme and cost of the password hasher pool (see configs/auth/hasher.yaml).
+_PWD_CONTEX: Final = CryptContext(**CONTAINER.get(IPasswordHasher).context_settings())
 
 
 # Read configuration file for jwt configuration.
@@ -41,7 +58,52 @@ except Exception as e:
     )
     sys.exit()
 
-TOKEN_FIELDS: Final[set] = {"email", "username", "roles", "exp", "is_refresh"}
+# Compact claims of the issued tokens: sub (username), rl (roles bitmask, see src.core.roles),
+# typ (token type), exp, ver (token version of the user) and jti (refresh token id).
+COMPACT_TOKEN_FIELDS: Final[frozenset] = frozenset({"sub", "rl", "typ", "exp"})
+_ALLOWED_COMPACT_TOKEN_FIELDS: Final[frozenset] = COMPACT_TOKEN_FIELDS | {"jti", "ver"}
+ACCESS_TOKEN_TYPE: Final[str] = "a"
+REFRESH_TOKEN_TYPE: Final[str] = "r"
+
+# Legacy claims, accepted until accept_legacy_tokens is disabled once the last
+# token issued in this format is expired.
+TOKEN_FIELDS: Final[frozenset] = frozenset(
+    {"email", "username", "roles", "exp", "is_refresh"}
+)
+# Fields a valid token may carry on top of TOKEN_FIELDS, refresh tokens carry their id (jti)
+# and every token carries the token version (ver) of the user at issuing time.
+OPTIONAL_TOKEN_FIELDS: Final[frozenset] = frozenset({"jti", "ver"})
+_ALLOWED_TOKEN_FIELDS: Final[frozenset] = TOKEN_FIELDS | OPTIONAL_TOKEN_FIELDS
+ACCEPT_LEGACY_TOKENS: Final[bool] = JWT_CONFIG.get("accept_legacy_tokens", True)
+
+# Already verified tokens, keyed by the digest of the raw token, each entry expires with the token.
+TOKEN_CACHE: Final[ExpiringLRUCache[dict]] = ExpiringLRUCache(
+    max_size=JWT_CONFIG.get("token_cache_size", 1024)
+)
+
+# Revoked refresh token ids, checked through an in-memory Bloom filter.
+REVOCATION_STORE: Final[RevocationStore] = RevocationStore(
+    **JWT_CONFIG.get("revocation", {})
+)
+
+# Current token version of the users, tokens with an older version are rejected.
+TOKEN_EPOCHS: Final[TokenEpochs] = TokenEpochs(
+    **JWT_CONFIG.get("epochs", {}), **USERS_CONFIG.get("token_epochs", {})
+)
+# The users changed by another node are read again, instead of waiting for the refresh.
+CONTAINER.get(IInvalidationBus).subscribe(InvalidationKind.USER, TOKEN_EPOCHS.forget)
+
+# Signer shared by every minted token pair, built on first use.
+_SIGNER: Optional[TokenSigner] = None
+
+# Opaque tokens are random references to the sessions in the session store,
+# jwt ones carry the claims and are verified by signature.
+OPAQUE_TOKENS: Final[bool] = JWT_CONFIG.get("token_mode", "jwt") == "opaque"
+
+# Asymmetric algorithms (ES256, RS256...) sign with the private keys of the key ring
+# and publish the public ones as JWKS, symmetric ones (HS256...) use the SECRET_KEY.
+ASYMMETRIC_SIGNING: Final[bool] = not JWT_CONFIG["algorithm"].startswith("HS")
+_KEY_RING: Optional[KeyRing] = None
 
 
 def hash_password(password: str) -> str:
@@ -82,6 +144,245 @@ def create_token(
     return encoded_jwt
 
 
+def _get_signer() -> TokenSigner:
+    """Return the shared signer, building it from the secret key and the configured algorithm on first use.
+
+    Raises:
+        KeyError: if the secret key or the algorithm are missing.
+        JWTError: if the secret key cannot be used with the algorithm.
+
+    Returns:
+        TokenSigner: the shared signer.
+    """
+    if ASYMMETRIC_SIGNING:
+        return get_key_ring().signer()
+
+    global _SIGNER
+    if _SIGNER is None:
+        _SIGNER = TokenSigner(environ["SECRET_KEY"], JWT_CONFIG["algorithm"])
+    return _SIGNER
+
+
+def get_key_ring() -> KeyRing:
+    """Return the key ring of the asymmetric signing keys, reading it from disk on first use.
+
+    Raises:
+        KeyError: if the key ring configuration is missing.
+
+    Returns:
+        KeyRing: the key ring.
+    """
+    global _KEY_RING
+    if _KEY_RING is None:
+        key_ring_config: dict = JWT_CONFIG["key_ring"]
+        _KEY_RING = KeyRing(
+            directory=join(environ["CONFIGS_DIR"], key_ring_config["directory"]),
+            algorithm=JWT_CONFIG["algorithm"],
+            activation_delay=key_ring_config.get("activation_delay", 300),
+            reload_interval=key_ring_config.get("reload_interval", 60),
+        )
+    return _KEY_RING
+
+
+def public_key_set() -> dict:
+    """Return the JSON Web Key Set other services can use to verify the tokens locally.
+
+    Returns:
+        dict: the key set, without keys when signing with a symmetric secret.
+    """
+    if not ASYMMETRIC_SIGNING:
+        return {"keys": []}
+    return get_key_ring().jwks()
+
+
+def _decoding_key(encoded_token: str) -> Any:
+    """Return the key to verify the given token with, the key ring public key matching the kid header
+    for asymmetric algorithms, the secret key otherwise.
+
+    Args:
+        encoded_token (str): token to verify.
+
+    Raises:
+        JWTError: if the token header is invalid or the kid is unknown.
+
+    Returns:
+        Any: the verification key.
+    """
+    if not ASYMMETRIC_SIGNING:
+        return environ["SECRET_KEY"]
+
+    kid = jwt.get_unverified_header(encoded_token).get("kid")
+    key = get_key_ring().verifying_key(kid)
+    if key is None:
+        raise JWTError(f"Unknown signing key id {kid}")
+    return key
+
+
+def token_claims(username: str, roles: Iterable[str], version: int) -> dict:
+    """Return the compact claims shared by the access and refresh tokens of an user.
+
+    Args:
+        username (str): user username.
+        roles (Iterable[str]): user roles.
+        version (int): current token version of the user.
+
+    Returns:
+        dict: the claims, to be passed to issue_token_pair.
+    """
+    return {"sub": username, "rl": roles_mask(roles), "ver": version}
+
+
+def token_username(decoded_token: Mapping[str, Any]) -> str:
+    """Return the username of the token owner, for both compact and legacy claims.
+
+    Args:
+        decoded_token (Mapping[str, Any]): decoded token.
+
+    Returns:
+        str: the username, empty if missing.
+    """
+    if "typ" in decoded_token:
+        return decoded_token.get("sub", "")
+    return decoded_token.get("username", "")
+
+
+def create_token_pair(data: Mapping[str, Any]) -> Tuple[str, str]:
+    """Return an access and a refresh token for the given data, signed with the configured key and algorithm.
+    The shared claims are serialized once for both tokens, only expiration and token type (typ) differ,
+    the refresh token also carries a random id (jti) to be revoked with.
+    !!!IMPORTANT!!!
+    The password should not be contained in the token.
+
+    Args:
+        data (Mapping[str, Any]): data to encode in both tokens, must be json serializable, see token_claims.
+
+    Raises:
+        KeyError: if the secret key, the algorithm or the expiration times are missing.
+        JWTError: if the tokens cannot be signed.
+
+    Returns:
+        str: the access token.
+        str: the refresh token.
+    """
+    signer = _get_signer()
+    access_seconds = int(JWT_CONFIG["access_expiration"] * 60)
+    refresh_seconds = int(JWT_CONFIG["refresh_expiration"] * 60)
+
+    now = int(time())
+    claims_prefix = serialize_claims_prefix(data)
+    access_token = signer.sign_payload(
+        b'%s"exp":%d,"typ":"a"}' % (claims_prefix, now + access_seconds)
+    )
+    refresh_token = signer.sign_payload(
+        b'%s"exp":%d,"typ":"r","jti":"%s"}'
+        % (claims_prefix, now + refresh_seconds, token_hex(16).encode())
+    )
+    return access_token, refresh_token
+
+
+async def issue_token_pair(data: Mapping[str, Any]) -> Tuple[str, str]:
+    """Return an access and a refresh token for the given data according to the configured token mode.
+    In opaque mode the tokens reference two sessions holding the same claims a jwt would carry.
+
+    Args:
+        data (Mapping[str, Any]): data to bind to both tokens, must be json serializable.
+
+    Raises:
+        KeyError: if the secret key, the algorithm or the expiration times are missing.
+        JWTError: if the tokens cannot be signed.
+
+    Returns:
+        str: the access token.
+        str: the refresh token.
+    """
+    if not OPAQUE_TOKENS:
+        return create_token_pair(data)
+
+    session_store = CONTAINER.get(ISessionStore)
+    now = int(time())
+    access_expiration = now + int(JWT_CONFIG["access_expiration"] * 60)
+    refresh_expiration = now + int(JWT_CONFIG["refresh_expiration"] * 60)
+    access_token = await session_store.create(
+        {**data, "exp": access_expiration, "typ": ACCESS_TOKEN_TYPE}, access_expiration
+    )
+    refresh_token = await session_store.create(
+        {
+            **data,
+            "exp": refresh_expiration,
+            "typ": REFRESH_TOKEN_TYPE,
+            "jti": token_hex(16),
+        },
+        refresh_expiration,
+    )
+    return access_token, refresh_token
+
+
+async def resolve_token(encoded_token: str) -> dict:
+    """This function will return the claims of the given token according to the configured token mode,
+    opaque tokens are looked up in the session store, jwt ones are decoded.
+
+    Args:
+        encoded_token (str): token to resolve.
+
+    Raises:
+        DecodeTokenError: if the token is invalid, expired or its session is missing.
+
+    Returns:
+        dict: a dictionary containing the token claims.
+    """
+    if not OPAQUE_TOKENS:
+        return decode_token(encoded_token)
+
+    claims = await CONTAINER.get(ISessionStore).get(encoded_token)
+    if claims is None:
+        msg = "The provided token is invalid or expired."
+        raise DecodeTokenError(
+            loggable="Session not found for the opaque token", msg=msg
+        )
+    return claims
+
+
+def refresh_token_id(
+    encoded_token: str, decoded_token: Mapping[str, Any]
+) -> Optional[str]:
+    """This function will return the id the given refresh token is revoked with, its jti or,
+    for the legacy tokens issued without one, the digest of the raw token.
+
+    Args:
+        encoded_token (str): refresh token.
+        decoded_token (Mapping[str, Any]): refresh token claims.
+
+    Returns:
+        Optional[str]: the token id, None if the token has no id and legacy tokens are not accepted.
+    """
+    if "jti" in decoded_token:
+        return decoded_token["jti"]
+    if not ACCEPT_LEGACY_TOKENS:
+        return None
+    # The digest is as unique as the token, it can be used once like any refresh token.
+    return sha256(encoded_token.encode()).hexdigest()
+
+
+async def revoke_refresh_token(
+    encoded_token: str, decoded_token: Mapping[str, Any]
+) -> bool:
+    """This function will revoke the given refresh token, this is the atomic claim of the token
+    when rotating it, only one of many concurrent revocations succeeds.
+
+    Args:
+        encoded_token (str): refresh token.
+        decoded_token (Mapping[str, Any]): refresh token claims, carrying exp and an id (see refresh_token_id).
+
+    Returns:
+        bool: True if the token has been revoked now, False if it already was.
+    """
+    if OPAQUE_TOKENS:
+        return await CONTAINER.get(ISessionStore).delete(encoded_token)
+    return await REVOCATION_STORE.revoke(
+        refresh_token_id(encoded_token, decoded_token), decoded_token["exp"]
+    )
+
+
 def decode_token(encoded_token: str) -> dict:
     """This function will decode a given token and say wether is valid or not.
 
@@ -97,10 +398,19 @@ def decode_token(encoded_token: str) -> dict:
 
     # This function is tested when testing the /auth/refresh route.
     decoded_token: dict
+
+    # A cached token was already verified, the signature and claims checks can be skipped.
+    # The cache stores the digest only, so raw tokens are never kept in memory.
+    token_digest = sha256(encoded_token.encode()).digest() if encoded_token else None
+    if token_digest is not None:
+        cached_token = TOKEN_CACHE.get(token_digest)
+        if cached_token is not None:
+            return dict(cached_token)
+
     try:
         decoded_token = jwt.decode(
             token=encoded_token,
-            key=environ["SECRET_KEY"],
+            key=_decoding_key(encoded_token),
             algorithms=JWT_CONFIG["algorithm"],
         )
     except ExpiredSignatureError as e:
@@ -113,11 +423,17 @@ def decode_token(encoded_token: str) -> dict:
         msg = "An unknown error occured while decoding the token, make sure you are passing a valid and not expired token."
         raise DecodeTokenError(loggable=str(e), msg=msg)
 
+    # Tokens without expiration are never cached, they would stay valid forever.
+    expiration = decoded_token.get("exp")
+    if isinstance(expiration, (int, float)):
+        TOKEN_CACHE.put(token_digest, dict(decoded_token), expiration)
+
     return decoded_token
 
 
 def valid_token(decoded_token: dict) -> bool:
-    """This function will say if the keys present inside the decoded_token are the same that is expected to have a valid token.
+    """This function will say if the keys present inside the decoded_token are the same that is expected to have a valid token,
+    in the compact claims format or, while accepted, in the legacy one.
 
     Args:
         decoded_token (dict): decoded token in form of dictionary.
@@ -125,117 +441,170 @@ def valid_token(decoded_token: dict) -> bool:
     Returns:
         bool: True if the decoded token structure is valid.
     """
-    if TOKEN_FIELDS != set(decoded_token):
-        return False
-    return True
+    # Comparing the keys view avoids building a new set for every token.
+    token_fields = decoded_token.keys()
+    if "typ" in decoded_token:
+        return COMPACT_TOKEN_FIELDS <= token_fields <= _ALLOWED_COMPACT_TOKEN_FIELDS
+    return (
+        ACCEPT_LEGACY_TOKENS and TOKEN_FIELDS <= token_fields <= _ALLOWED_TOKEN_FIELDS
+    )
 
 
 def valid_refresh_token(decoded_token: dict) -> bool:
-    """This function will see if the token structure (present keys) are valid to then check if the "is_refresh" key is set to true.
+    """This function will see if the token structure (present keys) are valid to then check if the token is a refresh token,
+    "typ" set to "r" or, for legacy tokens, "is_refresh" set to true.
 
     Args:
         decoded_token (dict): decoded token in form of dictionary.
 
     Returns:
-        bool: True if "is_refresh" is True, False otherwise.
+        bool: True if the token is a refresh token, False otherwise.
     """
     if not valid_token(decoded_token):
         return False
+    if "typ" in decoded_token:
+        return decoded_token["typ"] == REFRESH_TOKEN_TYPE
     if decoded_token["is_refresh"] is False:
         return False
     return True
 
 
 def valid_access_token(decoded_token: dict) -> bool:
-    """This function will see if the token structure (present keys) are valid to then check if the "is_refresh" key is set to false.
+    """This function will see if the token structure (present keys) are valid to then check if the token is an access token,
+    "typ" set to "a" or, for legacy tokens, "is_refresh" set to false.
 
     Args:
         decoded_token (dict): decoded token in form of dictionary.
 
     Returns:
-        bool: True if "is_refresh" is False, False otherwise.
+        bool: True if the token is an access token, False otherwise.
     """
     if not valid_token(decoded_token):
         return False
+    if "typ" in decoded_token:
+        return decoded_token["typ"] == ACCESS_TOKEN_TYPE
     if decoded_token["is_refresh"] is True:
         return False
     return True
 
 
-def has_roles(user_roles: List[Role], required_roles: List[Role]) -> bool:
-    """This function will check efficiently if the user roles have at least one of the required roles.
+async def introspect_token(encoded_token: str) -> TokenIntrospection:
+    """This function will verify the given token as an access token without raising.
+
+    Args:
+        encoded_token (str): token to verify.
+
+    Returns:
+        TokenIntrospection: the claims if the token is an active access token, the reason otherwise.
+    """
+    try:
+        decoded_token = await resolve_token(encoded_token)
+    except DecodeTokenError as e:
+        return TokenIntrospection(active=False, error=e.msg)
+
+    if not valid_access_token(decoded_token):
+        return TokenIntrospection(
+            active=False, error="The provided token is not an access token."
+        )
+
+    return TokenIntrospection(active=True, claims=decoded_token)
+
+
+def has_roles(
+    user_roles: Union[int, Iterable[Role]], required_roles: Union[int, Iterable[Role]]
+) -> bool:
+    """This function will check efficiently if the user roles have at least one of the required roles,
+    with a bitwise and of the roles bitmasks.
 
     Args:
-        user_roles (List[Role]): user roles.
-        required_roles (List[Role]): required roles.
+        user_roles (Union[int, Iterable[Role]]): user roles or their bitmask.
+        required_roles (Union[int, Iterable[Role]]): required roles or their bitmask.
 
     Returns:
         bool: True if at least one of the user roles is contained in the required roles.
     """
-    return bool(set(user_roles) & set(required_roles))
+    return bool(roles_mask(user_roles) & roles_mask(required_roles))
 
 
-def is_authorized(token: str = Depends(OAUTH2_SCHEME)) -> Tuple[bool, dict]:
-    """This function will check if an user is authorized or not.
+async def get_principal(
+    request: Request, token: str = Depends(OAUTH2_SCHEME)
+) -> Principal:
+    """Request scoped dependency decoding the bearer token once and storing the principal on request.state.
 
     Args:
+        request (Request): current request.
         token (str, optional): Token read from the header. Defaults to Depends(OAUTH2_SCHEME).
 
     Raises:
-        HTTPException: When the token is invalid an exception is thrown.
+        HTTPException: When the token cannot be decoded or its token version is not current.
 
     Returns:
-        bool: True if the user is authenticated (has a valid accesss token), False otherwise.
-        dict: Dictionary contining the decoded token if is authorized, otherwise empty dictionary.
+        Principal: the principal of the current request.
     """
-    # logger = CONTAINER.get(ILogger)
-    decoded_token: dict = {}
+    principal: Principal | None = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    # Opaque tokens are resolved with a dictionary lookup, jwt ones by signature.
     try:
-        decoded_token = decode_token(token)
+        decoded_token = await resolve_token(token)
     except DecodeTokenError as e:
-        # logger.warning("routes", e.loggable)
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=e.msg)
-    return (valid_access_token(decoded_token), decoded_token)
+    principal = Principal.from_claims(decoded_token, valid_access_token(decoded_token))
 
+    # The token version is checked against the in-memory epochs, not the database.
+    if principal.is_authenticated and not await TOKEN_EPOCHS.is_current(
+        principal.username, principal.claims.get("ver", 0)
+    ):
+        msg = "The provided token has been revoked, login again."
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=msg)
 
-def is_admin(token: str = Depends(OAUTH2_SCHEME)) -> Tuple[bool, bool, dict]:
-    """This function will check if an user is authorized and has admin role.
+    request.state.principal = principal
+    return principal
 
-    Args:
-        token (str, optional): Token read from the header. Defaults to Depends(OAUTH2_SCHEME).
 
-    Raises:
-        HTTPException: When the token is invalid or missing an exception is thrown.
+def is_authorized(
+    principal: Principal = Depends(get_principal),
+) -> Tuple[bool, Mapping[str, Any]]:
+    """This function will check if an user is authorized or not.
+
+    Args:
+        principal (Principal, optional): principal of the request. Defaults to Depends(get_principal).
 
     Returns:
         bool: True if the user is authenticated (has a valid accesss token), False otherwise.
-        bool: True if the user is admin (valid token), False otherwise.
-        dict: Dictionary contining the decoded token if is authorized, otherwise empty dictionary.
+        Mapping[str, Any]: the decoded token if is authorized, otherwise empty mapping.
     """
-    authorized, decoded_token = is_authorized(token)
+    return principal.is_authenticated, principal.claims
 
-    if not authorized:
-        return authorized, False, {}
 
-    if not has_roles(decoded_token["roles"], [Role.ADMIN]):
-        return authorized, False, decoded_token
+def is_admin(
+    principal: Principal = Depends(get_principal),
+) -> Tuple[bool, bool, Mapping[str, Any]]:
+    """This function will check if an user is authorized and has admin role.
 
-    return authorized, True, decoded_token
+    Args:
+        principal (Principal, optional): principal of the request. Defaults to Depends(get_principal).
+
+    Returns:
+        bool: True if the user is authenticated (has a valid accesss token), False otherwise.
+        bool: True if the user is admin (valid token), False otherwise.
+        Mapping[str, Any]: the decoded token if is authorized, otherwise empty mapping.
+    """
+    return principal.is_authenticated, principal.is_admin, principal.claims
 
 
-def require_admin(token: str = Depends(OAUTH2_SCHEME)) -> None:
+def require_admin(principal: Principal = Depends(get_principal)) -> None:
     """This function will chck if an user is admin or not, if not raise an HTTPException.
 
     Args:
-        token (str, optional): Token read from the header. Defaults to Depends(OAUTH2_SCHEME).
+        principal (Principal, optional): principal of the request. Defaults to Depends(get_principal).
 
     Raises:
         HTTPException: Missing authorization or forbidden acces (not admin).
     """
-    authorized, admin, _ = is_admin(token)
-
-    if not authorized:
+    if not principal.is_authenticated:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
-    if not admin:
+    if not principal.is_admin:
         raise HTTPException(status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,74 @@
+from hashlib import blake2b
+from math import ceil, log
+from typing import Iterable
+
+
+class BloomFilter:
+    """Probabilistic set answering "surely not present" or "maybe present".
+
+    Membership tests never give false negatives, false positives happen with the
+    configured error rate once capacity items are added.
+    """
+
+    __slots__ = ("capacity", "error_rate", "size", "hash_count", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        """Create an empty filter sized for the given capacity and error rate.
+
+        Args:
+            capacity (int): expected number of items.
+            error_rate (float, optional): false positive probability at capacity. Defaults to 0.001.
+        """
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal number of bits and hash functions for the given capacity and error rate.
+        self.size = max(8, ceil(-capacity * log(error_rate) / (log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_items(
+        cls, items: Iterable[str], capacity: int, error_rate: float = 0.001
+    ) -> "BloomFilter":
+        """Create a filter containing the given items.
+
+        Args:
+            items (Iterable[str]): items to add.
+            capacity (int): expected number of items.
+            error_rate (float, optional): false positive probability at capacity. Defaults to 0.001.
+
+        Returns:
+            BloomFilter: the filled filter.
+        """
+        bloom_filter = cls(capacity, error_rate)
+        for item in items:
+            bloom_filter.add(item)
+        return bloom_filter
+
+    def add(self, item: str) -> None:
+        """Add the item to the filter.
+
+        Args:
+            item (str): item to add.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    # Private methods.
+    def _positions(self, item: str) -> Iterable[int]:
+        """Return the bit positions of the item, using double hashing over a single digest."""
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first_hash + i * second_hash) % self.size for i in range(self.hash_count)
+        )
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from src.models.metrics import CacheStats
+
+_V = TypeVar("_V")
+
+
+class ExpiringLRUCache(Generic[_V]):
+    """Bounded LRU cache where every entry carries its own absolute expiration time.
+
+    Expired entries are dropped lazily when read, while the least recently used ones
+    are evicted when the cache is full. The cache is thread safe because sync FastAPI
+    dependencies run inside the threadpool.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Create a new empty cache.
+
+        Args:
+            max_size (int): maximum number of entries, 0 disables the cache.
+        """
+        self._max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, _V]]" = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[_V]:
+        """Return the value stored for key if present and not expired.
+
+        Args:
+            key (Hashable): entry key.
+
+        Returns:
+            Optional[_V]: the cached value, None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: _V, expires_at: float) -> None:
+        """Store value for key until the given unix timestamp.
+
+        Args:
+            key (Hashable): entry key.
+            value (_V): value to store.
+            expires_at (float): unix timestamp after which the entry is dropped.
+        """
+        if self._max_size <= 0 or expires_at <= time():
+            return
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def replace(self, key: Hashable, value: _V) -> bool:
+        """Replace the value stored for key, keeping its expiration time and recency.
+
+        Args:
+            key (Hashable): entry key.
+            value (_V): new value.
+
+        Returns:
+            bool: True if the entry was present and not expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time():
+                return False
+
+            self._entries[key] = (entry[0], value)
+            return True
+
+    def keys(self) -> List[Hashable]:
+        """Return the keys of the entries not expired yet, without touching their recency.
+
+        Returns:
+            List[Hashable]: entry keys, least recently used first.
+        """
+        now = time()
+        with self._lock:
+            return [
+                key
+                for key, (expires_at, _) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def pop(self, key: Hashable) -> None:
+        """Drop the entry stored for key, if any.
+
+        Args:
+            key (Hashable): entry key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry, counters are preserved."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters.
+
+        Returns:
+            CacheStats: cache size and hit/miss counters.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return CacheStats(
+                size=len(self._entries),
+                max_size=self._max_size,
+                hits=self._hits,
+                misses=self._misses,
+                hit_ratio=self._hits / lookups if lookups else 0.0,
+                evictions=self._evictions,
+                expirations=self._expirations,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
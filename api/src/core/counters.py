@@ -0,0 +1,179 @@
+from typing import Dict, Final, Iterable, Optional
+
+from src.db.collections.counter import Counter
+from src.db.collections.user import User
+
+# _id of the users counters document.
+_USERS_COUNTER_ID: Final[str] = "users"
+
+
+async def count_users(role: Optional[str] = None) -> int:
+    """Return the exact number of users, or of users with the given role, from the counters document.
+
+    Args:
+        role (Optional[str], optional): role the users must have. Defaults to None.
+
+    Returns:
+        int: number of users.
+    """
+    counter = await Counter.get_motor_collection().find_one({"_id": _USERS_COUNTER_ID})
+    if counter is None:
+        counter = await rebuild_user_counters(replace=False)
+
+    if role is None:
+        return counter["total"]
+    return counter["roles"].get(role, 0)
+
+
+async def estimate_users() -> int:
+    """Return the number of users from the collection metadata, without reading any document.
+    It may be off after an unclean shutdown or while documents are being orphaned in a sharded cluster.
+
+    Returns:
+        int: estimated number of users.
+    """
+    return await User.get_motor_collection().estimated_document_count()
+
+
+async def add_user(roles: Iterable[str]) -> None:
+    """Count a new user, to be called once the user has been saved.
+
+    Args:
+        roles (Iterable[str]): roles of the new user.
+    """
+    await _increment(1, {role: 1 for role in roles})
+
+
+async def remove_user(roles: Iterable[str], claimed_roles: Iterable[str] = ()) -> None:
+    """Stop counting a user, to be called once the user has been deleted.
+
+    Args:
+        roles (Iterable[str]): roles of the deleted user.
+        claimed_roles (Iterable[str], optional): roles already decremented by claim_role_removal. Defaults to ().
+    """
+    claimed_roles = set(claimed_roles)
+    await _increment(-1, {role: -1 for role in roles if role not in claimed_roles})
+
+
+async def claim_role_removal(role: str) -> bool:
+    """Decrement the counter of the role only if another user keeps the role, with a single
+    conditional update: concurrent claims can never take the counter below 1.
+    Call release_role_removal if the user is not removed after a successful claim.
+
+    Args:
+        role (str): role of the user about to be removed.
+
+    Returns:
+        bool: True if the counter has been decremented, False if the user is the last one with the role.
+    """
+    if await _decrement_if_not_last(role):
+        return True
+
+    # The decrement also fails while the counters are missing, build them and retry.
+    collection = Counter.get_motor_collection()
+    if await collection.find_one({"_id": _USERS_COUNTER_ID}, {"_id": 1}) is not None:
+        return False
+    await rebuild_user_counters(replace=False)
+    return await _decrement_if_not_last(role)
+
+
+async def release_role_removal(role: str) -> None:
+    """Give back a role counter decremented by claim_role_removal.
+
+    Args:
+        role (str): claimed role.
+    """
+    await _increment(0, {role: 1})
+
+
+async def change_user_roles(
+    old_roles: Iterable[str],
+    new_roles: Iterable[str],
+    claimed_roles: Iterable[str] = (),
+) -> None:
+    """Move a user between the roles counters, to be called once the user has been updated.
+
+    Args:
+        old_roles (Iterable[str]): roles before the update.
+        new_roles (Iterable[str]): roles after the update.
+        claimed_roles (Iterable[str], optional): roles already decremented by claim_role_removal. Defaults to ().
+    """
+    old_roles, new_roles = set(old_roles), set(new_roles)
+    removed_roles = old_roles - new_roles - set(claimed_roles)
+    role_deltas = {role: -1 for role in removed_roles}
+    role_deltas.update({role: 1 for role in new_roles - old_roles})
+    await _increment(0, role_deltas)
+
+
+async def rebuild_user_counters(replace: bool = True) -> dict:
+    """Count the users again from the users collection, a full scan.
+
+    Args:
+        replace (bool, optional): overwrite the current counters, when False they are only
+            written if missing. Defaults to True.
+
+    Returns:
+        dict: the counters document.
+    """
+    roles_pipeline = [
+        {"$unwind": "$roles"},
+        {"$group": {"_id": "$roles", "count": {"$sum": 1}}},
+    ]
+    counter = {
+        "total": await User.get_motor_collection().count_documents({}),
+        "roles": {
+            role_count["_id"]: role_count["count"]
+            async for role_count in User.get_motor_collection().aggregate(
+                roles_pipeline
+            )
+        },
+    }
+
+    collection = Counter.get_motor_collection()
+    if replace:
+        await collection.replace_one({"_id": _USERS_COUNTER_ID}, counter, upsert=True)
+        return counter
+
+    # Many processes may count at once, the first one writing wins.
+    await collection.update_one(
+        {"_id": _USERS_COUNTER_ID}, {"$setOnInsert": counter}, upsert=True
+    )
+    return await collection.find_one({"_id": _USERS_COUNTER_ID})
+
+
+# Private functions.
+async def _decrement_if_not_last(role: str) -> bool:
+    """Decrement the counter of the role if greater than 1."""
+    result = await Counter.get_motor_collection().update_one(
+        {"_id": _USERS_COUNTER_ID, f"roles.{role}": {"$gt": 1}},
+        {"$inc": {f"roles.{role}": -1}},
+    )
+    return result.modified_count == 1
+
+
+async def _increment(total_delta: int, role_deltas: Dict[str, int]) -> None:
+    """Apply the deltas to the users counters with a single atomic update, failures are only logged."""
+    # Role members format as "Role.ADMIN", their value is the stored role.
+    increments = {
+        f"roles.{getattr(role, 'value', role)}": delta
+        for role, delta in role_deltas.items()
+    }
+    if total_delta:
+        increments["total"] = total_delta
+    if not increments:
+        return
+
+    # Never upserted, counters created by an increment would miss the users saved
+    # before: they are built by the first count_users or by the migration.
+    try:
+        await Counter.get_motor_collection().update_one(
+            {"_id": _USERS_COUNTER_ID}, {"$inc": increments}
+        )
+    except Exception as e:
+        # The user change is already saved, the drift is fixed by the next migration.
+        # Imported here because the container builds the user repository while importing this module.
+        from src.helpers.container import CONTAINER
+        from src.services.logger.interfaces.i_logger import ILogger
+
+        logger = CONTAINER.get(ILogger)
+        logger.error("core", f"The users counters could not be updated: {e}")
@@ -0,0 +1,70 @@
+import hmac
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import lru_cache
+from hashlib import sha256
+from os import environ
+from typing import Final
+
+from src.core.exceptions import InvalidCursorError
+
+# Bytes of the HMAC kept in the cursor, enough to make forging one impractical.
+_SIGNATURE_BYTES: Final[int] = 16
+
+
+@lru_cache(maxsize=1)
+def _cursor_key() -> bytes:
+    """Return the key signing the cursors, derived from the secret key so it never signs tokens."""
+    return hmac.new(environ["SECRET_KEY"].encode(), b"cursor", sha256).digest()
+
+
+def _signature(value: bytes) -> bytes:
+    return hmac.new(_cursor_key(), value, sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def _b64encode(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def encode_cursor(value: str) -> str:
+    """Return an opaque and signed cursor pointing after the given value.
+
+    Args:
+        value (str): last value of the page, e.g. the username of the last user.
+
+    Returns:
+        str: the url safe cursor.
+    """
+    raw_value = value.encode()
+    return f"{_b64encode(raw_value)}.{_b64encode(_signature(raw_value))}"
+
+
+def decode_cursor(cursor: str) -> str:
+    """Return the value the cursor points after, checking its signature.
+
+    Args:
+        cursor (str): cursor returned by encode_cursor.
+
+    Raises:
+        InvalidCursorError: if the cursor is malformed or its signature does not match.
+
+    Returns:
+        str: the value the cursor has been encoded from.
+    """
+    try:
+        encoded_value, encoded_signature = cursor.split(".")
+        raw_value = _b64decode(encoded_value)
+        signature = _b64decode(encoded_signature)
+        value = raw_value.decode()
+    except ValueError as e:
+        raise InvalidCursorError(loggable=str(e), msg="The cursor is malformed.")
+
+    if not hmac.compare_digest(signature, _signature(raw_value)):
+        raise InvalidCursorError(
+            loggable=f"Cursor signature mismatch for {value!r}",
+            msg="The cursor is invalid.",
+        )
+    return value
@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime, timedelta
+from time import time
+from typing import Dict, Final, Iterable, Optional
+
+from src.core.cache import ExpiringLRUCache
+from src.helpers.container import CONTAINER
+from src.models.metrics import EpochStats
+from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+
+# Version of the deleted users, no token version is ever current against it.
+DELETED: Final[float] = float("inf")
+
+# Users changed this long before the last refresh are read again, to tolerate
+# clock differences between the nodes writing last_update.
+_CLOCK_SKEW: Final[timedelta] = timedelta(seconds=5)
+_RELOAD_BATCH_SIZE: Final[int] = 1000
+
+
+class TokenEpochs:
+    """In-memory map from username to the current token version of the user.
+
+    Tokens embed the token version of the user at issuing time, a token is valid
+    only while its version is still the current one. The map holds only the users
+    seen in tokens: a username is read from the database the first time, then kept
+    up to date by an incremental refresh of the users changed since the previous
+    one (by last_update) and by a periodic full reload that also detects deletions.
+    The map is bounded, an evicted or expired username is read again at its next token.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 5,
+        full_reload_interval: float = 300,
+        max_size: int = 100000,
+        ttl: float = 3600,
+    ) -> None:
+        """Create an empty map, call start once the database is initialized.
+
+        Args:
+            refresh_interval (float, optional): seconds between two incremental refreshes. Defaults to 5.
+            full_reload_interval (float, optional): seconds between two full reloads. Defaults to 300.
+            max_size (int, optional): maximum number of users in the map, 0 disables it. Defaults to 100000.
+            ttl (float, optional): seconds a token version is kept after being read or written. Defaults to 3600.
+        """
+        self._refresh_interval = refresh_interval
+        self._full_reload_interval = full_reload_interval
+        self._ttl = ttl
+        self._versions: ExpiringLRUCache[float] = ExpiringLRUCache(max_size)
+        self._watermark: Optional[datetime] = None
+        self._last_full_reload = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._checks = 0
+        self._database_reads = 0
+        self._rejections = 0
+
+    async def is_current(self, username: str, version: int) -> bool:
+        """Check if the given token version is the current one of the user.
+
+        Args:
+            username (str): token owner.
+            version (int): token version embedded in the token.
+
+        Returns:
+            bool: True if the token version is current and the user still exists.
+        """
+        self._checks += 1
+        current = self._versions.get(username)
+        if current is None:
+            self._database_reads += 1
+            current = await self._read(username)
+
+        if version < current:
+            self._rejections += 1
+            return False
+        return True
+
+    def set(self, username: str, version: float) -> None:
+        """Record the current token version of a user written by this node.
+
+        Args:
+            username (str): user username.
+            version (float): new token version, DELETED for deleted users.
+        """
+        self._versions.put(username, version, time() + self._ttl)
+
+    def forget(self, username: str) -> None:
+        """Drop the token version of a user changed by another node, it is read again at the next check.
+
+        Args:
+            username (str): user username.
+        """
+        self._versions.pop(username)
+
+    async def revoke_all(self, username: str) -> Optional[int]:
+        """Invalidate every token issued to the user by bumping its token version.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[int]: the new token version, None if the user does not exist.
+        """
+        token_version = await CONTAINER.get(IUserRepository).bump_token_version(
+            username
+        )
+        if token_version is None:
+            self.set(username, DELETED)
+            return None
+
+        self.set(username, token_version)
+        return token_version
+
+    async def refresh(self) -> None:
+        """Read the token versions of the users changed since the previous refresh."""
+        started_at = datetime.utcnow()
+        if self._watermark is not None:
+            changed = await CONTAINER.get(IUserRepository).token_versions_changed_since(
+                self._watermark - _CLOCK_SKEW
+            )
+            for username, token_version in changed.items():
+                # Users never seen in a token are read on demand.
+                self._versions.replace(username, token_version)
+        self._watermark = started_at
+
+    async def reload(self) -> None:
+        """Read again the token versions of every known user, the missing ones are marked as deleted."""
+        usernames = self._versions.keys()
+        versions: Dict[str, float] = {}
+        for start in range(0, len(usernames), _RELOAD_BATCH_SIZE):
+            versions.update(
+                await self._read_many(usernames[start : start + _RELOAD_BATCH_SIZE])
+            )
+
+        for username in usernames:
+            self._versions.replace(username, versions.get(username, DELETED))
+        self._last_full_reload = time()
+
+    def start(self) -> None:
+        """Start refreshing the map periodically in background."""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    def stop(self) -> None:
+        """Stop the periodic refresh."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def stats(self) -> EpochStats:
+        """Return a snapshot of the map usage.
+
+        Returns:
+            EpochStats: map size and check counters.
+        """
+        return EpochStats(
+            size=len(self._versions),
+            checks=self._checks,
+            database_reads=self._database_reads,
+            rejections=self._rejections,
+            watermark=self._watermark,
+        )
+
+    # Private methods.
+    async def _read(self, username: str) -> float:
+        """Read the token version of a single user and store it in the map."""
+        version = (await self._read_many([username])).get(username, DELETED)
+        self.set(username, version)
+        return version
+
+    async def _read_many(self, usernames: Iterable[str]) -> Dict[str, float]:
+        """Read the token versions of the given users, the missing ones are not returned."""
+        return await CONTAINER.get(IUserRepository).token_versions(usernames)
+
+    async def _refresh_periodically(self) -> None:
+        """Refresh the map every refresh interval, reloading it completely every full reload interval."""
+        logger = CONTAINER.get(ILogger)
+        while True:
+            try:
+                if time() - self._last_full_reload >= self._full_reload_interval:
+                    await self.reload()
+                await self.refresh()
+            except Exception as e:
+                logger.error("core", f"Token epochs refresh failed: {e}")
+            await asyncio.sleep(self._refresh_interval)
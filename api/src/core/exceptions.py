@@ -21,3 +21,33 @@ class ValidateTokenError(BaseCdrtException):
     """Custom class to express an exception while token validation."""
 
     pass
+
+
+class HasherOverloadedError(BaseCdrtException):
+    """Custom class to express that the password hasher backlog is full."""
+
+    pass
+
+
+class InvalidCursorError(BaseCdrtException):
+    """Custom class to express that a pagination cursor is malformed or has been tampered with."""
+
+    pass
+
+
+class DuplicateUserError(BaseCdrtException):
+    """Custom class to express that the username or the email of a user are already in use."""
+
+    pass
+
+
+class StaleRevisionError(BaseCdrtException):
+    """Custom class to express that a user has been changed since the revision given for a conditional update."""
+
+    pass
+
+
+class LastAdminError(BaseCdrtException):
+    """Custom class to express that the user to delete is the last admin."""
+
+    pass
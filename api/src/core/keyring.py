@@ -0,0 +1,223 @@
+"""Asymmetric signing keys read from a directory on disk.
+
+Every key is a PEM private key named "<kid>.pem", the file name is the key id
+written in the "kid" header of the signed tokens. A key rotation is done without
+downtime by dropping a new key in the directory of every node:
+- the new key is published in the JWKS right away, but it is used to sign only
+  after the activation delay, so every verifier can fetch it in the meanwhile;
+- the old key stays in the ring to verify the tokens already issued, it can be
+  removed once the longest living token signed with it is expired.
+
+A new key can be generated with:
+python -m src.core.keyring <key-ring-directory> [algorithm]
+"""
+import sys
+from datetime import datetime
+from os import O_CREAT, O_EXCL, O_WRONLY, listdir, makedirs
+from os import open as os_open
+from os.path import getmtime, join, splitext
+from secrets import token_hex
+from threading import Lock
+from time import time
+from typing import Dict, Final, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+from src.core.signing import TokenSigner
+
+_KEY_EXTENSION: Final[str] = ".pem"
+
+_EC_CURVES: Final[Dict[str, ec.EllipticCurve]] = {
+    "ES256": ec.SECP256R1(),
+    "ES384": ec.SECP384R1(),
+    "ES512": ec.SECP521R1(),
+}
+
+
+class KeyRing:
+    """Set of asymmetric keys, indexed by key id, used to sign and verify tokens.
+
+    The ring is reloaded from disk at most once every reload interval, both when
+    signing (to pick up rotations) and when a token with an unknown kid is verified.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        algorithm: str,
+        activation_delay: float = 300,
+        reload_interval: float = 60,
+    ) -> None:
+        """Create the key ring and read the keys in the directory.
+
+        Args:
+            directory (str): directory containing the "<kid>.pem" private keys.
+            algorithm (str): asymmetric algorithm of the keys, e.g. ES256.
+            activation_delay (float, optional): seconds a new key is only published before signing with it. Defaults to 300.
+            reload_interval (float, optional): minimum seconds between two reads of the directory. Defaults to 60.
+        """
+        self.directory = directory
+        self.algorithm = algorithm
+        self._activation_delay = activation_delay
+        self._reload_interval = reload_interval
+        self._lock = Lock()
+        self._loaded_at = 0.0
+        # kid -> (creation time, signer, public key)
+        self._keys: Dict[str, Tuple[float, TokenSigner, Key]] = {}
+        self._active_kid: Optional[str] = None
+        self.reload()
+
+    def reload(self) -> None:
+        """Read the keys in the directory again, replacing the current ones.
+
+        Keys that cannot be read are skipped, the previous ring is kept if none can be read.
+        A missing or unreadable directory is read as an empty one.
+        """
+        keys: Dict[str, Tuple[float, TokenSigner, Key]] = {}
+        try:
+            file_names = listdir(self.directory)
+        except OSError:
+            file_names = []
+
+        for file_name in file_names:
+            kid, extension = splitext(file_name)
+            if extension != _KEY_EXTENSION:
+                continue
+
+            file_path = join(self.directory, file_name)
+            try:
+                with open(file_path) as key_file_stream:
+                    pem = key_file_stream.read()
+                private_key = jwk.construct(pem, self.algorithm)
+                created_at = getmtime(file_path)
+            except (OSError, JWKError):
+                continue
+
+            keys[kid] = (
+                created_at,
+                TokenSigner(private_key, self.algorithm, kid=kid),
+                private_key.public_key(),
+            )
+
+        with self._lock:
+            self._loaded_at = time()
+            if keys:
+                self._keys = keys
+                self._active_kid = self._select_active_kid(keys)
+
+    def signer(self) -> TokenSigner:
+        """Return the signer of the active key.
+
+        Raises:
+            KeyError: if the ring does not contain any key.
+
+        Returns:
+            TokenSigner: signer writing the active kid in the token header.
+        """
+        self._reload_if_stale()
+        if self._active_kid is None:
+            raise KeyError(f"No signing key found in {self.directory}")
+        return self._keys[self._active_kid][1]
+
+    def verifying_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Return the public key for the given key id, reloading the ring when the kid is unknown.
+
+        Args:
+            kid (Optional[str]): key id read from the token header.
+
+        Returns:
+            Optional[Key]: the public key, None if the kid is unknown.
+        """
+        if kid is None:
+            return None
+
+        entry = self._keys.get(kid)
+        if entry is None:
+            self._reload_if_stale()
+            entry = self._keys.get(kid)
+        return None if entry is None else entry[2]
+
+    def jwks(self) -> dict:
+        """Return the public keys of the ring as a JSON Web Key Set.
+
+        Returns:
+            dict: the key set, newest keys first.
+        """
+        self._reload_if_stale()
+        keys: List[dict] = []
+        for kid, (_, _, public_key) in sorted(
+            self._keys.items(), key=lambda item: item[1][0], reverse=True
+        ):
+            public_jwk = public_key.to_dict()
+            public_jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+            keys.append(public_jwk)
+        return {"keys": keys}
+
+    # Private methods.
+    def _reload_if_stale(self) -> None:
+        """Reload the ring if the reload interval is elapsed."""
+        if time() - self._loaded_at >= self._reload_interval:
+            self.reload()
+
+    def _select_active_kid(
+        self, keys: Dict[str, Tuple[float, TokenSigner, Key]]
+    ) -> str:
+        """Return the newest key whose activation delay is elapsed, or the oldest key if none is active yet.
+
+        Args:
+            keys (Dict[str, Tuple[float, TokenSigner, Key]]): keys by kid.
+
+        Returns:
+            str: the kid of the key to sign with.
+        """
+        by_creation = sorted(keys, key=lambda kid: (keys[kid][0], kid))
+        activation_limit = time() - self._activation_delay
+        active = [kid for kid in by_creation if keys[kid][0] <= activation_limit]
+        return active[-1] if active else by_creation[0]
+
+
+def generate_key(directory: str, algorithm: str = "ES256") -> str:
+    """Generate a new private key in the given key ring directory.
+
+    Args:
+        directory (str): key ring directory, created if missing.
+        algorithm (str, optional): algorithm the key is used with. Defaults to "ES256".
+
+    Raises:
+        ValueError: if the algorithm is not an ES* or RS* algorithm.
+
+    Returns:
+        str: the kid of the new key.
+    """
+    if algorithm in _EC_CURVES:
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm])
+    elif algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ValueError(f"Unsupported asymmetric algorithm {algorithm}")
+
+    kid = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{token_hex(4)}"
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+    # The private key must be readable by the owner only.
+    makedirs(directory, mode=0o700, exist_ok=True)
+    key_file_descriptor = os_open(
+        join(directory, f"{kid}{_KEY_EXTENSION}"), O_WRONLY | O_CREAT | O_EXCL, 0o600
+    )
+    with open(key_file_descriptor, "wb") as key_file_stream:
+        key_file_stream.write(pem)
+    return kid
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.core.keyring <key-ring-directory> [algorithm]")
+        sys.exit(-1)
+    print(generate_key(*sys.argv[1:3]))
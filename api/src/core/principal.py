@@ -0,0 +1,115 @@
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping
+
+from src.core.roles import ROLE_BITS, mask_roles, roles_mask
+from src.models.user import Role
+
+_ADMIN_BIT = ROLE_BITS[Role.ADMIN]
+_USER_BIT = ROLE_BITS[Role.USER]
+
+
+class Principal:
+    """Immutable view of the user owning the bearer token of the current request.
+
+    It is built once per request from the decoded token, so the role checks done
+    by the routes are simple attribute reads.
+
+    Attributes:
+        username (str): username contained in the token.
+        email (str): email contained in the token, empty for compact tokens.
+        roles (FrozenSet[str]): user roles.
+        role_mask (int): user roles as bitmask, see src.core.roles.
+        claims (Mapping[str, Any]): read only view of the decoded token.
+        is_authenticated (bool): True if the token is a valid access token.
+        is_admin (bool): True if authenticated and having the admin role.
+        is_user (bool): True if authenticated and having the user role.
+    """
+
+    __slots__ = (
+        "username",
+        "email",
+        "roles",
+        "role_mask",
+        "claims",
+        "is_authenticated",
+        "is_admin",
+        "is_user",
+    )
+
+    username: str
+    email: str
+    roles: FrozenSet[str]
+    role_mask: int
+    claims: Mapping[str, Any]
+    is_authenticated: bool
+    is_admin: bool
+    is_user: bool
+
+    def __init__(
+        self,
+        username: str,
+        email: str,
+        roles: FrozenSet[str],
+        claims: Mapping[str, Any],
+        is_authenticated: bool,
+    ) -> None:
+        # The class is immutable, attributes can be set only from here.
+        set_attribute = object.__setattr__
+        role_mask = roles_mask(roles)
+        set_attribute(self, "username", username)
+        set_attribute(self, "email", email)
+        set_attribute(self, "roles", roles)
+        set_attribute(self, "role_mask", role_mask)
+        set_attribute(self, "claims", MappingProxyType(dict(claims)))
+        set_attribute(self, "is_authenticated", is_authenticated)
+        set_attribute(
+            self, "is_admin", is_authenticated and bool(role_mask & _ADMIN_BIT)
+        )
+        set_attribute(self, "is_user", is_authenticated and bool(role_mask & _USER_BIT))
+
+    @classmethod
+    def from_claims(
+        cls, claims: Mapping[str, Any], is_authenticated: bool
+    ) -> "Principal":
+        """Build a principal from a decoded token, either in the compact claims format
+        (sub, rl, typ) or in the legacy one (username, email, roles, is_refresh).
+
+        Args:
+            claims (Mapping[str, Any]): decoded token.
+            is_authenticated (bool): True if the token is a valid access token.
+
+        Returns:
+            Principal: the principal, anonymous if not authenticated.
+        """
+        if not is_authenticated:
+            return ANONYMOUS
+        if "typ" in claims:
+            return cls(
+                username=claims.get("sub", ""),
+                email="",
+                roles=mask_roles(claims.get("rl", 0)),
+                claims=claims,
+                is_authenticated=True,
+            )
+        return cls(
+            username=claims.get("username", ""),
+            email=claims.get("email", ""),
+            roles=frozenset(claims.get("roles") or ()),
+            claims=claims,
+            is_authenticated=True,
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(username={self.username!r}, roles={set(self.roles)!r}, is_authenticated={self.is_authenticated})"
+
+
+# Principal of a request whose token is well formed but not a valid access token.
+ANONYMOUS = Principal(
+    username="", email="", roles=frozenset(), claims={}, is_authenticated=False
+)
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime
+from time import time
+from typing import List, Optional
+
+from pymongo.errors import DuplicateKeyError
+from src.core.bloom import BloomFilter
+from src.db.collections.revoked_token import RevokedToken
+from src.helpers.container import CONTAINER
+from src.models.metrics import RevocationStats
+from src.services.logger.interfaces.i_logger import ILogger
+
+
+class RevocationStore:
+    """Store of the revoked refresh token ids, backed by the revoked_tokens collection.
+
+    An in-memory Bloom filter of the revoked ids sits in front of the collection, so
+    checking a token that was never revoked does not touch the database. The filter
+    is rebuilt periodically to pick up the revocations made by other nodes and to
+    forget the expired ones.
+    """
+
+    def __init__(
+        self,
+        bloom_capacity: int = 100000,
+        bloom_error_rate: float = 0.001,
+        rebuild_interval: float = 60,
+    ) -> None:
+        """Create an empty store, call rebuild or start once the database is initialized.
+
+        Args:
+            bloom_capacity (int, optional): minimum number of ids the filter is sized for. Defaults to 100000.
+            bloom_error_rate (float, optional): filter false positive probability at capacity. Defaults to 0.001.
+            rebuild_interval (float, optional): seconds between two filter rebuilds. Defaults to 60.
+        """
+        self._bloom_capacity = bloom_capacity
+        self._bloom_error_rate = bloom_error_rate
+        self._rebuild_interval = rebuild_interval
+        self._bloom_filter = BloomFilter(bloom_capacity, bloom_error_rate)
+        # Ids revoked by this node while a rebuild is reading the collection.
+        self._revoked_during_rebuild: Optional[List[str]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._last_rebuild: Optional[datetime] = None
+        self._checks = 0
+        self._database_checks = 0
+        self._false_positives = 0
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Check if the given token id has been revoked.
+
+        Args:
+            jti (str): token id.
+
+        Returns:
+            bool: True if the token is revoked.
+        """
+        self._checks += 1
+        if jti not in self._bloom_filter:
+            return False
+
+        self._database_checks += 1
+        revoked = await RevokedToken.find_one(RevokedToken.jti == jti) is not None
+        if not revoked:
+            self._false_positives += 1
+        return revoked
+
+    async def revoke(self, jti: str, expiration: int) -> bool:
+        """Revoke the given token id until its expiration.
+        The unique index on jti makes this the atomic claim of a refresh token,
+        only one of many concurrent revocations of the same id succeeds.
+
+        Args:
+            jti (str): token id.
+            expiration (int): token expiration as unix timestamp.
+
+        Returns:
+            bool: True if the token has been revoked now, False if it already was.
+        """
+        self._bloom_filter.add(jti)
+        if self._revoked_during_rebuild is not None:
+            self._revoked_during_rebuild.append(jti)
+        try:
+            await RevokedToken(
+                jti=jti, exp=datetime.utcfromtimestamp(expiration)
+            ).insert()
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def rebuild(self) -> None:
+        """Rebuild the Bloom filter from the revoked ids still stored in the collection."""
+        collection = RevokedToken.get_motor_collection()
+        self._revoked_during_rebuild = []
+        try:
+            jtis = [
+                revoked_token["jti"]
+                async for revoked_token in collection.find({}, {"_id": 0, "jti": 1})
+            ]
+            # Keep room for the revocations made until the next rebuild.
+            capacity = max(self._bloom_capacity, len(jtis) * 2)
+            bloom_filter = BloomFilter.from_items(
+                jtis + self._revoked_during_rebuild, capacity, self._bloom_error_rate
+            )
+        finally:
+            self._revoked_during_rebuild = None
+
+        self._bloom_filter = bloom_filter
+        self._last_rebuild = datetime.utcnow()
+
+    def start(self) -> None:
+        """Start rebuilding the filter periodically in background."""
+        if self._rebuild_task is None:
+            self._rebuild_task = asyncio.create_task(self._rebuild_periodically())
+
+    def stop(self) -> None:
+        """Stop the periodic rebuild."""
+        if self._rebuild_task is not None:
+            self._rebuild_task.cancel()
+            self._rebuild_task = None
+
+    def stats(self) -> RevocationStats:
+        """Return a snapshot of the filter usage.
+
+        Returns:
+            RevocationStats: filter size and database check counters.
+        """
+        return RevocationStats(
+            bloom_items=self._bloom_filter.count,
+            bloom_capacity=self._bloom_filter.capacity,
+            bloom_bits=self._bloom_filter.size,
+            bloom_hashes=self._bloom_filter.hash_count,
+            checks=self._checks,
+            database_checks=self._database_checks,
+            false_positives=self._false_positives,
+            last_rebuild=self._last_rebuild,
+        )
+
+    # Private methods.
+    async def _rebuild_periodically(self) -> None:
+        """Rebuild the filter every rebuild interval until cancelled."""
+        logger = CONTAINER.get(ILogger)
+        while True:
+            start = time()
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error("core", f"Revoked tokens filter rebuild failed: {e}")
+            await asyncio.sleep(max(0.0, self._rebuild_interval - (time() - start)))
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Dict, Final, FrozenSet, Iterable, Union
+
+from src.models.user import Role
+
+# Bit of every role in the roles bitmask, derived from the declaration order
+# of Role: new roles must be appended to keep the issued masks meaningful.
+ROLE_BITS: Final[Dict[Role, int]] = {
+    role: 1 << index for index, role in enumerate(Role)
+}
+
+
+def roles_mask(roles: Union[int, Iterable[str]]) -> int:
+    """Return the bitmask of the given roles, unknown roles are ignored.
+
+    Args:
+        roles (Union[int, Iterable[str]]): roles, or an already computed bitmask.
+
+    Returns:
+        int: the roles bitmask.
+    """
+    if isinstance(roles, int):
+        return roles
+
+    mask = 0
+    for role in roles:
+        # Role is a str enum, plain strings find their bit too.
+        mask |= ROLE_BITS.get(role, 0)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def mask_roles(mask: int) -> FrozenSet[Role]:
+    """Return the roles set in the given bitmask.
+
+    Args:
+        mask (int): roles bitmask.
+
+    Returns:
+        FrozenSet[Role]: the roles, unknown bits are ignored.
+    """
+    return frozenset(role for role, bit in ROLE_BITS.items() if mask & bit)
@@ -0,0 +1,95 @@
+import json
+from typing import Any, Mapping, Optional, Union
+
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError, JWTError
+from jose.utils import base64url_encode
+
+_JSON_SEPARATORS = (",", ":")
+
+
+class TokenSigner:
+    """JWT signer preparing the signing key and the encoded header only once.
+
+    The produced tokens are the same python-jose would produce with jwt.encode,
+    so they can be verified with jwt.decode.
+    """
+
+    __slots__ = ("algorithm", "kid", "_key", "_encoded_header")
+
+    def __init__(
+        self, secret_key: Union[str, Key], algorithm: str, kid: Optional[str] = None
+    ) -> None:
+        """Prepare the key and the header for the given algorithm.
+
+        Args:
+            secret_key (Union[str, Key]): key to apply the signature with, secret or PEM private key.
+            algorithm (str): desired signature algorithm.
+            kid (Optional[str], optional): key id to write in the header. Defaults to None.
+
+        Raises:
+            JWTError: if the key cannot be used with the algorithm.
+        """
+        try:
+            self._key = (
+                secret_key
+                if isinstance(secret_key, Key)
+                else jwk.construct(secret_key, algorithm)
+            )
+        except JWKError as e:
+            raise JWTError(str(e))
+
+        header = {"typ": "JWT", "alg": algorithm}
+        if kid is not None:
+            header["kid"] = kid
+
+        self.algorithm = algorithm
+        self.kid = kid
+        self._encoded_header = base64url_encode(
+            json.dumps(header, separators=_JSON_SEPARATORS, sort_keys=True).encode()
+        )
+
+    def sign(self, claims: Mapping[str, Any]) -> str:
+        """Return the signed token for the given claims.
+
+        Args:
+            claims (Mapping[str, Any]): claims to encode, must be json serializable.
+
+        Returns:
+            str: the encoded token.
+        """
+        return self.sign_payload(
+            json.dumps(claims, separators=_JSON_SEPARATORS).encode()
+        )
+
+    def sign_payload(self, payload: bytes) -> str:
+        """Return the signed token for an already serialized claims object.
+
+        Args:
+            payload (bytes): json serialized claims.
+
+        Returns:
+            str: the encoded token.
+        """
+        signing_input = self._encoded_header + b"." + base64url_encode(payload)
+        signature = base64url_encode(self._key.sign(signing_input))
+        return (signing_input + b"." + signature).decode()
+
+
+def serialize_claims_prefix(claims: Mapping[str, Any]) -> bytes:
+    """Serialize the given claims as the beginning of a json object.
+
+    The result can be completed with the per token claims without serializing the
+    shared ones again, e.g. prefix + b'"exp":1}'.
+
+    Args:
+        claims (Mapping[str, Any]): shared claims, must be json serializable.
+
+    Returns:
+        bytes: the opened json object, ending with a comma when not empty.
+    """
+    serialized = json.dumps(claims, separators=_JSON_SEPARATORS).encode()
+    if serialized == b"{}":
+        return b"{"
+    return serialized[:-1] + b","
@@ -0,0 +1,206 @@
+import asyncio
+import sys
+from os import environ
+from os.path import join
+from secrets import token_hex
+from time import time
+from typing import Any, Dict, Final, Optional
+
+from src.core.cache import ExpiringLRUCache
+from src.helpers.container import CONTAINER
+from src.models.metrics import CacheStats
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.invalidation.enums.kind import InvalidationKind
+from src.services.invalidation.interfaces.i_invalidation_bus import IInvalidationBus
+from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+from src.services.repository.models.user import UserRecord
+from yaml import safe_load
+
+# Read configuration file for the users lookups.
+USERS_CONFIG: Final[Dict[str, Any]]
+try:
+    config_file_path = join(environ["CONFIGS_DIR"], "auth", "users.yaml")
+    with open(config_file_path) as config_file_stream:
+        USERS_CONFIG = safe_load(config_file_stream)
+except Exception as e:
+    logger = CONTAINER.get(ILogger)
+    logger.critical(
+        "errors", f"An error occured while reading the configuration file in {__file__}"
+    )
+    sys.exit()
+
+_UNKNOWN_USERS_CONFIG: Final[Dict[str, Any]] = USERS_CONFIG.get("unknown_users", {})
+
+# Usernames recently looked up and not found, answered without the database.
+_UNKNOWN_USERS: Final[ExpiringLRUCache[bool]] = ExpiringLRUCache(
+    max_size=_UNKNOWN_USERS_CONFIG.get("max_size", 10000)
+)
+
+_USER_CACHE_CONFIG: Final[Dict[str, Any]] = USERS_CONFIG.get("user_cache", {})
+
+# Users recently read from the database by username, shared by every lookup.
+_USERS: Final[ExpiringLRUCache[UserRecord]] = ExpiringLRUCache(
+    max_size=_USER_CACHE_CONFIG.get("max_size", 10000)
+)
+
+# Database reads in flight by username, awaited by every concurrent miss.
+_LOADS: Final[Dict[str, "asyncio.Task[Optional[UserRecord]]"]] = {}
+
+# Hash of a random password, verified against when the user does not exist.
+_DUMMY_HASH: Optional[str] = None
+
+
+def is_unknown_user(username: str) -> bool:
+    """Check if the username was recently looked up and not found.
+
+    Args:
+        username (str): username to check.
+
+    Returns:
+        bool: True if the user is known not to exist, False if unknown or existing.
+    """
+    return _UNKNOWN_USERS.get(_key(username)) is not None
+
+
+def remember_unknown_user(username: str) -> None:
+    """Remember that the username does not exist, for the configured ttl.
+
+    Args:
+        username (str): username not found.
+    """
+    _UNKNOWN_USERS.put(
+        _key(username), True, time() + _UNKNOWN_USERS_CONFIG.get("ttl", 30)
+    )
+
+
+def forget_unknown_user(username: str) -> None:
+    """Forget that the username does not exist, to be called when the user is created.
+
+    Args:
+        username (str): username of the new user.
+    """
+    _UNKNOWN_USERS.pop(_key(username))
+
+
+async def get_user(username: str) -> Optional[UserRecord]:
+    """Return the user with the given username, from the cache or from the database.
+    Concurrent misses for the same username share a single database read.
+    The username is matched ignoring the case, as the database does.
+    The returned document is shared, it must not be changed.
+
+    Args:
+        username (str): user username.
+
+    Returns:
+        Optional[UserRecord]: the user, None if it does not exist.
+    """
+    if is_unknown_user(username):
+        return None
+
+    key = _key(username)
+    user = _USERS.get(key)
+    if user is not None:
+        return user
+
+    load = _LOADS.get(key)
+    if load is None:
+        load = asyncio.create_task(_load_user(username))
+        _LOADS[key] = load
+    # Shielded, a cancelled request does not cancel the read awaited by the others.
+    return await asyncio.shield(load)
+
+
+def invalidate_user(username: str) -> None:
+    """Drop the cached user, to be called when the user is changed or deleted.
+    A read in flight is not cached anymore, the next lookup reads the database again.
+
+    Args:
+        username (str): username of the changed user.
+    """
+    key = _key(username)
+    _USERS.pop(key)
+    _LOADS.pop(key, None)
+
+
+def evict_user(username: str) -> None:
+    """Drop everything cached about the username, the next lookup reads the database.
+
+    Args:
+        username (str): username of the created, changed or deleted user.
+    """
+    invalidate_user(username)
+    forget_unknown_user(username)
+
+
+async def publish_user_change(username: str) -> None:
+    """Evict the username from the caches of every node, to be called after the user
+    is created, changed or deleted.
+
+    Args:
+        username (str): username of the created, changed or deleted user.
+    """
+    await CONTAINER.get(IInvalidationBus).publish(InvalidationKind.USER, username)
+
+
+def user_cache_stats() -> CacheStats:
+    """Return a snapshot of the users cache usage.
+
+    Returns:
+        CacheStats: cache size and hit/miss counters.
+    """
+    return _USERS.stats()
+
+
+def unknown_users_stats() -> CacheStats:
+    """Return a snapshot of the unknown usernames cache usage.
+
+    Returns:
+        CacheStats: cache size and hit/miss counters.
+    """
+    return _UNKNOWN_USERS.stats()
+
+
+async def dummy_password_hash() -> str:
+    """Return the hash to verify the password against when the user does not exist, so a login
+    for an unknown username takes the same time of a wrong password and does not reveal it.
+
+    Raises:
+        HasherOverloadedError: when the hasher pool backlog is full on the first call.
+
+    Returns:
+        str: hash of a random password, with the configured scheme and cost.
+    """
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = await CONTAINER.get(IPasswordHasher).hash(token_hex(16))
+    return _DUMMY_HASH
+
+
+# The users changed by any node, this one included, are evicted.
+CONTAINER.get(IInvalidationBus).subscribe(InvalidationKind.USER, evict_user)
+
+
+# Private functions.
+def _key(username: str) -> str:
+    """Return the key of the username in the caches, the same for every case."""
+    return username.casefold()
+
+
+async def _load_user(username: str) -> Optional[UserRecord]:
+    """Read the user from the database and cache the result, unless invalidated meanwhile."""
+    key = _key(username)
+    try:
+        user = await CONTAINER.get(IUserRepository).get(username)
+    except Exception:
+        if _LOADS.get(key) is asyncio.current_task():
+            del _LOADS[key]
+        raise
+
+    if _LOADS.get(key) is asyncio.current_task():
+        del _LOADS[key]
+        if user is None:
+            remember_unknown_user(username)
+        else:
+            _USERS.put(key, user, time() + _USER_CACHE_CONFIG.get("ttl", 10))
+    return user
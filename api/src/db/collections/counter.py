@@ -0,0 +1,14 @@
+from typing import Dict
+
+from beanie import Document
+
+
+class Counter(Document):
+    """Counters kept up to date with $inc, one document per counted collection keyed by a fixed _id."""
+
+    total: int = 0
+    # Counts by role, a document with many roles is counted once per role.
+    roles: Dict[str, int] = {}
+
+    class Settings:
+        name = "counters"
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from beanie import Document
+
+
+class InvalidationEvent(Document):
+    """Cache invalidation event, stored in a capped collection tailed by every node."""
+
+    kind: str
+    key: str
+    # Identifier of the publishing process, that skips its own events.
+    origin: str
+    at: datetime
+
+    class Settings:
+        name = "invalidations"
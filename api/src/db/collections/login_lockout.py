@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from beanie import Document, Indexed
+from pymongo import ASCENDING, IndexModel
+
+
+class LoginLockout(Document):
+    username: Indexed(str, unique=True)
+    failures: int
+    # The document is removed by the TTL index a day after the lockout end.
+    locked_until: datetime
+
+    class Settings:
+        name = "login_lockouts"
+        indexes = [
+            IndexModel(
+                [("locked_until", ASCENDING)],
+                name="locked_until_ttl",
+                expireAfterSeconds=86400,
+            )
+        ]
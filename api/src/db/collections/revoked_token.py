@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from beanie import Document, Indexed
+from pymongo import ASCENDING, IndexModel
+
+
+class RevokedToken(Document):
+    jti: Indexed(str, unique=True)
+    # The document is removed by the TTL index once the token is expired.
+    exp: datetime
+
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            IndexModel([("exp", ASCENDING)], name="exp_ttl", expireAfterSeconds=0)
+        ]
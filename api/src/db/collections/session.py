@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from beanie import Document, Indexed
+from pymongo import ASCENDING, IndexModel
+
+
+class Session(Document):
+    # Digest of the opaque token, the token itself is never stored.
+    digest: Indexed(str, unique=True)
+    claims: dict
+    # The document is removed by the TTL index once the session is expired.
+    exp: datetime
+
+    class Settings:
+        name = "sessions"
+        indexes = [
+            IndexModel([("exp", ASCENDING)], name="exp_ttl", expireAfterSeconds=0)
+        ]
@@ -1,16 +1,50 @@
 from datetime import datetime
-from typing import List
+from typing import Final, List
 
 from beanie import Document, Indexed
+from pymongo import ASCENDING, IndexModel
+from pymongo.collation import Collation, CollationStrength
+
+# Case-insensitive comparison of the usernames and emails. The queries on them must
+# pass it too, otherwise the indexes are not used and the collection is scanned.
+CASE_INSENSITIVE: Final[Collation] = Collation(
+    locale="en", strength=CollationStrength.SECONDARY
+)
 
 
 class User(Document):
-    email: Indexed(str, unique=True)
-    username: Indexed(str, unique=True)
+    email: str
+    username: str
     password: str
     roles: List[str]
     creation: datetime
-    last_update: datetime
+    # Indexed for the incremental refresh of the token epochs.
+    last_update: Indexed(datetime)
+    # Bumped to invalidate every token issued to the user.
+    token_version: int = 0
+    # Incremented by every update, returned as ETag for the conditional updates.
+    revision: int = 0
 
     class Settings:
         name = "users"
+        indexes = [
+            # Unique whatever the case, "Mario.Rossi" and "mario.rossi" are the same user.
+            IndexModel(
+                [("username", ASCENDING)],
+                name="username_ci",
+                unique=True,
+                collation=CASE_INSENSITIVE,
+            ),
+            IndexModel(
+                [("email", ASCENDING)],
+                name="email_ci",
+                unique=True,
+                collation=CASE_INSENSITIVE,
+            ),
+            # Only the admins are indexed, a handful of entries whatever the number of users.
+            IndexModel(
+                [("roles", ASCENDING)],
+                name="admins",
+                partialFilterExpression={"roles": "admin"},
+            ),
+        ]
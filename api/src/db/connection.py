@@ -1,11 +1,25 @@
+import asyncio
+import sys
 from os import environ
-from typing import Final
+from os.path import join
+from time import perf_counter
+from typing import Any, Dict, Final, List, Optional, Type
 
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
-from src.db.collections import user
+from beanie import Document, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from src.db.collections import (
+    counter,
+    invalidation_event,
+    login_lockout,
+    revoked_token,
+    session,
+    user,
+)
+from src.db.monitoring import POOL_MONITOR
+from src.helpers.container import CONTAINER
+from src.services.logger.interfaces.i_logger import ILogger
+from yaml import safe_load
 
-# TODO: Move to config file.
 # TODO: Handle correctly secrets.
 _DATABASE_USERNAME: Final[str] = environ["DB_USERNAME"]
 _DATABASE_PASSOWRD: Final[str] = environ["DB_PASSWORD"]
@@ -15,9 +29,88 @@ _DATABASE_NAME: Final[str] = environ["DB_NAME"]
 
 _CONNECTION_STRING = f"mongodb://{_DATABASE_USERNAME}:{_DATABASE_PASSOWRD}@{_DATABASE_HOST}:{_DATABASE_PORT}/{_DATABASE_NAME}"
 
+# Read configuration file for the connection pool.
+DB_CONFIG: Final[Dict[str, Any]]
+try:
+    config_file_path = join(environ["CONFIGS_DIR"], "db", "connection.yaml")
+    with open(config_file_path) as config_file_stream:
+        DB_CONFIG = safe_load(config_file_stream)
+except Exception as e:
+    logger = CONTAINER.get(ILogger)
+    logger.critical(
+        "errors", f"An error occured while reading the configuration file in {__file__}"
+    )
+    sys.exit()
+
+_POOL_CONFIG: Final[Dict[str, Any]] = DB_CONFIG.get("pool", {})
+
+# Who manages the indexes: "startup" every process at start, "migration" only
+# python -m src.db.migrate, run once per deploy.
+INDEX_MANAGEMENT: Final[str] = DB_CONFIG.get("indexes", "startup")
+
+DOCUMENT_MODELS: Final[List[Type[Document]]] = [
+    user.User,
+    revoked_token.RevokedToken,
+    session.Session,
+    login_lockout.LoginLockout,
+    counter.Counter,
+    invalidation_event.InvalidationEvent,
+]
 
-async def build_client() -> None:
-    client = AsyncIOMotorClient(_CONNECTION_STRING)
+
+def _client_options() -> Dict[str, Any]:
+    """Return the pool and timeout options of the client, the missing ones are left to the driver."""
+    options = {
+        "maxPoolSize": _POOL_CONFIG.get("max_pool_size"),
+        "minPoolSize": _POOL_CONFIG.get("min_pool_size"),
+        "maxIdleTimeMS": _POOL_CONFIG.get("max_idle_time_ms"),
+        "waitQueueTimeoutMS": _POOL_CONFIG.get("wait_queue_timeout_ms"),
+        "serverSelectionTimeoutMS": DB_CONFIG.get("server_selection_timeout_ms"),
+        "connectTimeoutMS": DB_CONFIG.get("connect_timeout_ms"),
+    }
+    return {option: value for option, value in options.items() if value is not None}
+
+
+async def _warm_up(database: AsyncIOMotorDatabase, connections: int) -> None:
+    """Open the given number of connections with concurrent pings, each one checks out its own connection."""
+    started = perf_counter()
+    await asyncio.gather(*(database.command("ping") for _ in range(connections)))
+    logger = CONTAINER.get(ILogger)
+    logger.info(
+        "core",
+        f"Database pool warmed up with {POOL_MONITOR.stats().open_connections} connections "
+        f"in {(perf_counter() - started) * 1000:.0f} ms",
+    )
+
+
+async def build_client(manage_indexes: Optional[bool] = None) -> None:
+    """Connect to the database and initialize the document models.
+
+    Args:
+        manage_indexes (Optional[bool], optional): create the missing indexes and drop the stale ones,
+            when None the configured index management applies. Defaults to None.
+    """
+    if manage_indexes is None:
+        manage_indexes = INDEX_MANAGEMENT == "startup"
+
+    started = perf_counter()
+    client = AsyncIOMotorClient(
+        _CONNECTION_STRING, event_listeners=[POOL_MONITOR], **_client_options()
+    )
+    # Beanie always sends a createIndexes, a no-op on the server when the indexes exist,
+    # only dropping and rebuilding the stale ones can be turned off.
     await init_beanie(
-        client[_DATABASE_NAME], document_models=[user.User], allow_index_dropping=True
+        client[_DATABASE_NAME],
+        document_models=DOCUMENT_MODELS,
+        allow_index_dropping=manage_indexes,
+    )
+    logger = CONTAINER.get(ILogger)
+    logger.info(
+        "core",
+        f"Database initialized in {(perf_counter() - started) * 1000:.0f} ms, "
+        f"index dropping {'enabled' if manage_indexes else 'disabled'}",
     )
+
+    # The first requests would otherwise pay for opening the connections.
+    if DB_CONFIG.get("warm_up", True):
+        await _warm_up(client[_DATABASE_NAME], _POOL_CONFIG.get("min_pool_size", 0))
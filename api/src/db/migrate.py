@@ -0,0 +1,71 @@
+"""Create the indexes of every collection, drop the stale ones and verify the result,
+then count the users again to fix any drift of the users counters.
+
+With indexes set to "migration" in configs/db/connection.yaml the processes
+never drop or rebuild indexes at startup, run this once per deploy instead,
+before starting the workers:
+python -m src.db.migrate
+The exit status is 1 if an index is still missing.
+"""
+import asyncio
+import sys
+from typing import List, Type
+
+from beanie import Document
+from pymongo import IndexModel
+from src.core.counters import rebuild_user_counters
+from src.db.connection import DOCUMENT_MODELS, build_client
+
+
+def expected_index_names(document_model: Type[Document]) -> List[str]:
+    """Return the names of the indexes declared by the document model.
+
+    Args:
+        document_model (Type[Document]): initialized document model.
+
+    Returns:
+        List[str]: names of the Indexed fields indexes and of the Settings indexes.
+    """
+    # Indexed fields get the default name, as when Beanie creates them.
+    index_names = [
+        IndexModel([(field.alias, field.type_._indexed[0])]).document["name"]
+        for field in document_model.__fields__.values()
+        if getattr(field.type_, "_indexed", None)
+    ]
+    index_names += [
+        index.document["name"] for index in document_model.get_settings().indexes
+    ]
+    return index_names
+
+
+async def migrate() -> List[str]:
+    """Create the missing indexes, drop the stale ones, rebuild the users counters and return the indexes still missing.
+
+    Returns:
+        List[str]: missing indexes as "<collection>.<index name>", empty on success.
+    """
+    await build_client(manage_indexes=True)
+
+    missing = []
+    for document_model in DOCUMENT_MODELS:
+        collection = document_model.get_motor_collection()
+        existing = await collection.index_information()
+        missing += [
+            f"{collection.name}.{index_name}"
+            for index_name in expected_index_names(document_model)
+            if index_name not in existing
+        ]
+
+    await rebuild_user_counters()
+    return missing
+
+
+if __name__ == "__main__":
+    missing_indexes = asyncio.run(migrate())
+    for index in missing_indexes:
+        print(f"Missing index {index}")
+    if missing_indexes:
+        sys.exit(1)
+    print(
+        f"Indexes of {len(DOCUMENT_MODELS)} collections created and verified, users counted."
+    )
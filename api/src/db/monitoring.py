@@ -0,0 +1,119 @@
+from threading import Lock, local
+from time import perf_counter
+from typing import Final
+
+from pymongo import monitoring
+from src.models.metrics import PoolStats
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool listener keeping the gauges and the checkout wait times of the pools.
+
+    The driver publishes the events from its own threads, a check out starts and
+    ends on the same thread so the start time is kept per thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._local = local()
+        self._max_pool_size = 0
+        self._min_pool_size = 0
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._checkout_wait_total = 0.0
+        self._checkout_wait_max = 0.0
+        self._pool_clears = 0
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._max_pool_size = event.options.get("maxPoolSize", 0)
+            self._min_pool_size = event.options.get("minPoolSize", 0)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._pool_clears += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._open += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._open -= 1
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ) -> None:
+        self._local.checkout_started = perf_counter()
+        with self._lock:
+            self._waiting += 1
+
+    def connection_check_out_failed(
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ) -> None:
+        self._checkout_ended()
+        with self._lock:
+            self._checkout_failures += 1
+
+    def connection_checked_out(
+        self, event: monitoring.ConnectionCheckedOutEvent
+    ) -> None:
+        wait = self._checkout_ended()
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._checkout_wait_total += wait
+            self._checkout_wait_max = max(self._checkout_wait_max, wait)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._in_use -= 1
+
+    def stats(self) -> PoolStats:
+        """Return a snapshot of the pools usage.
+
+        Returns:
+            PoolStats: pool gauges and checkout counters.
+        """
+        with self._lock:
+            return PoolStats(
+                max_pool_size=self._max_pool_size,
+                min_pool_size=self._min_pool_size,
+                open_connections=self._open,
+                in_use=self._in_use,
+                waiting=self._waiting,
+                checkouts=self._checkouts,
+                checkout_failures=self._checkout_failures,
+                checkout_wait_avg_ms=(
+                    self._checkout_wait_total / self._checkouts * 1000
+                    if self._checkouts
+                    else 0.0
+                ),
+                checkout_wait_max_ms=self._checkout_wait_max * 1000,
+                pool_clears=self._pool_clears,
+            )
+
+    # Private methods.
+    def _checkout_ended(self) -> float:
+        """Return the seconds waited by the check out of the current thread."""
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        with self._lock:
+            self._waiting -= 1
+        return 0.0 if started is None else perf_counter() - started
+
+
+# Listener of the client built by src.db.connection.build_client.
+POOL_MONITOR: Final[PoolMonitor] = PoolMonitor()
@@ -3,8 +3,36 @@ from os.path import join
 from typing import Final
 
 from injector import Binder, Injector, singleton
+from src.services.hasher.implementations.pool_hasher import PoolPasswordHasher
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.invalidation.implementations.tailing_invalidation_bus import (
+    TailingInvalidationBus,
+)
+from src.services.invalidation.interfaces.i_invalidation_bus import IInvalidationBus
 from src.services.logger.implementations.logger import TimedLogger
 from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.enums.backend import RepositoryBackend
+from src.services.repository.implementations.beanie_user_repository import (
+    BeanieUserRepository,
+)
+from src.services.repository.implementations.memory_user_repository import (
+    MemoryUserRepository,
+)
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+from src.services.session.implementations.sharded_session_store import (
+    ShardedSessionStore,
+)
+from src.services.session.interfaces.i_session_store import ISessionStore
+from src.services.throttle.implementations.token_bucket_throttle import (
+    TokenBucketLoginThrottle,
+)
+from src.services.throttle.interfaces.i_login_throttle import ILoginThrottle
+
+# Storage of the users, "memory" runs the api without a database, e.g. to profile
+# and load test the http and auth layers on a single machine.
+USER_REPOSITORY_BACKEND: Final[RepositoryBackend] = RepositoryBackend(
+    environ.get("USER_REPOSITORY", RepositoryBackend.BEANIE.value)
+)
 
 
 def resolve(binder: Binder) -> None:
@@ -23,5 +51,33 @@ def resolve(binder: Binder) -> None:
     logger = TimedLogger(config_file_path=logger_config_file_path)
     binder.bind(ILogger, to=logger, scope=singleton)
 
+    hasher_config_file_path = join(environ["CONFIGS_DIR"], "auth", "hasher.yaml")
+    hasher = PoolPasswordHasher(config_file_path=hasher_config_file_path)
+    binder.bind(IPasswordHasher, to=hasher, scope=singleton)
+
+    sessions_config_file_path = join(environ["CONFIGS_DIR"], "auth", "sessions.yaml")
+    session_store = ShardedSessionStore(config_file_path=sessions_config_file_path)
+    binder.bind(ISessionStore, to=session_store, scope=singleton)
+
+    throttle_config_file_path = join(environ["CONFIGS_DIR"], "auth", "throttling.yaml")
+    login_throttle = TokenBucketLoginThrottle(
+        config_file_path=throttle_config_file_path
+    )
+    binder.bind(ILoginThrottle, to=login_throttle, scope=singleton)
+
+    invalidation_config_file_path = join(
+        environ["CONFIGS_DIR"], "auth", "invalidation.yaml"
+    )
+    invalidation_bus = TailingInvalidationBus(
+        config_file_path=invalidation_config_file_path
+    )
+    binder.bind(IInvalidationBus, to=invalidation_bus, scope=singleton)
+
+    if USER_REPOSITORY_BACKEND == RepositoryBackend.MEMORY:
+        user_repository = MemoryUserRepository()
+    else:
+        user_repository = BeanieUserRepository()
+    binder.bind(IUserRepository, to=user_repository, scope=singleton)
+
 
 CONTAINER: Final[Injector] = Injector([resolve])
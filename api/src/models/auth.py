@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
 
 
 class AuthMessage(BaseModel):
@@ -7,3 +9,21 @@ class AuthMessage(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str
+
+
+class IntrospectionRequest(BaseModel):
+    """Class that represent a batch of tokens to introspect."""
+
+    tokens: List[str] = Field(..., description="Access tokens to verify.", min_items=1)
+
+
+class TokenIntrospection(BaseModel):
+    """Class that represent the introspection result of a single token."""
+
+    active: bool = Field(..., description="True if the token is a valid access token.")
+    claims: Optional[Dict[str, Any]] = Field(
+        default=None, description="Decoded token, present if the token is active."
+    )
+    error: Optional[str] = Field(
+        default=None, description="Reason why the token is not active."
+    )
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    """Snapshot of an in-process cache usage."""
+
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+
+
+class RevocationStats(BaseModel):
+    """Snapshot of the revoked refresh tokens filter usage."""
+
+    bloom_items: int
+    bloom_capacity: int
+    bloom_bits: int
+    bloom_hashes: int
+    # Checks answered by the filter alone are checks - database_checks.
+    checks: int
+    database_checks: int
+    false_positives: int
+    last_rebuild: Optional[datetime]
+
+
+class EpochStats(BaseModel):
+    """Snapshot of the token epochs map usage."""
+
+    size: int
+    # Checks answered by the map alone are checks - database_reads.
+    checks: int
+    database_reads: int
+    rejections: int
+    watermark: Optional[datetime]
+
+
+class PoolStats(BaseModel):
+    """Snapshot of the database connection pools usage."""
+
+    max_pool_size: int
+    min_pool_size: int
+    open_connections: int
+    in_use: int
+    # Operations waiting for a connection right now.
+    waiting: int
+    checkouts: int
+    checkout_failures: int
+    checkout_wait_avg_ms: float
+    checkout_wait_max_ms: float
+    pool_clears: int
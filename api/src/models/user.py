@@ -56,6 +56,16 @@ class BaseUserRoles(BaseModel):
         return roles
 
 
+class BaseRevision(BaseModel):
+    """Class for projecting the user revision, returned as ETag header and never in the body."""
+
+    revision: int = Field(
+        default=0,
+        exclude=True,
+        description="User revision, incremented by every update.",
+    )
+
+
 class UserRegistration(BaseUser):
     """Class for representing the autonomus user registration into the system."""
 
@@ -74,20 +84,20 @@ class UserLogin(BaseUser, BaseUserRoles):
     pass
 
 
-class UserPartialDetails(BaseUsername, BaseUserRoles):
+class UserPartialDetails(BaseUsername, BaseUserRoles, BaseRevision):
     """Class for projection containing partial user details: username, roles and creation date."""
 
     creation: datetime
 
 
-class UserPartialDetailsAdmin(BaseUser, BaseUserRoles):
+class UserPartialDetailsAdmin(BaseUser, BaseUserRoles, BaseRevision):
     """Class for projection containing partial user details: email, username, roles, craetion and last update dates."""
 
     creation: datetime
     last_update: datetime
 
 
-class CurrentUserDetails(BaseUser, BaseUserRoles):
+class CurrentUserDetails(BaseUser, BaseUserRoles, BaseRevision):
     """Class for projection containing the current user complete details: email, username, roles, creation and update dates."""
 
     creation: datetime
@@ -1,22 +1,34 @@
-from datetime import timedelta
-from os import environ
-from typing import Any, Dict, Final
+import json
+from hashlib import sha256
+from math import ceil
+from typing import Any, Dict, Final, List
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from jose.exceptions import JWTError
 from pydantic import BaseModel
-from src.core import auth
-from src.core.exceptions import DecodeTokenError, ValidateTokenError
-from src.db.collections import user as db_user
+from src.core import auth, users
+from src.core.exceptions import DecodeTokenError, HasherOverloadedError
 from src.helpers.container import CONTAINER
-from src.models.auth import AuthMessage
-from src.models.commons import HttpExceptionMessage
-from src.models.user import UserLogin
+from src.models.auth import AuthMessage, IntrospectionRequest, TokenIntrospection
+from src.models.commons import BaseMessage, HttpExceptionMessage
+from src.models.user import Role
 from src.routes.enums.commons import Endpoint
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
 from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+from src.services.throttle.interfaces.i_login_throttle import ILoginThrottle
 
 # Router instantiation.
 router = APIRouter()
@@ -29,10 +41,18 @@ _LOGIN_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
             "model": HttpExceptionMessage,
             "description": "Unsuccesful login, wrong email or password",
         },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "model": HttpExceptionMessage,
+            "description": "Too many login attempts for the username or from the client, retry after the Retry-After seconds",
+        },
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             "model": HttpExceptionMessage,
             "description": "An errorr occured during the token creation",
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": HttpExceptionMessage,
+            "description": "Too many credentials are being verified, retry later",
+        },
     },
     Endpoint.DESCRIPTION: "Authenticate an user given username and password to return a set of access and refresh tokens after a succesful validation.",
 }
@@ -45,68 +65,87 @@ _LOGIN_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
     description=_LOGIN_POST_PARAMS[Endpoint.DESCRIPTION],
 )
 async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
     request_form: OAuth2PasswordRequestForm = Depends(),
 ):
     logger = CONTAINER.get(ILogger)
+    hasher = CONTAINER.get(IPasswordHasher)
+    login_throttle = CONTAINER.get(ILoginThrottle)
     response: BaseModel
     status_code: int
 
+    # Over limit attempts are rejected before spending a db lookup and a hash on them.
+    # Usernames are lowercase, the case cannot be used to get more attempts.
+    throttle_key = request_form.username.lower()
+    client_ip = request.client.host if request.client is not None else ""
+    retry_after = login_throttle.check(throttle_key, client_ip)
+    if retry_after is not None:
+        logger.warning(
+            "routes", f"Login throttled for {request_form.username} from {client_ip}."
+        )
+        raise HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, retry later.",
+            headers={"Retry-After": str(ceil(retry_after))},
+        )
+
     # Query to get the requested user.
-    user_res = await db_user.User.find_one(
-        db_user.User.username == request_form.username
-    )
+    # Usernames recently found or not found are answered without the database.
+    user_res = await users.get_user(request_form.username)
 
     msg = "Invalid username or password"
+
+    # Check if the input password match the stored one,
+    # but before doing so the password to check must be hashed, and then compared.
+    # The hash runs in the hasher pool to keep the event loop free.
+    # When the user does not exist a dummy hash is verified, so the response time is the same.
+    try:
+        hashed_password = (
+            user_res.password
+            if user_res is not None
+            else await users.dummy_password_hash()
+        )
+        valid_password = await hasher.verify(request_form.password, hashed_password)
+    except HasherOverloadedError as e:
+        logger.warning("routes", e.loggable)
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.msg,
+            headers={"Retry-After": "1"},
+        )
+
     # Search if user exists in DB.
     # The user does not exists.
-
     if user_res is None:
         logger.warning("routes", f"{request_form.username} user not found in database.")
+        await login_throttle.record_failure(throttle_key)
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=msg)
 
-    # A projecton is not made because the password is required to check if the user has th
-    user_projection = UserLogin(
-        email=user_res.email, username=user_res.username, roles=user_res.roles
-    )
-
-    # Check if the input password match the stored one,
-    # but before doing so the password to check must be hashed, and then compared.
-    if not auth.verify_password(
-        # request_form.password, DB_USERS[request_form.username]["password"]
-        request_form.password,
-        user_res.password,
-    ):
+    if not valid_password:
         logger.warning("routes", f"Wrong password for {request_form.username}.")
+        await login_throttle.record_failure(throttle_key)
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=msg)
+    await login_throttle.record_success(throttle_key, client_ip)
 
-    # The user exists.
-    # Converting expriation times to timedelta.
-    try:
-        access_timedelta = timedelta(minutes=auth.JWT_CONFIG["access_expiration"])
-        refresh_timedelta = timedelta(minutes=auth.JWT_CONFIG["refresh_expiration"])
-    except KeyError as e:
-        msg = f"An error occured while retriving the tokens expiration times"
-        logger.error("routes", f"{msg}: {e}")
-        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
+    # Hashes made with an old scheme or cost are upgraded after the response is sent,
+    # so a cost change rolls out at the next login of every user.
+    if hasher.needs_update(user_res.password):
+        background_tasks.add_task(
+            _rehash_password,
+            user_res.username,
+            request_form.password,
+            user_res.password,
+        )
 
-    # Generating access and refresh tokens.
+    # The user exists.
+    # Generating access and refresh tokens, both carry the current token version of the user.
     try:
-        access_token = auth.create_token(
-            user_projection.dict(),
-            access_timedelta,
-            False,
-            environ["SECRET_KEY"],
-            auth.JWT_CONFIG["algorithm"],
-        )
-        refresh_token = auth.create_token(
-            user_projection.dict(),
-            refresh_timedelta,
-            True,
-            environ["SECRET_KEY"],
-            auth.JWT_CONFIG["algorithm"],
+        access_token, refresh_token = await auth.issue_token_pair(
+            auth.token_claims(user_res.username, user_res.roles, user_res.token_version)
         )
     except KeyError as e:
-        msg = f"An error occured while retriving the secret or the algorithm to encode the tokens"
+        msg = f"An error occured while retriving the secret, the algorithm or the expiration times to encode the tokens"
         logger.error("routes", f"{msg}: {e}")
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
     except JWTError as e:
@@ -119,12 +158,51 @@ async def login(
     )
     status_code = status.HTTP_200_OK
 
-    logger.info(
-        "routes", f"Successfully generated token for {user_projection.username}"
-    )
+    logger.info("routes", f"Successfully generated token for {user_res.username}")
     return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
 
 
+async def _rehash_password(
+    username: str, plain_password: str, hashed_password: str
+) -> None:
+    """Hash again the password of an user with the configured scheme and cost.
+
+    Args:
+        username (str): username of the user.
+        plain_password (str): password just verified.
+        hashed_password (str): outdated stored hash.
+    """
+    logger = CONTAINER.get(ILogger)
+    hasher = CONTAINER.get(IPasswordHasher)
+
+    try:
+        new_hashed_password = await hasher.hash(plain_password)
+        # The hash is replaced only if the password did not change in the meanwhile.
+        await CONTAINER.get(IUserRepository).update_password(
+            username, hashed_password, new_hashed_password
+        )
+        await users.publish_user_change(username)
+    except HasherOverloadedError as e:
+        # The password will be rehashed at the next login.
+        logger.warning("routes", e.loggable)
+    except Exception as e:
+        logger.error("routes", f"Password rehash failed for {username}: {e}")
+
+
+async def _revoke_all_sessions(username: str) -> None:
+    """End every session of an user whose refresh token has been reused, it may have been stolen.
+
+    Args:
+        username (str): username of the user.
+    """
+    # Whoever rotated the token first may be the thief, every token of the user is revoked.
+    try:
+        await auth.TOKEN_EPOCHS.revoke_all(username)
+        await users.publish_user_change(username)
+    except Exception as e:
+        CONTAINER.get(ILogger).error("routes", str(e))
+
+
 _REFRESH_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
     Endpoint.RESPONSE_MODEL: AuthMessage,
     Endpoint.RESPONSES: {
@@ -141,7 +219,7 @@ _REFRESH_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
             "description": "An error occured while refreshing the token",
         },
     },
-    Endpoint.DESCRIPTION: "Token refresh route to provide a new set of access and refresh token. The new set will be generated from the refresh token, if this one is expired then login is newly required.",
+    Endpoint.DESCRIPTION: "Token refresh route to provide a new set of access and refresh token. The new set will be generated from the refresh token, if this one is expired then login is newly required. Each refresh token can be used only once, it is revoked by the refresh.",
 }
 
 
@@ -162,65 +240,84 @@ async def refresh(
 
     # Decode token.
     try:
-        decoded_token = auth.decode_token(refresh_token)
+        decoded_token = await auth.resolve_token(refresh_token)
         logger.debug("routes", f"Decoded token {decoded_token}")
     except DecodeTokenError as e:
         logger.warning("routes", e.loggable)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.msg)
 
-    # Validate the token.
-    try:
-        _ = auth.valid_refresh_token(decoded_token)
-    except ValidateTokenError as e:
-        logger.warning("routes", e.loggable)
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.msg)
+    # Validate the token, it must be a refresh token carrying its id.
+    # Legacy tokens without one are accepted once, while legacy tokens are accepted.
+    token_id = auth.refresh_token_id(refresh_token, decoded_token)
+    if not auth.valid_refresh_token(decoded_token) or token_id is None:
+        logger.warning("routes", f"Invalid refresh token fields {list(decoded_token)}")
+        msg = "The provided token is not a refresh token, login again."
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=msg)
+    username = auth.token_username(decoded_token)
 
-    # If username not in db raise exception.
-    user_res = await db_user.User.find_one(
-        db_user.User.username == decoded_token["username"]
-    )
+    # A refresh token can be used once, the already used or logged out ones are rejected.
+    # The revocation filter answers without the database for the tokens never revoked.
+    # Opaque tokens are revoked by deleting their session, the claim below is the check.
+    revoked = False
+    if not auth.OPAQUE_TOKENS:
+        try:
+            revoked = await auth.REVOCATION_STORE.is_revoked(token_id)
+        except Exception as e:
+            logger.error("routes", str(e))
+            msg = f"An unknown exception occured, maybe bad db connection"
+            raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
-    if user_res is None:
+    if revoked:
         logger.warning(
-            "routes", f"{decoded_token.get('username')} user not found in database."
+            "routes",
+            f"Revoked refresh token reused for {username}, it may have been stolen.",
         )
+        await _revoke_all_sessions(username)
+        msg = "The provided token has been revoked, login again."
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=msg)
+
+    # If username not in db raise exception.
+    # Usernames recently found or not found are answered without the database.
+    user_res = await users.get_user(username)
+
+    if user_res is None:
+        logger.warning("routes", f"{username} user not found in database.")
         msg = "The token contains informations of an unexisting user."
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail=msg)
 
-    # The token is valid and is about an existing user, generate a new token pair.
-
-    # A projecton is not made because the password is required to check if the user has th
-    user_projection = UserLogin(
-        email=user_res.email, username=user_res.username, roles=user_res.roles
-    )
+    # Tokens issued before a role change, a deletion or a revocation of every session are rejected.
+    if decoded_token.get("ver", 0) < user_res.token_version:
+        logger.warning(
+            "routes", f"Outdated token version in refresh token of {user_res.username}"
+        )
+        msg = "The provided token has been revoked, login again."
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=msg)
 
-    # Converting expriation times to timedelta.
+    # The token is valid and is about an existing user, rotate it and generate a new token pair.
+    # Revoking is an atomic claim, only one of concurrent refreshes with the same token succeeds.
     try:
-        access_timedelta = timedelta(minutes=auth.JWT_CONFIG["access_expiration"])
-        refresh_timedelta = timedelta(minutes=auth.JWT_CONFIG["refresh_expiration"])
-    except KeyError as e:
-        msg = f"An error occured while retriving the tokens expiration times"
-        logger.error("routes", f"{msg}: {e}")
+        claimed = await auth.revoke_refresh_token(refresh_token, decoded_token)
+    except Exception as e:
+        logger.error("routes", str(e))
+        msg = f"An unknown exception occured, maybe bad db connection"
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
+    if not claimed:
+        logger.warning(
+            "routes",
+            f"Refresh token of {user_res.username} used concurrently, it may have been stolen.",
+        )
+        await _revoke_all_sessions(user_res.username)
+        msg = "The provided token has been revoked, login again."
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=msg)
+
     # Generating access and refresh tokens.
     try:
-        new_access_token = auth.create_token(
-            user_projection.dict(),
-            access_timedelta,
-            False,
-            environ["SECRET_KEY"],
-            auth.JWT_CONFIG["algorithm"],
-        )
-        new_refresh_token = auth.create_token(
-            user_projection.dict(),
-            refresh_timedelta,
-            True,
-            environ["SECRET_KEY"],
-            auth.JWT_CONFIG["algorithm"],
+        new_access_token, new_refresh_token = await auth.issue_token_pair(
+            auth.token_claims(user_res.username, user_res.roles, user_res.token_version)
         )
     except KeyError as e:
-        msg = f"An error occured while retriving the secret or the algorithm to encode the tokens"
+        msg = f"An error occured while retriving the secret, the algorithm or the expiration times to encode the tokens"
         logger.error("routes", f"{msg}: {e}")
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
     except JWTError as e:
@@ -236,7 +333,173 @@ async def refresh(
     )
     status_code = status.HTTP_200_OK
 
+    logger.info("routes", f"Successfully refreshed token for {user_res.username}")
+    return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
+
+
+_LOGOUT_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: BaseMessage,
+    Endpoint.RESPONSES: {
+        status.HTTP_403_FORBIDDEN: {
+            "model": HttpExceptionMessage,
+            "description": "The token may be expired, invalid or not a refresh token.",
+        },
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            "model": HttpExceptionMessage,
+            "description": "An error occured while revoking the token",
+        },
+    },
+    Endpoint.DESCRIPTION: "Revoke the given refresh token, it will not be possible to refresh with it anymore. The access tokens already issued stay valid until their expiration.",
+}
+
+
+@router.post(
+    "/logout",
+    response_model=_LOGOUT_POST_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_LOGOUT_POST_PARAMS[Endpoint.RESPONSES],
+    description=_LOGOUT_POST_PARAMS[Endpoint.DESCRIPTION],
+)
+async def logout(
+    refresh_token: str | None = Header(default=None),
+):
+    logger = CONTAINER.get(ILogger)
+    decoded_token: dict
+
+    # Decode token.
+    try:
+        decoded_token = await auth.resolve_token(refresh_token)
+    except DecodeTokenError as e:
+        logger.warning("routes", e.loggable)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.msg)
+
+    if (
+        not auth.valid_refresh_token(decoded_token)
+        or auth.refresh_token_id(refresh_token, decoded_token) is None
+    ):
+        msg = "The provided token is not a refresh token."
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=msg)
+
+    # Revoking an already revoked token is not an error, logout is idempotent.
+    try:
+        await auth.revoke_refresh_token(refresh_token, decoded_token)
+    except Exception as e:
+        logger.error("routes", str(e))
+        msg = f"An unknown exception occured, maybe bad db connection"
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
+
     logger.info(
-        "routes", f"Successfully refreshed token for {user_projection.username}"
+        "routes", f"Successfully logged out {auth.token_username(decoded_token)}"
+    )
+    response = BaseMessage(message="OK")
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content=jsonable_encoder(response)
+    )
+
+
+_JWKS_GET_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSES: {
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The key set did not change since the one identified by If-None-Match",
+        },
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            "model": HttpExceptionMessage,
+            "description": "An error occured while reading the signing keys",
+        },
+    },
+    Endpoint.DESCRIPTION: "JSON Web Key Set with the public keys of the token signatures, other services can cache it to verify the tokens locally. The key set is empty when the tokens are signed with a symmetric secret.",
+}
+
+
+@router.get(
+    "/.well-known/jwks.json",
+    responses=_JWKS_GET_PARAMS[Endpoint.RESPONSES],
+    description=_JWKS_GET_PARAMS[Endpoint.DESCRIPTION],
+)
+async def jwks(if_none_match: str | None = Header(default=None)):
+    logger = CONTAINER.get(ILogger)
+
+    try:
+        key_set = auth.public_key_set()
+    except (KeyError, OSError) as e:
+        msg = "An error occured while reading the signing keys"
+        logger.error("routes", f"{msg}: {e}")
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
+
+    # The ETag lets verifiers revalidate their cached copy without downloading it again.
+    content = json.dumps(key_set, separators=(",", ":"), sort_keys=True)
+    etag = f'"{sha256(content.encode()).hexdigest()[:32]}"'
+    headers = {
+        "Cache-Control": f"public, max-age={auth.JWT_CONFIG.get('jwks_max_age', 300)}",
+        "ETag": etag,
+    }
+
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(
+        status_code=status.HTTP_200_OK,
+        content=content,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+_INTROSPECT_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: List[TokenIntrospection],
+    Endpoint.RESPONSES: {
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": HttpExceptionMessage,
+            "description": "Unauthorized",  # Exception raised by the require_admin function (see Endpoint.DEPENDENCIES).
+        },
+        status.HTTP_403_FORBIDDEN: {
+            "model": HttpExceptionMessage,
+            "description": f"Forbidden access, {Role.ADMIN} role required",  # Exception raised by the require_admin function (see Endpoint.DEPENDENCIES).
+        },
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+            "model": HttpExceptionMessage,
+            "description": "Too many tokens in a single request",
+        },
+    },
+    Endpoint.DESCRIPTION: "Verify a batch of access tokens in a single request, the results are in the same order of the tokens. Meant for gateways, this endpoint execution is limited to users having the admin role.",
+    Endpoint.DEPENDENCIES: [Depends(auth.require_admin)],
+}
+
+
+@router.post(
+    "/introspect",
+    response_model=_INTROSPECT_POST_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_INTROSPECT_POST_PARAMS[Endpoint.RESPONSES],
+    description=_INTROSPECT_POST_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_INTROSPECT_POST_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def introspect(introspection_request: IntrospectionRequest):
+    logger = CONTAINER.get(ILogger)
+    max_tokens: int = auth.JWT_CONFIG.get("introspect_max_tokens", 100)
+
+    if len(introspection_request.tokens) > max_tokens:
+        msg = f"At most {max_tokens} tokens can be introspected in a single request"
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=msg)
+
+    # Repeated tokens are verified once, the verified ones come from the token cache.
+    results: Dict[str, TokenIntrospection] = {}
+    for token in introspection_request.tokens:
+        if token not in results:
+            results[token] = await auth.introspect_token(token)
+
+    # Active tokens must also carry the current token version of their user.
+    for token, result in results.items():
+        if result.active and not await auth.TOKEN_EPOCHS.is_current(
+            auth.token_username(result.claims), result.claims.get("ver", 0)
+        ):
+            results[token] = TokenIntrospection(
+                active=False, error="The provided token has been revoked."
+            )
+
+    logger.info(
+        "routes",
+        f"Introspected {len(introspection_request.tokens)} tokens, {len(results)} distinct.",
+    )
+    response = [results[token] for token in introspection_request.tokens]
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content=jsonable_encoder(response)
     )
-    return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
@@ -0,0 +1,257 @@
+from typing import Any, Dict, Final
+
+from fastapi import APIRouter, Depends, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from src.core.auth import REVOCATION_STORE, TOKEN_CACHE, TOKEN_EPOCHS, require_admin
+from src.core.users import unknown_users_stats, user_cache_stats
+from src.db.monitoring import POOL_MONITOR
+from src.helpers.container import CONTAINER
+from src.models.commons import HttpExceptionMessage
+from src.models.metrics import CacheStats, EpochStats, PoolStats, RevocationStats
+from src.models.user import Role
+from src.routes.enums.commons import Endpoint
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.hasher.models.configuration import HasherStats
+from src.services.invalidation.interfaces.i_invalidation_bus import IInvalidationBus
+from src.services.invalidation.models.configuration import InvalidationBusStats
+from src.services.session.interfaces.i_session_store import ISessionStore
+from src.services.session.models.configuration import SessionStoreStats
+from src.services.throttle.interfaces.i_login_throttle import ILoginThrottle
+from src.services.throttle.models.configuration import ThrottleStats
+
+# Router instantiation.
+router = APIRouter()
+
+# Every metrics endpoint is limited to admins.
+_METRICS_RESPONSES: Final[Dict[int, Any]] = {
+    status.HTTP_401_UNAUTHORIZED: {
+        "model": HttpExceptionMessage,
+        "description": "Unauthorized",  # Exception raised by the require_admin function (see Endpoint.DEPENDENCIES).
+    },
+    status.HTTP_403_FORBIDDEN: {
+        "model": HttpExceptionMessage,
+        "description": f"Forbidden access, {Role.ADMIN} role required",  # Exception raised by the require_admin function (see Endpoint.DEPENDENCIES).
+    },
+}
+
+_GET_HASHER_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: HasherStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the password hasher pool queue depth and hash latency, useful to size the pool per core.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/hasher",
+    response_model=_GET_HASHER_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_HASHER_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_HASHER_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_HASHER_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_hasher_metrics():
+    hasher = CONTAINER.get(IPasswordHasher)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content=jsonable_encoder(hasher.stats())
+    )
+
+
+_GET_TOKEN_CACHE_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: CacheStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the verified token cache size and hit/miss counters.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/token-cache",
+    response_model=_GET_TOKEN_CACHE_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_TOKEN_CACHE_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_TOKEN_CACHE_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_TOKEN_CACHE_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_token_cache_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK, content=jsonable_encoder(TOKEN_CACHE.stats())
+    )
+
+
+_GET_REVOCATION_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: RevocationStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the revoked refresh tokens Bloom filter size and how many checks reached the db.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/revocation",
+    response_model=_GET_REVOCATION_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_REVOCATION_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_REVOCATION_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_REVOCATION_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_revocation_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(REVOCATION_STORE.stats()),
+    )
+
+
+_GET_TOKEN_EPOCHS_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: EpochStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the token epochs map size and how many token version checks reached the db.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/token-epochs",
+    response_model=_GET_TOKEN_EPOCHS_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_TOKEN_EPOCHS_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_TOKEN_EPOCHS_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_TOKEN_EPOCHS_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_token_epochs_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(TOKEN_EPOCHS.stats()),
+    )
+
+
+_GET_SESSIONS_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: SessionStoreStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the opaque tokens session store size and hit/miss counters.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/sessions",
+    response_model=_GET_SESSIONS_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_SESSIONS_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_SESSIONS_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_SESSIONS_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_sessions_metrics():
+    session_store = CONTAINER.get(ISessionStore)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(session_store.stats()),
+    )
+
+
+_GET_LOGIN_THROTTLE_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: ThrottleStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the login throttle counters: allowed and rejected attempts, lockouts and tracked keys.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/login-throttle",
+    response_model=_GET_LOGIN_THROTTLE_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_LOGIN_THROTTLE_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_LOGIN_THROTTLE_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_LOGIN_THROTTLE_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_login_throttle_metrics():
+    login_throttle = CONTAINER.get(ILoginThrottle)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(login_throttle.stats()),
+    )
+
+
+_GET_INVALIDATION_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: InvalidationBusStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the cache invalidation bus counters: events published by this node, received from the others and failures.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/invalidation",
+    response_model=_GET_INVALIDATION_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_INVALIDATION_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_INVALIDATION_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_INVALIDATION_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_invalidation_metrics():
+    invalidation_bus = CONTAINER.get(IInvalidationBus)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(invalidation_bus.stats()),
+    )
+
+
+_GET_UNKNOWN_USERS_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: CacheStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the unknown usernames cache size and hit/miss counters, every hit is a db lookup saved.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/unknown-users",
+    response_model=_GET_UNKNOWN_USERS_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_UNKNOWN_USERS_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_UNKNOWN_USERS_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_UNKNOWN_USERS_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_unknown_users_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(unknown_users_stats()),
+    )
+
+
+_GET_DB_POOL_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: PoolStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the database connection pool gauges and how long the operations waited for a connection.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/db-pool",
+    response_model=_GET_DB_POOL_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_DB_POOL_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_DB_POOL_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_DB_POOL_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_db_pool_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(POOL_MONITOR.stats()),
+    )
+
+
+_GET_USER_CACHE_METRICS_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSE_MODEL: CacheStats,
+    Endpoint.RESPONSES: _METRICS_RESPONSES,
+    Endpoint.DESCRIPTION: "Get the users cache size and hit/miss counters, every hit is a db lookup saved.",
+    Endpoint.DEPENDENCIES: [Depends(require_admin)],
+}
+
+
+@router.get(
+    "/user-cache",
+    response_model=_GET_USER_CACHE_METRICS_PARAMS[Endpoint.RESPONSE_MODEL],
+    responses=_GET_USER_CACHE_METRICS_PARAMS[Endpoint.RESPONSES],
+    description=_GET_USER_CACHE_METRICS_PARAMS[Endpoint.DESCRIPTION],
+    dependencies=_GET_USER_CACHE_METRICS_PARAMS[Endpoint.DEPENDENCIES],
+)
+async def get_user_cache_metrics():
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=jsonable_encoder(user_cache_stats()),
+    )
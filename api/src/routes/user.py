@@ -1,15 +1,22 @@
 from datetime import datetime
-from typing import Any, Dict, Final, List, Tuple
+from typing import Any, AsyncIterator, Dict, Final, List, Optional
 
-from beanie.odm.enums import SortDirection
-from beanie.operators import All
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from pymongo.errors import DuplicateKeyError
-from src.core.auth import hash_password, is_admin, is_authorized, require_admin
-from src.db.collections.user import User as UserCollection
+from src.core import users
+from src.core.auth import TOKEN_EPOCHS, get_principal, require_admin
+from src.core.cursors import decode_cursor, encode_cursor
+from src.core.epochs import DELETED
+from src.core.exceptions import (
+    DuplicateUserError,
+    HasherOverloadedError,
+    InvalidCursorError,
+    LastAdminError,
+    StaleRevisionError,
+)
+from src.core.principal import Principal
 from src.helpers.container import CONTAINER
 from src.models.commons import BaseMessage, HttpExceptionMessage
 from src.models.user import (
@@ -22,11 +29,34 @@ from src.models.user import (
     UserRegistrationAdmin,
 )
 from src.routes.enums.commons import Endpoint
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
 from src.services.logger.interfaces.i_logger import ILogger
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+from src.services.repository.models.user import UserRecord
 
 # Router instantiation.
 router = APIRouter()
 
+# Header carrying the cursor of the next page of the paginated endpoints.
+NEXT_CURSOR_HEADER: Final[str] = "X-Next-Cursor"
+
+# Users fetched from the db and written to the client at once by the export.
+_EXPORT_BATCH_SIZE: Final[int] = 500
+
+
+def _etag(revision: int) -> str:
+    """Return the ETag of the given user revision."""
+    return f'"{revision}"'
+
+
+def _parse_etag(etag: str) -> Optional[int]:
+    """Return the user revision of the ETag, None if it is not an ETag returned by _etag."""
+    etag = etag.strip()
+    if len(etag) < 3 or etag[0] != '"' or etag[-1] != '"' or not etag[1:-1].isdigit():
+        return None
+    return int(etag[1:-1])
+
+
 _REGISTER_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
     Endpoint.RESPONSE_MODEL: BaseMessage,
     Endpoint.RESPONSES: {
@@ -38,6 +68,10 @@ _REGISTER_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
             "model": HttpExceptionMessage,
             "description": "An unknown error occured while registering the user",
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": HttpExceptionMessage,
+            "description": "Too many passwords are being hashed, retry later",
+        },
     },
     Endpoint.DESCRIPTION: "User registration for basic user, this will set the default user role to 'user', to let the use chose the roles use the /register-admin endpoint",
 }
@@ -51,37 +85,52 @@ _REGISTER_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
 )
 async def register(user_registration: UserRegistration):
     logger = CONTAINER.get(ILogger)
+    hasher = CONTAINER.get(IPasswordHasher)
     status_code: int
     response: BaseModel
     now_date = datetime.utcnow()
 
+    # The hash runs in the hasher pool to keep the event loop free.
+    try:
+        hashed_password = await hasher.hash(user_registration.password)
+    except HasherOverloadedError as e:
+        logger.warning("routes", e.loggable)
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.msg,
+            headers={"Retry-After": "1"},
+        )
+
     # Document creation.
     logger.info(
         "routes",
         f"Document creation for user having {user_registration.username} as username.",
     )
-    user = UserCollection(
+    user = UserRecord(
         email=user_registration.email,
         username=user_registration.username,
-        password=user_registration.password,
+        password=hashed_password,
         roles=[Role.USER.value],
         creation=now_date,
         last_update=now_date,
+        # Starting from the creation time, the tokens of a deleted user with the same username are never current.
+        token_version=int(now_date.timestamp()),
     )
 
     # Saving the document to db.
     try:
-        await user.save()
-    except DuplicateKeyError as e:
-        logger.error("routes", str(e))
-        duplicates = dict(e.details).get("keyPattern")
-        msg = f"The following fields must be unique: {duplicates}"
-        raise HTTPException(status.HTTP_409_CONFLICT, detail=msg)
+        await CONTAINER.get(IUserRepository).create(user)
+    except DuplicateUserError as e:
+        logger.error("routes", e.loggable)
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=e.msg)
     except Exception as e:
         logger.error("routes", str(e))
         msg = f"An unknown exception occured, maybe bad db connection"
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
+    # The username may have been looked up before the registration, on any node.
+    await users.publish_user_change(user.username)
+
     response = BaseMessage(message="OK")
     status_code = status.HTTP_201_CREATED
 
@@ -111,6 +160,10 @@ _REGISTER_ADMIN_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
             "model": HttpExceptionMessage,
             "description": "An unknown error occured while registering the user",
         },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": HttpExceptionMessage,
+            "description": "Too many passwords are being hashed, retry later",
+        },
     },
     Endpoint.DESCRIPTION: "User registration for admin, this will let the user chose the roles, at least one role is required.This endpoint execution is limited to users having the admin role. This endpoint execution is limited to users having the admin role.",
     Endpoint.DEPENDENCIES: [Depends(require_admin)],
@@ -127,48 +180,63 @@ _REGISTER_ADMIN_POST_PARAMS: Final[Dict[Endpoint, Any]] = {
 )
 async def register_admin(
     user_registration: UserRegistrationAdmin,
-    is_admin_result: Tuple[bool, bool, dict] = Depends(is_admin),
+    principal: Principal = Depends(get_principal),
 ):
     logger = CONTAINER.get(ILogger)
+    hasher = CONTAINER.get(IPasswordHasher)
     status_code: int
     response: BaseModel
     now_date = datetime.utcnow()
 
     # Check if user access token is valid.
-    if not is_admin_result[0]:
+    if not principal.is_authenticated:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     # Check if user has admin role.
-    if not is_admin_result[1]:
+    if not principal.is_admin:
         raise HTTPException(status.HTTP_403_FORBIDDEN)
 
+    # The hash runs in the hasher pool to keep the event loop free.
+    try:
+        hashed_password = await hasher.hash(user_registration.password)
+    except HasherOverloadedError as e:
+        logger.warning("routes", e.loggable)
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.msg,
+            headers={"Retry-After": "1"},
+        )
+
     # Document creation.
     logger.info(
         "routes",
         f"Document creation for user having {user_registration.username} as username and roles {user_registration.roles}.",
     )
-    user = UserCollection(
+    user = UserRecord(
         email=user_registration.email,
         username=user_registration.username,
-        password=hash_password(user_registration.password),
+        password=hashed_password,
         roles=user_registration.roles,
         creation=now_date,
         last_update=now_date,
+        # Starting from the creation time, the tokens of a deleted user with the same username are never current.
+        token_version=int(now_date.timestamp()),
     )
 
     # Saving the document to db.
     try:
-        await user.save()
-    except DuplicateKeyError as e:
-        logger.error("routes", str(e))
-        duplicates = dict(e.details).get("keyPattern")
-        msg = f"The following fields must be unique: {duplicates}"
-        raise HTTPException(status.HTTP_409_CONFLICT, detail=msg)
+        await CONTAINER.get(IUserRepository).create(user)
+    except DuplicateUserError as e:
+        logger.error("routes", e.loggable)
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=e.msg)
     except Exception as e:
         logger.error("routes", str(e))
         msg = f"An unknown exception occured, maybe bad db connection"
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
+    # The username may have been looked up before the registration, on any node.
+    await users.publish_user_change(user.username)
+
     response = BaseMessage(message="OK")
     status_code = status.HTTP_201_CREATED
 
@@ -182,6 +250,10 @@ async def register_admin(
 _GET_ALL_USERS_PARAMS: Final[Dict[Endpoint, Any]] = {
     Endpoint.RESPONSE_MODEL: List[UserPartialDetails | UserPartialDetailsAdmin],
     Endpoint.RESPONSES: {
+        status.HTTP_400_BAD_REQUEST: {
+            "model": HttpExceptionMessage,
+            "description": "The cursor is malformed or has been tampered with",
+        },
         status.HTTP_401_UNAUTHORIZED: {
             "model": HttpExceptionMessage,
             "description": "Unauthorized",  # Exception raised by the require_admin function (see Endpoint.DEPENDENCIES).
@@ -195,7 +267,7 @@ _GET_ALL_USERS_PARAMS: Final[Dict[Endpoint, Any]] = {
             "description": "An unknown error occured while registering the user",
         },
     },
-    Endpoint.DESCRIPTION: "Get all users with parial details from the db. If needed is possible to limit returned entities and skip the required amount",
+    Endpoint.DESCRIPTION: f"Get all users with parial details from the db, sorted by username. If needed is possible to limit returned entities, when a page is full the cursor of the next one is returned in the {NEXT_CURSOR_HEADER} header, pass it as after to get the next page. Skipping entities is still supported but deep pages are slow, prefer the cursor.",
 }
 
 
@@ -208,35 +280,42 @@ _GET_ALL_USERS_PARAMS: Final[Dict[Endpoint, Any]] = {
 async def get_all_users(
     limit: int | None = None,
     skip: int | None = None,
-    is_admin_result: Tuple[bool, bool, dict] = Depends(is_admin),
+    after: str | None = None,
+    principal: Principal = Depends(get_principal),
 ):
     logger = CONTAINER.get(ILogger)
     status_code: int
-    response: BaseModel
+    response: List[BaseModel]
     projection: BaseModel
 
     # Check if user is authorized to access the endpoint.
-    if not is_admin_result[0]:
+    if not principal.is_authenticated:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     # Check if the user has admin role or not.
-    if not is_admin_result[1]:
+    if not principal.is_admin:
         projection = UserPartialDetails
     else:
         projection = UserPartialDetailsAdmin
 
+    # The cursor is the last username of the previous page, the next page starts right after it.
+    after_username: Optional[str] = None
+    if after is not None:
+        try:
+            after_username = decode_cursor(after)
+        except InvalidCursorError as e:
+            logger.info("routes", e.loggable)
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=e.msg)
+
     logger.info(
         "routes",
-        f"Returning the users in the db: limit={limit} and skip={skip}.",
+        f"Returning the users in the db: limit={limit}, skip={skip} and after={after}.",
     )
 
     try:
-        response = await UserCollection.find_all(
-            projection_model=projection,
-            limit=limit,
-            skip=skip,
-            sort=[("username", SortDirection.ASCENDING)],
-        ).to_list()
+        response = await CONTAINER.get(IUserRepository).list(
+            projection, after=after_username, limit=limit, skip=skip
+        )
     except Exception as e:
         logger.error(
             "routes", f"An unknown exception occured while fetcthing the users: {e}"
@@ -245,11 +324,102 @@ async def get_all_users(
 
     status_code = status.HTTP_200_OK
 
+    # A full page may be followed by another one.
+    headers = {}
+    if limit and len(response) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(response[-1].username)
+
     logger.info(
         "routes",
         f"Success returning all the users.",
     )
-    return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
+    return JSONResponse(
+        status_code=status_code, content=jsonable_encoder(response), headers=headers
+    )
+
+
+_GET_USERS_EXPORT_PARAMS: Final[Dict[Endpoint, Any]] = {
+    Endpoint.RESPONSES: {
+        status.HTTP_200_OK: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One user per line, with the same details returned by /all",
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "model": HttpExceptionMessage,
+            "description": "The cursor is malformed or has been tampered with",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "model": HttpExceptionMessage,
+            "description": "Unauthorized",  # Exception raised by the get_principal function.
+        },
+    },
+    Endpoint.DESCRIPTION: "Export all users with partial details from the db as newline delimited json, sorted by username. The users are streamed in batches so the memory used does not depend on the number of users, an error while streaming aborts the response, it never ends as a complete export. Pass the cursor of a /all page as after to export the following users only.",
+}
+
+
+async def _export_rows(
+    exported_users: AsyncIterator[BaseModel],
+) -> AsyncIterator[bytes]:
+    """Yield the users serialized as json lines, a batch at a time."""
+    rows: List[str] = []
+    try:
+        async for user in exported_users:
+            rows.append(user.json())
+            if len(rows) == _EXPORT_BATCH_SIZE:
+                yield ("\n".join(rows) + "\n").encode()
+                rows = []
+    except Exception as e:
+        # The status code is already sent, raising aborts the chunked response so the
+        # client sees a failed transfer instead of a truncated but well-formed output.
+        logger = CONTAINER.get(ILogger)
+        logger.error(
+            "routes", f"An unknown exception occured while exporting the users: {e}"
+        )
+        raise
+
+    if rows:
+        yield ("\n".join(rows) + "\n").encode()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=_GET_USERS_EXPORT_PARAMS[Endpoint.RESPONSES],
+    description=_GET_USERS_EXPORT_PARAMS[Endpoint.DESCRIPTION],
+)
+async def export_users(
+    after: str | None = None,
+    principal: Principal = Depends(get_principal),
+):
+    logger = CONTAINER.get(ILogger)
+    projection: BaseModel
+
+    # Check if user is authorized to access the endpoint.
+    if not principal.is_authenticated:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+
+    # Check if the user has admin role or not.
+    if not principal.is_admin:
+        projection = UserPartialDetails
+    else:
+        projection = UserPartialDetailsAdmin
+
+    after_username: Optional[str] = None
+    if after is not None:
+        try:
+            after_username = decode_cursor(after)
+        except InvalidCursorError as e:
+            logger.info("routes", e.loggable)
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=e.msg)
+
+    logger.info("routes", f"Exporting the users in the db: after={after}.")
+
+    exported_users = CONTAINER.get(IUserRepository).iterate(
+        projection, after=after_username, batch_size=_EXPORT_BATCH_SIZE
+    )
+    return StreamingResponse(
+        _export_rows(exported_users), media_type="application/x-ndjson"
+    )
 
 
 _GET_USERS_COUNT_PARAMS: Final[Dict[Endpoint, Any]] = {
@@ -268,7 +438,7 @@ _GET_USERS_COUNT_PARAMS: Final[Dict[Endpoint, Any]] = {
             "description": "An unknown error occured while registering the user",
         },
     },
-    Endpoint.DESCRIPTION: "Get the total number of users in the database",
+    Endpoint.DESCRIPTION: "Get the total number of users in the database, or of the users with the given role. The exact counts are read from counters kept up to date by every user change, with estimated the total is read from the collection metadata instead and may be slightly off.",
 }
 
 
@@ -279,14 +449,16 @@ _GET_USERS_COUNT_PARAMS: Final[Dict[Endpoint, Any]] = {
     description=_GET_USERS_COUNT_PARAMS[Endpoint.DESCRIPTION],
 )
 async def get_users_count(
-    is_authorized_result: Tuple[bool, dict] = Depends(is_authorized)
+    estimated: bool = False,
+    role: Role | None = None,
+    principal: Principal = Depends(get_principal),
 ):
     logger = CONTAINER.get(ILogger)
     status_code: int
     response: int
 
     # Check if teh user is authorized or not.
-    if not is_authorized_result[0]:
+    if not principal.is_authenticated:
         raise HTTPException(
             status.HTTP_401_UNAUTHORIZED,
             detail="The provided token may be expired or invalid.",
@@ -294,11 +466,16 @@ async def get_users_count(
 
     logger.info(
         "routes",
-        f"Returning the total number of users document in the db.",
+        f"Returning the number of users document in the db: estimated={estimated} and role={role}.",
     )
 
     try:
-        response = await UserCollection.find_all().count()
+        # The roles are not in the collection metadata, their counters are read anyway.
+        user_repository = CONTAINER.get(IUserRepository)
+        if estimated and role is None:
+            response = await user_repository.estimate_count()
+        else:
+            response = await user_repository.count(role)
     except Exception as e:
         logger.error(
             "routes",
@@ -338,7 +515,7 @@ _GET_USER_BY_ID_PARAMS: Final[Dict[Endpoint, Any]] = {
     description=_GET_USER_BY_ID_PARAMS[Endpoint.DESCRIPTION],
 )
 async def get_user_by_username(
-    username: str, is_admin_result: Tuple[bool, bool, dict] = Depends(is_admin)
+    username: str, principal: Principal = Depends(get_principal)
 ):
     logger = CONTAINER.get(ILogger)
     status_code: int
@@ -346,11 +523,11 @@ async def get_user_by_username(
     projection: BaseModel
 
     # Check if user access token was valid and user authorized.
-    if not is_admin_result[0]:
+    if not principal.is_authenticated:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     # Check if user has admin role or not.
-    if not is_admin_result[1]:
+    if not principal.is_admin:
         projection = UserPartialDetails
     else:
         projection = UserPartialDetailsAdmin
@@ -361,10 +538,9 @@ async def get_user_by_username(
     )
 
     try:
-        response = await UserCollection.find_one(
-            UserCollection.username == username,
-            projection_model=projection,
-        )
+        # The cached user is projected here, any projection is served by the same entry.
+        user = await users.get_user(username)
+        response = None if user is None else projection.parse_obj(user.dict())
     except Exception as e:
         logger.error(
             "routes", f"An unknown exception occured while fetcthing the user: {e}"
@@ -377,7 +553,10 @@ async def get_user_by_username(
         "routes",
         f"Success returning the serched user.",
     )
-    return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
+    headers = {} if response is None else {"ETag": _etag(response.revision)}
+    return JSONResponse(
+        status_code=status_code, content=jsonable_encoder(response), headers=headers
+    )
 
 
 _GET_CURRENT_USER_PARAMS: Final[Dict[Endpoint, Any]] = {
@@ -403,23 +582,24 @@ _GET_CURRENT_USER_PARAMS: Final[Dict[Endpoint, Any]] = {
     description=_GET_CURRENT_USER_PARAMS[Endpoint.DESCRIPTION],
 )
 async def get_current_user(
-    is_authorized_result: Tuple[bool, dict] = Depends(is_authorized),
+    principal: Principal = Depends(get_principal),
 ):
 
     # Check if the user is authorized or not.
-    if not is_authorized_result[0]:
+    if not principal.is_authenticated:
         raise HTTPException(
             status.HTTP_401_UNAUTHORIZED,
             detail="The provided token may be expired or invalid.",
         )
 
-    # Decoded token is in is_authorized_result[1]
     status_code = status.HTTP_200_OK
-    response = await UserCollection.find_one(
-        UserCollection.username == is_authorized_result[1]["username"]
-    ).project(CurrentUserDetails)
+    user = await users.get_user(principal.username)
+    response = None if user is None else CurrentUserDetails.parse_obj(user.dict())
 
-    return JSONResponse(status_code=status_code, content=jsonable_encoder(response))
+    headers = {} if response is None else {"ETag": _etag(response.revision)}
+    return JSONResponse(
+        status_code=status_code, content=jsonable_encoder(response), headers=headers
+    )
 
 
 _PUT_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
@@ -437,16 +617,24 @@ _PUT_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
             "model": HttpExceptionMessage,
             "description": "The user to update was not found",
         },
+        status.HTTP_406_NOT_ACCEPTABLE: {
+            "model": HttpExceptionMessage,
+            "description": "You are trying to remove the admin role from the last admin, not acceptable.",
+        },
         status.HTTP_409_CONFLICT: {
             "model": HttpExceptionMessage,
             "description": "The username or email are already in use by another user.",
         },
+        status.HTTP_412_PRECONDITION_FAILED: {
+            "model": HttpExceptionMessage,
+            "description": "The user has been changed since the revision in the If-Match header.",
+        },
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             "model": HttpExceptionMessage,
             "description": "An unknown error occured while retriving the user",
         },
     },
-    Endpoint.DESCRIPTION: "Update user given the username in path and user with updated fields in body.",
+    Endpoint.DESCRIPTION: "Update user given the username in path and user with updated fields in body. Pass the ETag returned when reading the user as If-Match header to update it only if nobody changed it meanwhile, the new ETag is returned. The last admin can never lose the admin role, even by concurrent requests.",
 }
 
 
@@ -459,46 +647,75 @@ _PUT_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
 async def put_user_by_username(
     username: str,
     updated_user: UpdateUserDetails,
-    is_admin_result: Tuple[bool, bool, dict] = Depends(is_admin),
+    if_match: str | None = Header(default=None),
+    principal: Principal = Depends(get_principal),
 ):
 
     logger = CONTAINER.get(ILogger)
 
     # Check if user is authorized.
-    if not is_admin_result[0]:
+    if not principal.is_authenticated:
         logger.info("routes", "The user is not authenticated.")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     # Check if user is not admin that the user in the decoded token is equal to the given one in the endpoint path.
-    if not is_admin_result[1] and username != is_admin_result[2]["username"]:
+    if not principal.is_admin and username.casefold() != principal.username.casefold():
         logger.info("routes", "The user has not right to update a different user.")
         raise HTTPException(status.HTTP_403_FORBIDDEN)
 
-    to_update = await UserCollection.find_one(UserCollection.username == username)
-
-    if to_update is None:
-        raise HTTPException(status.HTTP_404_NOT_FOUND)
-
-    to_update.email = updated_user.email
-    to_update.username = updated_user.username
-    to_update.roles = updated_user.roles
-    to_update.last_update = datetime.utcnow()
+    # The update applies only to the revision the client has read, if given.
+    revision: Optional[int] = None
+    if if_match is not None and if_match.strip() != "*":
+        revision = _parse_etag(if_match)
+        if revision is None:
+            raise HTTPException(
+                status.HTTP_412_PRECONDITION_FAILED, detail="Malformed If-Match header."
+            )
 
+    new_roles = [role.value for role in updated_user.roles]
     try:
-        await to_update.save()
-    except DuplicateKeyError as e:
-        logger.error("routes", str(e))
-        duplicates = dict(e.details).get("keyPattern")
-        msg = f"The following fields must be unique: {duplicates}"
-        raise HTTPException(status.HTTP_409_CONFLICT, detail=msg)
+        previous_user = await CONTAINER.get(IUserRepository).update(
+            username,
+            updated_user.email,
+            updated_user.username,
+            new_roles,
+            revision=revision,
+        )
+    except DuplicateUserError as e:
+        logger.error("routes", e.loggable)
+        raise HTTPException(status.HTTP_409_CONFLICT, detail=e.msg)
+    except StaleRevisionError as e:
+        logger.info("routes", e.loggable)
+        raise HTTPException(status.HTTP_412_PRECONDITION_FAILED, detail=e.msg)
+    except LastAdminError as e:
+        logger.info("routes", e.loggable)
+        raise HTTPException(status.HTTP_406_NOT_ACCEPTABLE, detail=e.msg)
     except Exception as e:
         logger.error("routes", str(e))
         msg = f"An unknown exception occured, maybe bad db connection"
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
+    if previous_user is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+
+    token_version = previous_user.token_version
+    if set(previous_user.roles) != set(new_roles):
+        token_version += 1
+
+    # The path username may differ in case, the stored one is in the tokens and caches.
+    await users.publish_user_change(previous_user.username)
+    # The tokens issued with the old username are about a user that does not exist anymore.
+    if previous_user.username != updated_user.username:
+        await users.publish_user_change(updated_user.username)
+        TOKEN_EPOCHS.set(previous_user.username, DELETED)
+    TOKEN_EPOCHS.set(updated_user.username, token_version)
+
     logger.info("routes", f"Succesful update for {username} to {updated_user.json()}")
 
-    return JSONResponse(status.HTTP_200_OK)
+    return JSONResponse(
+        status.HTTP_200_OK,
+        headers={"ETag": _etag(previous_user.revision + 1)},
+    )
 
 
 _DELETE_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
@@ -525,7 +742,7 @@ _DELETE_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
             "description": "An unknown error occured while retriving the user",
         },
     },
-    Endpoint.DESCRIPTION: "Update user given the username in path and user with updated fields in body.",
+    Endpoint.DESCRIPTION: "Delete user given the username in path. The last admin can never be deleted, even by concurrent requests.",
 }
 
 
@@ -537,44 +754,38 @@ _DELETE_USER_BY_USERNAME_PARAMS: Final[Dict[Endpoint, Any]] = {
 )
 async def put_user_by_username(
     username: str,
-    is_admin_result: Tuple[bool, bool, dict] = Depends(is_admin),
+    principal: Principal = Depends(get_principal),
 ):
 
     logger = CONTAINER.get(ILogger)
 
     # Check if user is authorized.
-    if not is_admin_result[0]:
+    if not principal.is_authenticated:
         logger.info("routes", "The user is not authenticated.")
         raise HTTPException(status.HTTP_401_UNAUTHORIZED)
 
     # Check if user is not admin that the user in the decoded token is equal to the given one in the endpoint path.
-    if not is_admin_result[1] and username != is_admin_result[2]["username"]:
+    if not principal.is_admin and username.casefold() != principal.username.casefold():
         logger.info("routes", "The user has not right to update a different user.")
         raise HTTPException(status.HTTP_403_FORBIDDEN)
 
-    to_delete = await UserCollection.find_one(UserCollection.username == username)
-
-    if to_delete is None:
-        raise HTTPException(status.HTTP_404_NOT_FOUND)
-
-    # If the user to delete is admin and the last one return 406.
-    if Role.ADMIN in to_delete.roles:
-        admin_count = await UserCollection.find_many(
-            All(UserCollection.roles, [Role.ADMIN.value])
-        ).count()
-        if admin_count == 1:
-            raise HTTPException(
-                status.HTTP_406_NOT_ACCEPTABLE,
-                detail="Trying to delete the last admin user, impossible.",
-            )
-
     try:
-        await to_delete.delete()
+        deleted_user = await CONTAINER.get(IUserRepository).delete(username)
+    except LastAdminError as e:
+        logger.info("routes", e.loggable)
+        raise HTTPException(status.HTTP_406_NOT_ACCEPTABLE, detail=e.msg)
     except Exception as e:
         logger.error("routes", str(e))
         msg = f"An unknown exception occured, maybe bad db connection"
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
 
+    if deleted_user is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+
+    await users.publish_user_change(deleted_user.username)
+    TOKEN_EPOCHS.set(deleted_user.username, DELETED)
+    users.remember_unknown_user(deleted_user.username)
+
     logger.info("routes", f"Succesful deletion for {username}")
 
     return JSONResponse(status.HTTP_200_OK)
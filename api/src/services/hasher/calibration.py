@@ -0,0 +1,98 @@
+"""Benchmark the password hashing of this host and suggest the cost for a target latency.
+
+The suggested parameters are the most expensive ones whose hash takes at most
+the target time, to be copied in configs/auth/hasher.yaml. Run it on the same
+hardware serving the logins with:
+python -m src.services.hasher.calibration [target-milliseconds] [bcrypt|argon2]
+"""
+import sys
+from os import cpu_count
+from time import perf_counter
+from typing import Dict, Final
+
+from passlib.context import CryptContext
+from src.services.hasher.enums.scheme import HasherScheme
+from src.services.hasher.models.configuration import Argon2Params
+
+_PASSWORD: Final[str] = "calibration-password"
+_SAMPLES: Final[int] = 3
+# Bounds of the search, past them a single hash is way too slow anyway.
+_MAX_BCRYPT_ROUNDS: Final[int] = 20
+_MAX_ARGON2_TIME_COST: Final[int] = 64
+
+
+def _hash_seconds(context: CryptContext) -> float:
+    """Return the best time of a few hashes with the given context."""
+    timings = []
+    for _ in range(_SAMPLES):
+        start = perf_counter()
+        context.hash(_PASSWORD)
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def calibrate_bcrypt(target_seconds: float) -> Dict[str, int]:
+    """Return the highest bcrypt rounds hashing within the target time.
+
+    Args:
+        target_seconds (float): maximum seconds of a single hash.
+
+    Returns:
+        Dict[str, int]: the bcrypt parameters, at least 4 rounds.
+    """
+    rounds = 4
+    while rounds < _MAX_BCRYPT_ROUNDS:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds + 1)
+        if _hash_seconds(context) > target_seconds:
+            break
+        rounds += 1
+    return {"rounds": rounds}
+
+
+def calibrate_argon2(
+    target_seconds: float, memory_cost: int = Argon2Params().memory_cost
+) -> Dict[str, int]:
+    """Return the highest argon2id time cost hashing within the target time,
+    at a fixed memory cost and with a lane per core.
+
+    Args:
+        target_seconds (float): maximum seconds of a single hash.
+        memory_cost (int, optional): memory of a single hash in KiB. Defaults to 65536.
+
+    Returns:
+        Dict[str, int]: the argon2 parameters, at least 1 pass.
+    """
+    parallelism = cpu_count() or 1
+    time_cost = 1
+    while time_cost < _MAX_ARGON2_TIME_COST:
+        context = CryptContext(
+            schemes=["argon2"],
+            argon2__type="ID",
+            argon2__memory_cost=memory_cost,
+            argon2__time_cost=time_cost + 1,
+            argon2__parallelism=parallelism,
+        )
+        if _hash_seconds(context) > target_seconds:
+            break
+        time_cost += 1
+    return {
+        "memory_cost": memory_cost,
+        "time_cost": time_cost,
+        "parallelism": parallelism,
+    }
+
+
+if __name__ == "__main__":
+    target_milliseconds = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+    scheme = HasherScheme(sys.argv[2]) if len(sys.argv) > 2 else HasherScheme.BCRYPT
+
+    if scheme == HasherScheme.ARGON2:
+        params = calibrate_argon2(target_milliseconds / 1000)
+    else:
+        params = calibrate_bcrypt(target_milliseconds / 1000)
+
+    print(f"# Suggested for {target_milliseconds:g} ms per hash on this host.")
+    print(f'scheme: "{scheme.value}"')
+    print(f"{scheme.value}:")
+    for name, value in params.items():
+        print(f"  {name}: {value}")
@@ -0,0 +1,6 @@
+from pydantic_yaml import YamlStrEnum
+
+
+class HasherExecutor(YamlStrEnum):
+    THREAD = "thread"
+    PROCESS = "process"
@@ -0,0 +1,6 @@
+from pydantic_yaml import YamlStrEnum
+
+
+class HasherScheme(YamlStrEnum):
+    BCRYPT = "bcrypt"
+    ARGON2 = "argon2"
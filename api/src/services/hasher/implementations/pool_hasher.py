@@ -0,0 +1,244 @@
+import asyncio
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from os import cpu_count
+from os.path import exists as os_path_exists
+from os.path import isfile as os_path_isfile
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+from src.core.exceptions import HasherOverloadedError
+from src.services.hasher.enums.executor import HasherExecutor
+from src.services.hasher.models.configuration import HasherConfig, HasherStats
+from yaml import safe_load
+
+
+# Context of the process pool workers, built by _init_worker.
+_WORKER_CONTEXT: Optional[CryptContext] = None
+
+
+def _init_worker(context_settings: Dict[str, Any]) -> None:
+    """Build the worker context, CryptContext instances cannot be pickled."""
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = CryptContext(**context_settings)
+
+
+def _timed_hash(
+    password: str, context: Optional[CryptContext] = None
+) -> Tuple[str, float]:
+    """Hash the password inside a worker returning the elapsed seconds too."""
+    context = context or _WORKER_CONTEXT
+    start = perf_counter()
+    hashed_password = context.hash(password)
+    return hashed_password, perf_counter() - start
+
+
+def _timed_verify(
+    plain_password: str, hashed_password: str, context: Optional[CryptContext] = None
+) -> Tuple[bool, float]:
+    """Verify the password inside a worker returning the elapsed seconds too."""
+    context = context or _WORKER_CONTEXT
+    start = perf_counter()
+    verified = context.verify(plain_password, hashed_password)
+    return verified, perf_counter() - start
+
+
+class PoolPasswordHasher:
+    """
+    Implementation of the IPasswordHasher interface running the hashes
+    in a bounded thread or process pool, so the event loop keeps serving
+    other requests while bcrypt or argon2 are working.
+    """
+
+    _config: HasherConfig
+    _context: CryptContext
+    # Context passed to every job, None when the workers build their own.
+    _worker_context: Optional[CryptContext]
+    _executor: Executor
+    _workers: int
+    _in_system: int
+    _completed: int
+    _rejected: int
+    _hash_seconds: float
+    _max_hash_seconds: float
+    _wait_seconds: float
+    _max_wait_seconds: float
+
+    def __init__(self, config_file_path: Optional[str] = None) -> None:
+        """
+        Create a new pool, if no configuration file is passed the default configuration is applied.
+
+        Args:
+            config_file_path (Optional[str], optional): absolute path of the configuration file. Defaults to None.
+        """
+        self._config = HasherConfig()
+        if config_file_path is not None:
+            self.file_config(config_file_path)
+
+        self._context = CryptContext(**self._config.context_settings())
+        self._workers = self._config.workers or cpu_count() or 1
+        if self._config.executor == HasherExecutor.PROCESS:
+            # Every process builds its own context, threads share this one.
+            self._worker_context = None
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(self._config.context_settings(),),
+            )
+        else:
+            self._worker_context = self._context
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="cdrt-hasher"
+            )
+
+        # Counters are only touched from the event loop thread, no lock required.
+        self._in_system = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_seconds = 0.0
+        self._max_hash_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def file_config(self, config_file_path: str) -> None:
+        """
+        Read the pool configuration from a valid configuration file.
+
+        Args:
+            config_file_path (str): absolute path of the configuration file.
+        """
+        if not os_path_exists(config_file_path) or not os_path_isfile(config_file_path):
+            raise FileNotFoundError
+
+        configuration: dict = {}
+        try:
+            with open(config_file_path, "r") as config_file_stream:
+                configuration = safe_load(config_file_stream)
+        except Exception as e:
+            print(e)
+            sys.exit()
+
+        self._config = HasherConfig.parse_obj(configuration or {})
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash the given password without blocking the event loop.
+
+        Args:
+            password (str): plain password to hash.
+
+        Raises:
+            HasherOverloadedError: when the pool backlog is full.
+
+        Returns:
+            str: the hashed password.
+        """
+        return await self._submit(_timed_hash, password, self._worker_context)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify the given password against the stored hash without blocking the event loop.
+
+        Args:
+            plain_password (str): password to check.
+            hashed_password (str): stored hash.
+
+        Raises:
+            HasherOverloadedError: when the pool backlog is full.
+
+        Returns:
+            bool: True if the password matches the hash.
+        """
+        return await self._submit(
+            _timed_verify, plain_password, hashed_password, self._worker_context
+        )
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """
+        Check if the stored hash was computed with a different scheme or cost than the configured ones.
+
+        Args:
+            hashed_password (str): stored hash.
+
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+        # Only the hash prefix is parsed, cheap enough for the event loop.
+        return self._context.needs_update(hashed_password)
+
+    def context_settings(self) -> Dict[str, Any]:
+        """
+        Return the passlib CryptContext settings of the configured scheme and cost.
+
+        Returns:
+            Dict[str, Any]: keyword arguments of CryptContext.
+        """
+        return self._config.context_settings()
+
+    def stats(self) -> HasherStats:
+        """
+        Return a snapshot of the pool usage (queue depth and latencies).
+
+        Returns:
+            HasherStats: pool statistics.
+        """
+        completed = self._completed or 1
+        return HasherStats(
+            executor=self._config.executor,
+            scheme=self._config.scheme,
+            workers=self._workers,
+            max_pending=self._config.max_pending,
+            queue_depth=max(0, self._in_system - self._workers),
+            in_flight=min(self._in_system, self._workers),
+            completed=self._completed,
+            rejected=self._rejected,
+            avg_hash_ms=self._hash_seconds / completed * 1000,
+            max_hash_ms=self._max_hash_seconds * 1000,
+            avg_wait_ms=self._wait_seconds / completed * 1000,
+            max_wait_ms=self._max_wait_seconds * 1000,
+        )
+
+    def shutdown(self) -> None:
+        """
+        Release the pool workers.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # Private methods.
+    async def _submit(self, function: Callable, *args):
+        """
+        Run the given timed function in the pool if the backlog has room left.
+
+        Args:
+            function (Callable): function returning a (result, elapsed seconds) tuple.
+
+        Raises:
+            HasherOverloadedError: when the pool backlog is full.
+
+        Returns:
+            Any: the result of the function.
+        """
+        if self._in_system >= self._workers + self._config.max_pending:
+            self._rejected += 1
+            raise HasherOverloadedError(
+                loggable=f"Password hasher backlog full: {self._in_system} jobs for {self._workers} workers.",
+                msg="The server is too busy to process the credentials, retry later.",
+            )
+
+        self._in_system += 1
+        start = perf_counter()
+        try:
+            result, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self._in_system -= 1
+
+        wait_seconds = max(0.0, perf_counter() - start - hash_seconds)
+        self._completed += 1
+        self._hash_seconds += hash_seconds
+        self._max_hash_seconds = max(self._max_hash_seconds, hash_seconds)
+        self._wait_seconds += wait_seconds
+        self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+        return result
@@ -0,0 +1,71 @@
+from typing import Any, Dict, Protocol, runtime_checkable
+
+from src.services.hasher.models.configuration import HasherStats
+
+
+@runtime_checkable
+class IPasswordHasher(Protocol):
+    """
+    Interface where the asynchronous password hashing behaviour is defined.
+    """
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash the given password without blocking the event loop.
+
+        Args:
+            password (str): plain password to hash.
+
+        Raises:
+            HasherOverloadedError: when the pool backlog is full.
+
+        Returns:
+            str: the hashed password.
+        """
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify the given password against the stored hash without blocking the event loop.
+
+        Args:
+            plain_password (str): password to check.
+            hashed_password (str): stored hash.
+
+        Raises:
+            HasherOverloadedError: when the pool backlog is full.
+
+        Returns:
+            bool: True if the password matches the hash.
+        """
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """
+        Check if the stored hash was computed with a different scheme or cost than the configured ones.
+
+        Args:
+            hashed_password (str): stored hash.
+
+        Returns:
+            bool: True if the password should be hashed again.
+        """
+
+    def context_settings(self) -> Dict[str, Any]:
+        """
+        Return the passlib CryptContext settings of the configured scheme and cost.
+
+        Returns:
+            Dict[str, Any]: keyword arguments of CryptContext.
+        """
+
+    def stats(self) -> HasherStats:
+        """
+        Return a snapshot of the pool usage (queue depth and latencies).
+
+        Returns:
+            HasherStats: pool statistics.
+        """
+
+    def shutdown(self) -> None:
+        """
+        Release the pool workers.
+        """
@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+from src.services.hasher.enums.executor import HasherExecutor
+from src.services.hasher.enums.scheme import HasherScheme
+
+
+class BcryptParams(BaseModel):
+    # Logarithmic cost, every round more doubles the hashing time.
+    rounds: Optional[int] = Field(default=12, ge=4, le=31)
+
+
+class Argon2Params(BaseModel):
+    # Memory used by a single hash, in KiB.
+    memory_cost: Optional[int] = Field(default=65536, ge=8)
+    # Number of passes over the memory.
+    time_cost: Optional[int] = Field(default=3, ge=1)
+    # Number of lanes hashed in parallel.
+    parallelism: Optional[int] = Field(default=4, ge=1)
+
+
+class HasherConfig(BaseModel):
+    # Kind of pool running the hashes, bcrypt releases the GIL
+    # so a thread pool is usually enough.
+    executor: Optional[HasherExecutor] = HasherExecutor.THREAD
+    # Number of workers in the pool, when missing the number
+    # of cores of the host is used.
+    workers: Optional[int] = Field(default=None, gt=0)
+    # Number of hashes allowed to wait for a free worker, when
+    # exceeded the new requests are rejected.
+    max_pending: Optional[int] = Field(default=64, ge=0)
+    # Scheme of the new hashes, the hashes of the other scheme are still
+    # verified and rehashed with this one at the next login.
+    scheme: Optional[HasherScheme] = HasherScheme.BCRYPT
+    bcrypt: Optional[BcryptParams] = BcryptParams()
+    argon2: Optional[Argon2Params] = Argon2Params()
+
+    def context_settings(self) -> Dict[str, Any]:
+        """
+        Return the passlib CryptContext settings of the configured scheme and cost.
+
+        Returns:
+            Dict[str, Any]: keyword arguments of CryptContext.
+        """
+        other_schemes = [
+            scheme.value for scheme in HasherScheme if scheme != self.scheme
+        ]
+        return {
+            # The first scheme is the default one, the others are deprecated.
+            "schemes": [self.scheme.value, *other_schemes],
+            "deprecated": "auto",
+            "bcrypt__rounds": self.bcrypt.rounds,
+            "argon2__type": "ID",
+            "argon2__memory_cost": self.argon2.memory_cost,
+            "argon2__time_cost": self.argon2.time_cost,
+            "argon2__parallelism": self.argon2.parallelism,
+        }
+
+
+class HasherStats(BaseModel):
+    """Snapshot of the password hasher pool usage."""
+
+    executor: HasherExecutor
+    scheme: HasherScheme
+    workers: int
+    max_pending: int
+    # Jobs waiting for a free worker.
+    queue_depth: int
+    # Jobs currently running on a worker.
+    in_flight: int
+    completed: int
+    rejected: int
+    # Time spent hashing inside the worker.
+    avg_hash_ms: float
+    max_hash_ms: float
+    # Time spent waiting for a free worker.
+    avg_wait_ms: float
+    max_wait_ms: float
@@ -0,0 +1,6 @@
+from pydantic_yaml import YamlStrEnum
+
+
+class InvalidationBackend(YamlStrEnum):
+    MEMORY = "memory"
+    MONGO = "mongo"
@@ -0,0 +1,6 @@
+from pydantic_yaml import YamlStrEnum
+
+
+class InvalidationKind(YamlStrEnum):
+    # The key is the username of a created, changed or deleted user.
+    USER = "user"
@@ -0,0 +1,239 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from os.path import exists as os_path_exists
+from os.path import isfile as os_path_isfile
+from typing import Callable, Dict, Final, List, Optional
+from uuid import uuid4
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from src.db.collections.invalidation_event import InvalidationEvent
+from src.services.invalidation.enums.backend import InvalidationBackend
+from src.services.invalidation.enums.kind import InvalidationKind
+from src.services.invalidation.models.configuration import (
+    InvalidationBusConfig,
+    InvalidationBusStats,
+)
+from yaml import safe_load
+
+# Events published up to this long before a restart of the tail are delivered again,
+# so a clock behind the one of the publisher does not lose them.
+_CLOCK_SKEW: Final[timedelta] = timedelta(seconds=5)
+
+# Kind of the events inserted by a node when it starts following the collection.
+_MARKER_KIND: Final[str] = "tail-marker"
+
+
+class TailingInvalidationBus:
+    """
+    Implementation of the IInvalidationBus interface delivering the events to
+    the local subscribers as soon as they are published.
+    With the mongo backend the events are also inserted in a capped collection
+    that every node follows with a tailable cursor, so the other nodes receive
+    them within the time of a round trip. A capped collection works on a
+    standalone server too, unlike the change streams that need a replica set.
+    With the memory backend the events never leave the node, as in the tests.
+    """
+
+    _config: InvalidationBusConfig
+    _subscribers: Dict[InvalidationKind, List[Callable[[str], None]]]
+    _tail_task: Optional[asyncio.Task]
+
+    def __init__(self, config_file_path: Optional[str] = None) -> None:
+        """
+        Create a new bus, if no configuration file is passed the default configuration is applied.
+
+        Args:
+            config_file_path (Optional[str], optional): absolute path of the configuration file. Defaults to None.
+        """
+        self._config = InvalidationBusConfig()
+        if config_file_path is not None:
+            self.file_config(config_file_path)
+
+        # Everything is only touched from the event loop thread, no lock required.
+        self._origin = uuid4().hex
+        self._subscribers = {}
+        self._tail_task = None
+        self._published = 0
+        self._publish_errors = 0
+        self._received = 0
+        self._callback_errors = 0
+        self._tail_restarts = 0
+
+    def file_config(self, config_file_path: str) -> None:
+        """
+        Read the bus configuration from a valid configuration file.
+
+        Args:
+            config_file_path (str): absolute path of the configuration file.
+        """
+        if not os_path_exists(config_file_path) or not os_path_isfile(config_file_path):
+            raise FileNotFoundError
+
+        configuration: dict = {}
+        try:
+            with open(config_file_path, "r") as config_file_stream:
+                configuration = safe_load(config_file_stream)
+        except Exception as e:
+            print(e)
+            sys.exit()
+
+        self._config = InvalidationBusConfig.parse_obj(configuration or {})
+
+    def subscribe(
+        self, kind: InvalidationKind, callback: Callable[[str], None]
+    ) -> None:
+        """
+        Call the callback with the key of every event of the given kind, published by any node.
+
+        Args:
+            kind (InvalidationKind): kind of the events.
+            callback (Callable[[str], None]): function evicting the key from a local cache.
+        """
+        self._subscribers.setdefault(kind, []).append(callback)
+
+    async def publish(self, kind: InvalidationKind, key: str) -> None:
+        """
+        Deliver the event to the subscribers of this node, then to the other nodes.
+        A failed broadcast is logged and not raised, the change is already stored.
+
+        Args:
+            kind (InvalidationKind): kind of the event.
+            key (str): key of the changed entity.
+        """
+        self._published += 1
+        self._deliver(kind, key)
+
+        # Until started the node is not following the collection, as when no db is in use.
+        if self._config.backend != InvalidationBackend.MONGO or self._tail_task is None:
+            return
+
+        try:
+            await InvalidationEvent.get_motor_collection().insert_one(
+                {
+                    "kind": kind.value,
+                    "key": key,
+                    "origin": self._origin,
+                    "at": datetime.utcnow(),
+                }
+            )
+        except Exception as e:
+            self._publish_errors += 1
+            self._log_error(f"Invalidation of {kind.value} {key} not broadcast: {e}")
+
+    def start(self) -> None:
+        """
+        Start receiving the events published by the other nodes in background.
+        """
+        if (
+            self._config.backend == InvalidationBackend.MONGO
+            and self._tail_task is None
+        ):
+            self._tail_task = asyncio.create_task(self._tail())
+
+    def stop(self) -> None:
+        """
+        Stop receiving the events of the other nodes.
+        """
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+            self._tail_task = None
+
+    def stats(self) -> InvalidationBusStats:
+        """
+        Return a snapshot of the bus counters.
+
+        Returns:
+            InvalidationBusStats: bus statistics.
+        """
+        return InvalidationBusStats(
+            backend=self._config.backend,
+            subscribers=sum(len(callbacks) for callbacks in self._subscribers.values()),
+            published=self._published,
+            publish_errors=self._publish_errors,
+            received=self._received,
+            callback_errors=self._callback_errors,
+            tail_restarts=self._tail_restarts,
+        )
+
+    # Private methods.
+    def _deliver(self, kind: InvalidationKind, key: str) -> None:
+        """Call every subscriber of the kind, a failing one does not stop the others."""
+        for callback in self._subscribers.get(kind, ()):
+            try:
+                callback(key)
+            except Exception as e:
+                self._callback_errors += 1
+                self._log_error(f"Invalidation of {kind.value} {key} failed: {e}")
+
+    async def _ensure_capped_collection(self) -> None:
+        """Create the capped collection of the events, unless it already exists."""
+        collection = InvalidationEvent.get_motor_collection()
+        try:
+            await collection.database.create_collection(
+                collection.name, capped=True, size=self._config.capped_size_bytes
+            )
+        except CollectionInvalid:
+            # Created by another node, or implicitly by an insert before the first start.
+            options = await collection.options()
+            if not options.get("capped"):
+                await collection.database.command(
+                    "convertToCapped",
+                    collection.name,
+                    size=self._config.capped_size_bytes,
+                )
+
+    async def _tail(self) -> None:
+        """Deliver the events of the other nodes until cancelled, following the collection again when the cursor fails."""
+        collection = InvalidationEvent.get_motor_collection()
+        since = datetime.utcnow()
+        ensured = False
+        while True:
+            try:
+                if not ensured:
+                    await self._ensure_capped_collection()
+                    ensured = True
+
+                # A tailable cursor matching nothing is closed by the server, the
+                # marker of the node keeps it open even when no event is published.
+                await collection.insert_one(
+                    {
+                        "kind": _MARKER_KIND,
+                        "key": self._origin,
+                        "origin": self._origin,
+                        "at": datetime.utcnow(),
+                    }
+                )
+                cursor = collection.find(
+                    {"at": {"$gte": since - _CLOCK_SKEW}},
+                    {"_id": 0, "kind": 1, "key": 1, "origin": 1, "at": 1},
+                    cursor_type=CursorType.TAILABLE_AWAIT,
+                ).max_await_time_ms(self._config.max_await_ms)
+                while cursor.alive:
+                    async for event in cursor:
+                        since = max(since, event["at"])
+                        # The events of this node are delivered when published.
+                        if event["origin"] == self._origin:
+                            continue
+                        try:
+                            kind = InvalidationKind(event["kind"])
+                        except ValueError:
+                            # A marker, or published by a newer version of the api.
+                            continue
+                        self._received += 1
+                        self._deliver(kind, event["key"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._log_error(f"Invalidation events tail failed: {e}")
+
+            self._tail_restarts += 1
+            await asyncio.sleep(self._config.retry_interval)
+
+    def _log_error(self, message: str) -> None:
+        # Imported here because the container builds this class while importing this module.
+        from src.helpers.container import CONTAINER
+        from src.services.logger.interfaces.i_logger import ILogger
+
+        CONTAINER.get(ILogger).error("core", message)
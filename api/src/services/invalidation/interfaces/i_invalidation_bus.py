@@ -0,0 +1,50 @@
+from typing import Callable, Protocol, runtime_checkable
+
+from src.services.invalidation.enums.kind import InvalidationKind
+from src.services.invalidation.models.configuration import InvalidationBusStats
+
+
+@runtime_checkable
+class IInvalidationBus(Protocol):
+    """
+    Interface where the cache invalidation events broadcasting behaviour is defined.
+    """
+
+    def subscribe(
+        self, kind: InvalidationKind, callback: Callable[[str], None]
+    ) -> None:
+        """
+        Call the callback with the key of every event of the given kind, published by any node.
+
+        Args:
+            kind (InvalidationKind): kind of the events.
+            callback (Callable[[str], None]): function evicting the key from a local cache.
+        """
+
+    async def publish(self, kind: InvalidationKind, key: str) -> None:
+        """
+        Deliver the event to the subscribers of this node, then to the other nodes.
+        A failed broadcast is logged and not raised, the change is already stored.
+
+        Args:
+            kind (InvalidationKind): kind of the event.
+            key (str): key of the changed entity.
+        """
+
+    def start(self) -> None:
+        """
+        Start receiving the events published by the other nodes in background.
+        """
+
+    def stop(self) -> None:
+        """
+        Stop receiving the events of the other nodes.
+        """
+
+    def stats(self) -> InvalidationBusStats:
+        """
+        Return a snapshot of the bus counters.
+
+        Returns:
+            InvalidationBusStats: bus statistics.
+        """
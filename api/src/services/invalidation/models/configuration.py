@@ -0,0 +1,29 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+from src.services.invalidation.enums.backend import InvalidationBackend
+
+
+class InvalidationBusConfig(BaseModel):
+    # "memory" delivers the events to this node only, "mongo" to every node
+    # through a capped collection tailed by each of them.
+    backend: Optional[InvalidationBackend] = InvalidationBackend.MEMORY
+    # Size of the capped collection, the oldest events are overwritten.
+    capped_size_bytes: Optional[int] = Field(default=1048576, gt=4096)
+    # Milliseconds a tailing read waits for new events before polling again.
+    max_await_ms: Optional[int] = Field(default=1000, gt=0)
+    # Seconds to wait before tailing again after the cursor died or failed.
+    retry_interval: Optional[float] = Field(default=0.1, gt=0)
+
+
+class InvalidationBusStats(BaseModel):
+    """Snapshot of the invalidation bus usage."""
+
+    backend: InvalidationBackend
+    subscribers: int
+    published: int
+    publish_errors: int
+    # Events published by the other nodes and delivered to this one.
+    received: int
+    callback_errors: int
+    tail_restarts: int
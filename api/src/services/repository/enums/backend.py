@@ -0,0 +1,6 @@
+from pydantic_yaml import YamlStrEnum
+
+
+class RepositoryBackend(YamlStrEnum):
+    BEANIE = "beanie"
+    MEMORY = "memory"
@@ -0,0 +1,390 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Type
+
+from beanie.odm.enums import SortDirection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.core import counters
+from src.core.exceptions import DuplicateUserError, LastAdminError, StaleRevisionError
+from src.db.collections.user import CASE_INSENSITIVE, User
+from src.models.user import Role
+from src.services.repository.interfaces.i_user_repository import Projection
+from src.services.repository.models.user import UserRecord
+
+
+def _duplicate_user_error(e: DuplicateKeyError) -> DuplicateUserError:
+    """Return the error of the duplicate key error raised by a write."""
+    duplicates = dict(e.details).get("keyPattern")
+    return DuplicateUserError(
+        loggable=str(e), msg=f"The following fields must be unique: {duplicates}"
+    )
+
+
+class BeanieUserRepository:
+    """
+    Implementation of the IUserRepository interface storing the users in the
+    MongoDB users collection, through Beanie and the motor collection for the
+    atomic updates. The unique indexes enforce the uniqueness, the users
+    counters of src.core.counters are kept up to date by every write.
+    Usernames and emails are matched ignoring the case, every query on them
+    passes the collation of their indexes to stay an index seek.
+    """
+
+    async def get(self, username: str) -> Optional[UserRecord]:
+        """
+        Return the user with the given username.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[UserRecord]: the user, None if it does not exist.
+        """
+        user = await User.get_motor_collection().find_one(
+            {"username": username}, projection={"_id": 0}, collation=CASE_INSENSITIVE
+        )
+        return None if user is None else UserRecord.parse_obj(user)
+
+    async def create(self, user: UserRecord) -> None:
+        """
+        Store a new user.
+
+        Args:
+            user (UserRecord): user to store.
+
+        Raises:
+            DuplicateUserError: when the username or the email are already in use.
+        """
+        try:
+            await User.parse_obj(user.dict()).insert()
+        except DuplicateKeyError as e:
+            raise _duplicate_user_error(e)
+        await counters.add_user(user.roles)
+
+    async def list(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+    ) -> List[Projection]:
+        """
+        Return a page of users sorted by username.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            limit (Optional[int], optional): maximum number of users, no limit if None or 0. Defaults to None.
+            skip (Optional[int], optional): number of users to skip. Defaults to None.
+
+        Returns:
+            List[Projection]: the users of the page.
+        """
+        # The page starts right after the cursor on the username index, whatever its depth.
+        filters = [] if after is None else [User.username > after]
+        return await User.find(
+            *filters,
+            projection_model=projection,
+            limit=limit,
+            skip=skip,
+            sort=[("username", SortDirection.ASCENDING)],
+            collation=CASE_INSENSITIVE,
+        ).to_list()
+
+    async def iterate(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[Projection]:
+        """
+        Iterate over every user sorted by username, without holding them all in memory.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            batch_size (Optional[int], optional): users read at once from the storage. Defaults to None.
+
+        Returns:
+            AsyncIterator[Projection]: the users.
+        """
+        filters = [] if after is None else [User.username > after]
+        async for user in User.find(
+            *filters,
+            projection_model=projection,
+            sort=[("username", SortDirection.ASCENDING)],
+            batch_size=batch_size,
+            collation=CASE_INSENSITIVE,
+        ):
+            yield user
+
+    async def count(self, role: Optional[str] = None) -> int:
+        """
+        Return the exact number of users, or of users with the given role, from the counters.
+
+        Args:
+            role (Optional[str], optional): role the users must have. Defaults to None.
+
+        Returns:
+            int: number of users.
+        """
+        return await counters.count_users(role)
+
+    async def estimate_count(self) -> int:
+        """
+        Return the number of users from the collection metadata, without reading any document.
+
+        Returns:
+            int: estimated number of users.
+        """
+        return await counters.estimate_users()
+
+    async def update(
+        self,
+        username: str,
+        email: str,
+        new_username: str,
+        roles: List[str],
+        revision: Optional[int] = None,
+    ) -> Optional[UserRecord]:
+        """
+        Replace the email, the username and the roles of a user, incrementing its revision
+        and, if the roles change, its token version. The last admin never loses the admin
+        role, even by concurrent calls.
+
+        Args:
+            username (str): current username of the user.
+            email (str): new email.
+            new_username (str): new username.
+            roles (List[str]): new roles.
+            revision (Optional[int], optional): update only if the user is still at this revision. Defaults to None.
+
+        Raises:
+            DuplicateUserError: when the new username or email are in use by another user.
+            StaleRevisionError: when the user has been changed since the given revision.
+            LastAdminError: when the admin role would be removed from the last admin.
+
+        Returns:
+            Optional[UserRecord]: the user before the update, None if it does not exist.
+        """
+        user_filter: Dict[str, object] = {"username": username}
+        if revision is not None:
+            # Users saved before revisions existed are at revision 0.
+            user_filter["revision"] = {"$in": [0, None]} if revision == 0 else revision
+
+        users_collection = User.get_motor_collection()
+        claimed_roles = []
+        if Role.ADMIN.value in roles:
+            previous_user = await self._replace(user_filter, email, new_username, roles)
+        else:
+            # Most users are not admins, they are updated in a single round trip.
+            previous_user = await self._replace(
+                {**user_filter, "roles": {"$ne": Role.ADMIN.value}},
+                email,
+                new_username,
+                roles,
+            )
+            if previous_user is None and await users_collection.find_one(
+                {**user_filter, "roles": Role.ADMIN.value},
+                projection={"_id": 1},
+                collation=CASE_INSENSITIVE,
+            ):
+                # An admin losing the role, claimed first as in delete so the last one keeps it.
+                if not await counters.claim_role_removal(Role.ADMIN.value):
+                    raise LastAdminError(
+                        loggable=f"Refused the update of {username}, the last admin",
+                        msg="Trying to remove the admin role from the last admin user, impossible.",
+                    )
+                claimed_roles.append(Role.ADMIN.value)
+                try:
+                    previous_user = await self._replace(
+                        {**user_filter, "roles": Role.ADMIN.value},
+                        email,
+                        new_username,
+                        roles,
+                    )
+                finally:
+                    if previous_user is None:
+                        await counters.release_role_removal(Role.ADMIN.value)
+
+        # Nothing matched, either the user does not exist or it has been changed meanwhile.
+        if previous_user is None:
+            if revision is not None and await users_collection.find_one(
+                {"username": username},
+                projection={"_id": 1},
+                collation=CASE_INSENSITIVE,
+            ):
+                raise StaleRevisionError(
+                    loggable=f"Stale revision {revision} in the update of {username}",
+                    msg="The user has been changed since it was read.",
+                )
+            return None
+
+        await counters.change_user_roles(previous_user["roles"], roles, claimed_roles)
+        return UserRecord.parse_obj(previous_user)
+
+    async def delete(self, username: str) -> Optional[UserRecord]:
+        """
+        Delete a user, the last admin is never deleted, even by concurrent calls.
+
+        Args:
+            username (str): user username.
+
+        Raises:
+            LastAdminError: when the user is the last admin.
+
+        Returns:
+            Optional[UserRecord]: the deleted user, None if it does not exist.
+        """
+        users_collection = User.get_motor_collection()
+        # Most users are not admins, they are deleted in a single round trip.
+        deleted_user = await users_collection.find_one_and_delete(
+            {"username": username, "roles": {"$ne": Role.ADMIN.value}},
+            projection={"_id": 0},
+            collation=CASE_INSENSITIVE,
+        )
+        claimed_roles = []
+        if deleted_user is None:
+            # Either an admin or a missing user, a missing one never touches the counters.
+            if not await users_collection.find_one(
+                {"username": username, "roles": Role.ADMIN.value},
+                projection={"_id": 1},
+                collation=CASE_INSENSITIVE,
+            ):
+                return None
+            # The admins counter is decremented first, only if another admin is left,
+            # so concurrent deletes never remove the last one.
+            if not await counters.claim_role_removal(Role.ADMIN.value):
+                raise LastAdminError(
+                    loggable=f"Refused the deletion of {username}, the last admin",
+                    msg="Trying to delete the last admin user, impossible.",
+                )
+            claimed_roles.append(Role.ADMIN.value)
+            try:
+                deleted_user = await users_collection.find_one_and_delete(
+                    {"username": username, "roles": Role.ADMIN.value},
+                    projection={"_id": 0},
+                    collation=CASE_INSENSITIVE,
+                )
+            finally:
+                if deleted_user is None:
+                    await counters.release_role_removal(Role.ADMIN.value)
+
+        if deleted_user is None:
+            return None
+
+        await counters.remove_user(deleted_user["roles"], claimed_roles)
+        return UserRecord.parse_obj(deleted_user)
+
+    async def update_password(
+        self, username: str, hashed_password: str, new_hashed_password: str
+    ) -> bool:
+        """
+        Replace the password hash of a user, only if it did not change meanwhile.
+
+        Args:
+            username (str): user username.
+            hashed_password (str): current password hash.
+            new_hashed_password (str): new password hash.
+
+        Returns:
+            bool: True if the hash has been replaced.
+        """
+        result = await User.get_motor_collection().update_one(
+            {"username": username, "password": hashed_password},
+            {"$set": {"password": new_hashed_password}},
+            collation=CASE_INSENSITIVE,
+        )
+        return result.modified_count == 1
+
+    async def bump_token_version(self, username: str) -> Optional[int]:
+        """
+        Increment the token version of a user, invalidating every token issued to it.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[int]: the new token version, None if the user does not exist.
+        """
+        updated = await User.get_motor_collection().find_one_and_update(
+            {"username": username},
+            {
+                "$inc": {"token_version": 1},
+                "$set": {"last_update": datetime.utcnow()},
+            },
+            projection={"_id": 0, "token_version": 1},
+            return_document=ReturnDocument.AFTER,
+            collation=CASE_INSENSITIVE,
+        )
+        return None if updated is None else updated["token_version"]
+
+    async def token_versions(self, usernames: Iterable[str]) -> Dict[str, int]:
+        """
+        Return the token versions of the given users.
+
+        Args:
+            usernames (Iterable[str]): usernames to read.
+
+        Returns:
+            Dict[str, int]: token version by username, the missing users are not returned.
+        """
+        return await self._token_versions({"username": {"$in": list(usernames)}})
+
+    async def token_versions_changed_since(self, since: datetime) -> Dict[str, int]:
+        """
+        Return the token versions of the users changed since the given time.
+
+        Args:
+            since (datetime): earliest last update, UTC.
+
+        Returns:
+            Dict[str, int]: token version by username.
+        """
+        return await self._token_versions({"last_update": {"$gte": since}})
+
+    # Private methods.
+    async def _replace(
+        self, user_filter: dict, email: str, new_username: str, roles: List[str]
+    ) -> Optional[dict]:
+        """Update the user matching the filter in a single atomic round trip, returning it as before the update."""
+        try:
+            # User values are wrapped in $literal, a leading $ would read a field otherwise.
+            return await User.get_motor_collection().find_one_and_update(
+                user_filter,
+                [
+                    {
+                        "$set": {
+                            "email": {"$literal": email},
+                            "username": {"$literal": new_username},
+                            "roles": {"$literal": roles},
+                            "last_update": datetime.utcnow(),
+                            "revision": {"$add": [{"$ifNull": ["$revision", 0]}, 1]},
+                            # Tokens carry the roles, they are invalidated when the roles change.
+                            "token_version": {
+                                "$cond": [
+                                    {"$setEquals": ["$roles", {"$literal": roles}]},
+                                    "$token_version",
+                                    {"$add": [{"$ifNull": ["$token_version", 0]}, 1]},
+                                ]
+                            },
+                        }
+                    }
+                ],
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE,
+                collation=CASE_INSENSITIVE,
+            )
+        except DuplicateKeyError as e:
+            raise _duplicate_user_error(e)
+
+    async def _token_versions(self, user_filter: dict) -> Dict[str, int]:
+        """Return the token versions of the users matching the filter."""
+        versions: Dict[str, int] = {}
+        async for user in User.get_motor_collection().find(
+            user_filter,
+            {"_id": 0, "username": 1, "token_version": 1},
+            collation=CASE_INSENSITIVE,
+        ):
+            versions[user["username"]] = user.get("token_version", 0)
+        return versions
@@ -0,0 +1,361 @@
+from bisect import bisect_right, insort
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, Dict, Final, Iterable, List, Optional, Type
+
+from src.core.exceptions import DuplicateUserError, LastAdminError, StaleRevisionError
+from src.models.user import Role
+from src.services.repository.interfaces.i_user_repository import Projection
+from src.services.repository.models.user import UserRecord
+
+# In the case-insensitive collation of the db "_" and "." sort before the digits and
+# the letters, "_" first. The other username characters already sort as in the db.
+_COLLATION_ORDER: Final[Dict[int, str]] = str.maketrans({"_": "\x01", ".": "\x02"})
+
+
+class MemoryUserRepository:
+    """
+    Implementation of the IUserRepository interface keeping the users in the
+    process memory, with the same semantics of the database one: unique
+    usernames and emails, users sorted by username and the last admin guard.
+    The users are indexed by username and by email and a sorted list of the
+    usernames serves the pages, so the api can be profiled and load tested
+    without a database. Every user read or written is a copy, as from a db.
+    Usernames and emails are matched ignoring the case, the indexes are keyed
+    by their case folded values as the case-insensitive collation of the db.
+    The pages follow the order of that collation for the valid usernames,
+    made of [a-z0-9._], other characters are sorted by code point instead.
+    """
+
+    # folded username -> user
+    _users: Dict[str, UserRecord]
+    # folded email -> folded username
+    _emails: Dict[str, str]
+    # Folded usernames sorted as in the db, the index of the pages.
+    _usernames: List[str]
+    _roles: Counter
+
+    def __init__(self) -> None:
+        """
+        Create an empty repository.
+        """
+        # Everything is only touched from the event loop thread and never across
+        # an await, every operation is atomic without a lock.
+        self._users = {}
+        self._emails = {}
+        self._usernames = []
+        self._roles = Counter()
+
+    async def get(self, username: str) -> Optional[UserRecord]:
+        """
+        Return the user with the given username.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[UserRecord]: the user, None if it does not exist.
+        """
+        user = self._users.get(_fold(username))
+        return None if user is None else user.copy(deep=True)
+
+    async def create(self, user: UserRecord) -> None:
+        """
+        Store a new user.
+
+        Args:
+            user (UserRecord): user to store.
+
+        Raises:
+            DuplicateUserError: when the username or the email are already in use.
+        """
+        if _fold(user.username) in self._users:
+            raise _duplicate_user_error("username", user.username)
+        if _fold(user.email) in self._emails:
+            raise _duplicate_user_error("email", user.email)
+
+        self._insert(user.copy(deep=True))
+
+    async def list(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+    ) -> List[Projection]:
+        """
+        Return a page of users sorted by username.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            limit (Optional[int], optional): maximum number of users, no limit if None or 0. Defaults to None.
+            skip (Optional[int], optional): number of users to skip. Defaults to None.
+
+        Returns:
+            List[Projection]: the users of the page.
+        """
+        start = self._start(after) + (skip or 0)
+        end = start + limit if limit else len(self._usernames)
+        return [
+            projection.parse_obj(self._users[username].dict())
+            for username in self._usernames[start:end]
+        ]
+
+    async def iterate(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[Projection]:
+        """
+        Iterate over every user sorted by username, without holding them all in memory.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            batch_size (Optional[int], optional): ignored, the users are already in memory. Defaults to None.
+
+        Returns:
+            AsyncIterator[Projection]: the users.
+        """
+        # The users may change while the consumer awaits, each step starts again
+        # right after the last username as a db cursor would.
+        last_username = None if after is None else _fold(after)
+        while True:
+            start = self._start(last_username)
+            if start == len(self._usernames):
+                return
+            last_username = self._usernames[start]
+            yield projection.parse_obj(self._users[last_username].dict())
+
+    async def count(self, role: Optional[str] = None) -> int:
+        """
+        Return the exact number of users, or of users with the given role.
+
+        Args:
+            role (Optional[str], optional): role the users must have. Defaults to None.
+
+        Returns:
+            int: number of users.
+        """
+        if role is None:
+            return len(self._users)
+        return self._roles[getattr(role, "value", role)]
+
+    async def estimate_count(self) -> int:
+        """
+        Return the number of users, exact in memory.
+
+        Returns:
+            int: number of users.
+        """
+        return len(self._users)
+
+    async def update(
+        self,
+        username: str,
+        email: str,
+        new_username: str,
+        roles: List[str],
+        revision: Optional[int] = None,
+    ) -> Optional[UserRecord]:
+        """
+        Replace the email, the username and the roles of a user, incrementing its revision
+        and, if the roles change, its token version. The last admin never loses the admin
+        role, even by concurrent calls.
+
+        Args:
+            username (str): current username of the user.
+            email (str): new email.
+            new_username (str): new username.
+            roles (List[str]): new roles.
+            revision (Optional[int], optional): update only if the user is still at this revision. Defaults to None.
+
+        Raises:
+            DuplicateUserError: when the new username or email are in use by another user.
+            StaleRevisionError: when the user has been changed since the given revision.
+            LastAdminError: when the admin role would be removed from the last admin.
+
+        Returns:
+            Optional[UserRecord]: the user before the update, None if it does not exist.
+        """
+        key = _fold(username)
+        previous_user = self._users.get(key)
+        if previous_user is None:
+            return None
+        if revision is not None and previous_user.revision != revision:
+            raise StaleRevisionError(
+                loggable=f"Stale revision {revision} in the update of {username}",
+                msg="The user has been changed since it was read.",
+            )
+        if (
+            Role.ADMIN.value in previous_user.roles
+            and Role.ADMIN.value not in roles
+            and self._roles[Role.ADMIN.value] <= 1
+        ):
+            raise LastAdminError(
+                loggable=f"Refused the update of {username}, the last admin",
+                msg="Trying to remove the admin role from the last admin user, impossible.",
+            )
+        if _fold(new_username) != key and _fold(new_username) in self._users:
+            raise _duplicate_user_error("username", new_username)
+        if self._emails.get(_fold(email), key) != key:
+            raise _duplicate_user_error("email", email)
+
+        token_version = previous_user.token_version
+        # Tokens carry the roles, they are invalidated when the roles change.
+        if set(previous_user.roles) != set(roles):
+            token_version += 1
+
+        self._remove(key)
+        self._insert(
+            previous_user.copy(
+                update={
+                    "email": email,
+                    "username": new_username,
+                    "roles": list(roles),
+                    "last_update": datetime.utcnow(),
+                    "revision": previous_user.revision + 1,
+                    "token_version": token_version,
+                }
+            )
+        )
+        return previous_user
+
+    async def delete(self, username: str) -> Optional[UserRecord]:
+        """
+        Delete a user, the last admin is never deleted.
+
+        Args:
+            username (str): user username.
+
+        Raises:
+            LastAdminError: when the user is the last admin.
+
+        Returns:
+            Optional[UserRecord]: the deleted user, None if it does not exist.
+        """
+        key = _fold(username)
+        user = self._users.get(key)
+        if user is None:
+            return None
+        if Role.ADMIN.value in user.roles and self._roles[Role.ADMIN.value] <= 1:
+            raise LastAdminError(
+                loggable=f"Refused the deletion of {username}, the last admin",
+                msg="Trying to delete the last admin user, impossible.",
+            )
+
+        self._remove(key)
+        return user
+
+    async def update_password(
+        self, username: str, hashed_password: str, new_hashed_password: str
+    ) -> bool:
+        """
+        Replace the password hash of a user, only if it did not change meanwhile.
+
+        Args:
+            username (str): user username.
+            hashed_password (str): current password hash.
+            new_hashed_password (str): new password hash.
+
+        Returns:
+            bool: True if the hash has been replaced.
+        """
+        user = self._users.get(_fold(username))
+        if user is None or user.password != hashed_password:
+            return False
+        user.password = new_hashed_password
+        return True
+
+    async def bump_token_version(self, username: str) -> Optional[int]:
+        """
+        Increment the token version of a user, invalidating every token issued to it.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[int]: the new token version, None if the user does not exist.
+        """
+        user = self._users.get(_fold(username))
+        if user is None:
+            return None
+        user.token_version += 1
+        user.last_update = datetime.utcnow()
+        return user.token_version
+
+    async def token_versions(self, usernames: Iterable[str]) -> Dict[str, int]:
+        """
+        Return the token versions of the given users.
+
+        Args:
+            usernames (Iterable[str]): usernames to read.
+
+        Returns:
+            Dict[str, int]: token version by username, the missing users are not returned.
+        """
+        found_users = (self._users.get(_fold(username)) for username in usernames)
+        return {user.username: user.token_version for user in found_users if user}
+
+    async def token_versions_changed_since(self, since: datetime) -> Dict[str, int]:
+        """
+        Return the token versions of the users changed since the given time.
+
+        Args:
+            since (datetime): earliest last update, UTC.
+
+        Returns:
+            Dict[str, int]: token version by username.
+        """
+        return {
+            user.username: user.token_version
+            for user in self._users.values()
+            if user.last_update >= since
+        }
+
+    # Private methods.
+    def _start(self, after: Optional[str]) -> int:
+        """Return the position of the first username greater than after."""
+        if after is None:
+            return 0
+        return bisect_right(
+            self._usernames, _collation_key(_fold(after)), key=_collation_key
+        )
+
+    def _insert(self, user: UserRecord) -> None:
+        """Store the user and index it, its username and email must be free."""
+        key = _fold(user.username)
+        self._users[key] = user
+        self._emails[_fold(user.email)] = key
+        insort(self._usernames, key, key=_collation_key)
+        self._roles.update(set(user.roles))
+
+    def _remove(self, key: str) -> None:
+        """Drop the user with the folded username and its index entries."""
+        user = self._users.pop(key)
+        del self._emails[_fold(user.email)]
+        position = bisect_right(
+            self._usernames, _collation_key(key), key=_collation_key
+        )
+        del self._usernames[position - 1]
+        self._roles.subtract(set(user.roles))
+
+
+def _fold(value: str) -> str:
+    """Return the value to compare ignoring the case."""
+    return value.casefold()
+
+
+def _collation_key(folded: str) -> str:
+    """Return the key sorting the folded usernames as the collation of the db."""
+    return folded.translate(_COLLATION_ORDER)
+
+
+def _duplicate_user_error(field: str, value: str) -> DuplicateUserError:
+    """Return the error of a duplicate field, with the message of the database one."""
+    return DuplicateUserError(
+        loggable=f"Duplicate {field}: {value}",
+        msg=f"The following fields must be unique: {{'{field}': 1}}",
+    )
@@ -0,0 +1,196 @@
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Type,
+    TypeVar,
+    runtime_checkable,
+)
+
+from pydantic import BaseModel
+from src.services.repository.models.user import UserRecord
+
+Projection = TypeVar("Projection", bound=BaseModel)
+
+
+@runtime_checkable
+class IUserRepository(Protocol):
+    """
+    Interface where the users storage behaviour is defined.
+    Usernames and emails are unique and matched ignoring the case, the users
+    are listed sorted by username.
+    """
+
+    async def get(self, username: str) -> Optional[UserRecord]:
+        """
+        Return the user with the given username.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[UserRecord]: the user, None if it does not exist.
+        """
+
+    async def create(self, user: UserRecord) -> None:
+        """
+        Store a new user.
+
+        Args:
+            user (UserRecord): user to store.
+
+        Raises:
+            DuplicateUserError: when the username or the email are already in use.
+        """
+
+    async def list(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+    ) -> List[Projection]:
+        """
+        Return a page of users sorted by username.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            limit (Optional[int], optional): maximum number of users, no limit if None or 0. Defaults to None.
+            skip (Optional[int], optional): number of users to skip. Defaults to None.
+
+        Returns:
+            List[Projection]: the users of the page.
+        """
+
+    def iterate(
+        self,
+        projection: Type[Projection],
+        after: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[Projection]:
+        """
+        Iterate over every user sorted by username, without holding them all in memory.
+
+        Args:
+            projection (Type[Projection]): model of the returned users.
+            after (Optional[str], optional): only the users with a greater username are returned. Defaults to None.
+            batch_size (Optional[int], optional): users read at once from the storage. Defaults to None.
+
+        Returns:
+            AsyncIterator[Projection]: the users.
+        """
+
+    async def count(self, role: Optional[str] = None) -> int:
+        """
+        Return the exact number of users, or of users with the given role.
+
+        Args:
+            role (Optional[str], optional): role the users must have. Defaults to None.
+
+        Returns:
+            int: number of users.
+        """
+
+    async def estimate_count(self) -> int:
+        """
+        Return the number of users as cheaply as possible, it may be slightly off.
+
+        Returns:
+            int: estimated number of users.
+        """
+
+    async def update(
+        self,
+        username: str,
+        email: str,
+        new_username: str,
+        roles: List[str],
+        revision: Optional[int] = None,
+    ) -> Optional[UserRecord]:
+        """
+        Replace the email, the username and the roles of a user, incrementing its revision
+        and, if the roles change, its token version. The last admin never loses the admin
+        role, even by concurrent calls.
+
+        Args:
+            username (str): current username of the user.
+            email (str): new email.
+            new_username (str): new username.
+            roles (List[str]): new roles.
+            revision (Optional[int], optional): update only if the user is still at this revision. Defaults to None.
+
+        Raises:
+            DuplicateUserError: when the new username or email are in use by another user.
+            StaleRevisionError: when the user has been changed since the given revision.
+            LastAdminError: when the admin role would be removed from the last admin.
+
+        Returns:
+            Optional[UserRecord]: the user before the update, None if it does not exist.
+        """
+
+    async def delete(self, username: str) -> Optional[UserRecord]:
+        """
+        Delete a user, the last admin is never deleted, even by concurrent calls.
+
+        Args:
+            username (str): user username.
+
+        Raises:
+            LastAdminError: when the user is the last admin.
+
+        Returns:
+            Optional[UserRecord]: the deleted user, None if it does not exist.
+        """
+
+    async def update_password(
+        self, username: str, hashed_password: str, new_hashed_password: str
+    ) -> bool:
+        """
+        Replace the password hash of a user, only if it did not change meanwhile.
+
+        Args:
+            username (str): user username.
+            hashed_password (str): current password hash.
+            new_hashed_password (str): new password hash.
+
+        Returns:
+            bool: True if the hash has been replaced.
+        """
+
+    async def bump_token_version(self, username: str) -> Optional[int]:
+        """
+        Increment the token version of a user, invalidating every token issued to it.
+
+        Args:
+            username (str): user username.
+
+        Returns:
+            Optional[int]: the new token version, None if the user does not exist.
+        """
+
+    async def token_versions(self, usernames: Iterable[str]) -> Dict[str, int]:
+        """
+        Return the token versions of the given users.
+
+        Args:
+            usernames (Iterable[str]): usernames to read.
+
+        Returns:
+            Dict[str, int]: token version by username, the missing users are not returned.
+        """
+
+    async def token_versions_changed_since(self, since: datetime) -> Dict[str, int]:
+        """
+        Return the token versions of the users changed since the given time.
+
+        Args:
+            since (datetime): earliest last update, UTC.
+
+        Returns:
+            Dict[str, int]: token version by username.
+        """
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel
+
+
+class UserRecord(BaseModel):
+    """A stored user, as read from and written to the user repositories."""
+
+    email: str
+    username: str
+    password: str
+    roles: List[str]
+    creation: datetime
+    last_update: datetime
+    # Bumped to invalidate every token issued to the user.
+    token_version: int = 0
+    # Incremented by every update, returned as ETag for the conditional updates.
+    revision: int = 0
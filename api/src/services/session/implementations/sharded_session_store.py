@@ -0,0 +1,246 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from hashlib import sha256
+from os.path import exists as os_path_exists
+from os.path import isfile as os_path_isfile
+from secrets import token_urlsafe
+from threading import Lock
+from time import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+from src.db.collections.session import Session
+from src.services.session.models.configuration import (
+    SessionStoreConfig,
+    SessionStoreStats,
+)
+from yaml import safe_load
+
+# Random bytes of every opaque token, encoded as 43 url safe characters.
+_TOKEN_BYTES = 32
+
+
+class ShardedSessionStore:
+    """
+    Implementation of the ISessionStore interface keeping the sessions in
+    memory, spread on independent shards so a lookup only holds the lock of
+    one shard and a sweep never blocks the whole store.
+    The sessions are keyed by the digest of the token, the raw tokens are
+    never kept. When persistence is enabled the sessions are written to the
+    db too and read from it on a local miss, e.g. after a restart.
+    """
+
+    _config: SessionStoreConfig
+    # digest -> (expiration, claims)
+    _shards: List[Dict[str, Tuple[float, dict]]]
+    _locks: List[Lock]
+    _sweep_task: Optional[asyncio.Task]
+    _hits: int
+    _misses: int
+    _database_hits: int
+    _expirations: int
+
+    def __init__(self, config_file_path: Optional[str] = None) -> None:
+        """
+        Create a new empty store, if no configuration file is passed the default configuration is applied.
+
+        Args:
+            config_file_path (Optional[str], optional): absolute path of the configuration file. Defaults to None.
+        """
+        self._config = SessionStoreConfig()
+        if config_file_path is not None:
+            self.file_config(config_file_path)
+
+        self._shards = [{} for _ in range(self._config.shards)]
+        self._locks = [Lock() for _ in range(self._config.shards)]
+        self._sweep_task = None
+        self._hits = 0
+        self._misses = 0
+        self._database_hits = 0
+        self._expirations = 0
+
+    def file_config(self, config_file_path: str) -> None:
+        """
+        Read the store configuration from a valid configuration file.
+
+        Args:
+            config_file_path (str): absolute path of the configuration file.
+        """
+        if not os_path_exists(config_file_path) or not os_path_isfile(config_file_path):
+            raise FileNotFoundError
+
+        configuration: dict = {}
+        try:
+            with open(config_file_path, "r") as config_file_stream:
+                configuration = safe_load(config_file_stream)
+        except Exception as e:
+            print(e)
+            sys.exit()
+
+        self._config = SessionStoreConfig.parse_obj(configuration or {})
+
+    async def create(self, claims: Mapping[str, Any], expires_at: int) -> str:
+        """
+        Store a new session and return the opaque token referencing it.
+
+        Args:
+            claims (Mapping[str, Any]): session claims, the same a jwt would carry.
+            expires_at (int): session expiration as unix timestamp.
+
+        Returns:
+            str: the opaque token.
+        """
+        session_claims = dict(claims)
+        while True:
+            token = token_urlsafe(_TOKEN_BYTES)
+            digest = self._digest(token)
+            if self._config.persist:
+                try:
+                    await Session(
+                        digest=digest,
+                        claims=session_claims,
+                        exp=datetime.utcfromtimestamp(expires_at),
+                    ).insert()
+                except DuplicateKeyError:
+                    # Practically impossible with 256 random bits, just draw again.
+                    continue
+            break
+
+        self._put(digest, session_claims, expires_at)
+        return token
+
+    async def get(self, token: str) -> Optional[dict]:
+        """
+        Return the claims of the session referenced by the token.
+
+        Args:
+            token (str): opaque token.
+
+        Returns:
+            Optional[dict]: the session claims, None if missing or expired.
+        """
+        if not token:
+            self._misses += 1
+            return None
+
+        digest = self._digest(token)
+        shard_index = self._shard_index(digest)
+        with self._locks[shard_index]:
+            entry = self._shards[shard_index].get(digest)
+            if entry is not None and entry[0] <= time():
+                del self._shards[shard_index][digest]
+                self._expirations += 1
+                entry = None
+
+        if entry is None and self._config.persist:
+            session = await Session.find_one(Session.digest == digest)
+            # The TTL monitor runs once a minute, expired documents may still be there.
+            if session is not None and session.exp > datetime.utcnow():
+                expires_at = session.exp.replace(tzinfo=timezone.utc).timestamp()
+                self._put(digest, session.claims, expires_at)
+                self._database_hits += 1
+                entry = (expires_at, session.claims)
+
+        if entry is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return dict(entry[1])
+
+    async def delete(self, token: str) -> bool:
+        """
+        Delete the session referenced by the token. Only one of many concurrent
+        deletions of the same session succeeds, so it can be used as a claim.
+
+        Args:
+            token (str): opaque token.
+
+        Returns:
+            bool: True if the session has been deleted now, False if it was already missing.
+        """
+        if not token:
+            return False
+
+        digest = self._digest(token)
+        shard_index = self._shard_index(digest)
+        with self._locks[shard_index]:
+            entry = self._shards[shard_index].pop(digest, None)
+
+        # The db is the source of truth when shared by many nodes.
+        if self._config.persist:
+            result = await Session.get_motor_collection().delete_one({"digest": digest})
+            return result.deleted_count == 1
+        return entry is not None and entry[0] > time()
+
+    def sweep(self) -> int:
+        """
+        Remove the expired sessions from memory, one shard at a time.
+
+        Returns:
+            int: the number of removed sessions.
+        """
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            now = time()
+            with lock:
+                expired = [digest for digest, entry in shard.items() if entry[0] <= now]
+                for digest in expired:
+                    del shard[digest]
+            removed += len(expired)
+        self._expirations += removed
+        return removed
+
+    def start(self) -> None:
+        """
+        Start sweeping the expired sessions periodically in background.
+        """
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_periodically())
+
+    def stop(self) -> None:
+        """
+        Stop the periodic sweep.
+        """
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+    def stats(self) -> SessionStoreStats:
+        """
+        Return a snapshot of the store usage.
+
+        Returns:
+            SessionStoreStats: store statistics.
+        """
+        return SessionStoreStats(
+            sessions=sum(len(shard) for shard in self._shards),
+            shards=len(self._shards),
+            persist=self._config.persist,
+            hits=self._hits,
+            misses=self._misses,
+            database_hits=self._database_hits,
+            expirations=self._expirations,
+        )
+
+    # Private methods.
+    def _digest(self, token: str) -> str:
+        """Return the digest identifying the session of the token."""
+        return sha256(token.encode()).hexdigest()
+
+    def _shard_index(self, digest: str) -> int:
+        """Return the shard holding the session with the given digest."""
+        return int(digest[:8], 16) % len(self._shards)
+
+    def _put(self, digest: str, claims: dict, expires_at: float) -> None:
+        """Store the session in its shard."""
+        shard_index = self._shard_index(digest)
+        with self._locks[shard_index]:
+            self._shards[shard_index][digest] = (expires_at, claims)
+
+    async def _sweep_periodically(self) -> None:
+        """Sweep the expired sessions every sweep interval until cancelled."""
+        while True:
+            await asyncio.sleep(self._config.sweep_interval)
+            self.sweep()
@@ -0,0 +1,63 @@
+from typing import Any, Mapping, Optional, Protocol, runtime_checkable
+
+from src.services.session.models.configuration import SessionStoreStats
+
+
+@runtime_checkable
+class ISessionStore(Protocol):
+    """
+    Interface where the opaque tokens sessions storage behaviour is defined.
+    """
+
+    async def create(self, claims: Mapping[str, Any], expires_at: int) -> str:
+        """
+        Store a new session and return the opaque token referencing it.
+
+        Args:
+            claims (Mapping[str, Any]): session claims, the same a jwt would carry.
+            expires_at (int): session expiration as unix timestamp.
+
+        Returns:
+            str: the opaque token.
+        """
+
+    async def get(self, token: str) -> Optional[dict]:
+        """
+        Return the claims of the session referenced by the token.
+
+        Args:
+            token (str): opaque token.
+
+        Returns:
+            Optional[dict]: the session claims, None if missing or expired.
+        """
+
+    async def delete(self, token: str) -> bool:
+        """
+        Delete the session referenced by the token. Only one of many concurrent
+        deletions of the same session succeeds, so it can be used as a claim.
+
+        Args:
+            token (str): opaque token.
+
+        Returns:
+            bool: True if the session has been deleted now, False if it was already missing.
+        """
+
+    def start(self) -> None:
+        """
+        Start sweeping the expired sessions periodically in background.
+        """
+
+    def stop(self) -> None:
+        """
+        Stop the periodic sweep.
+        """
+
+    def stats(self) -> SessionStoreStats:
+        """
+        Return a snapshot of the store usage.
+
+        Returns:
+            SessionStoreStats: store statistics.
+        """
@@ -0,0 +1,26 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SessionStoreConfig(BaseModel):
+    # Number of independent dictionaries (and locks) the sessions are spread on.
+    shards: Optional[int] = Field(default=16, gt=0)
+    # Seconds between two sweeps of the expired sessions.
+    sweep_interval: Optional[float] = Field(default=60, gt=0)
+    # When true the sessions are also stored in the db, so they survive
+    # a restart and are shared by every node.
+    persist: Optional[bool] = False
+
+
+class SessionStoreStats(BaseModel):
+    """Snapshot of the session store usage."""
+
+    sessions: int
+    shards: int
+    persist: bool
+    hits: int
+    misses: int
+    # Sessions found in the db only, counted in hits too.
+    database_hits: int
+    expirations: int
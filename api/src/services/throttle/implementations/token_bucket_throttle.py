@@ -0,0 +1,287 @@
+import asyncio
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from os.path import exists as os_path_exists
+from os.path import isfile as os_path_isfile
+from time import time
+from typing import List, Optional, Tuple
+
+from src.db.collections.login_lockout import LoginLockout
+from src.services.throttle.models.configuration import (
+    BucketConfig,
+    ThrottleConfig,
+    ThrottleStats,
+)
+from yaml import safe_load
+
+
+class _Buckets:
+    """Token buckets by key, the least recently used ones are forgotten past max_keys."""
+
+    def __init__(self, config: BucketConfig, max_keys: int) -> None:
+        self._capacity = config.capacity
+        self._refill_seconds = config.refill_seconds
+        self._max_keys = max_keys
+        # key -> [tokens, last refill time]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def peek(self, key: str, now: float) -> float:
+        """Return the seconds to wait before the key has an attempt left, 0 if it has one now."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+
+        tokens = min(
+            self._capacity, bucket[0] + (now - bucket[1]) / self._refill_seconds
+        )
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) * self._refill_seconds
+
+    def consume(self, key: str, now: float) -> None:
+        """Consume an attempt of the key, peek must have allowed it."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self._capacity - 1, now]
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return
+
+        tokens = min(
+            self._capacity, bucket[0] + (now - bucket[1]) / self._refill_seconds
+        )
+        bucket[0] = tokens - 1
+        bucket[1] = now
+        self._buckets.move_to_end(key)
+
+    def refund(self, key: str) -> None:
+        """Give back an attempt consumed by the key."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(self._capacity, bucket[0] + 1)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class TokenBucketLoginThrottle:
+    """
+    Implementation of the ILoginThrottle interface with in-memory token
+    buckets per username and per client ip, plus an exponential lockout of
+    the usernames failing too many consecutive logins.
+    The buckets are local to the node, when persistence is enabled the
+    lockouts are written to the db and read back periodically, so an
+    username locked out on a node is locked out on every node.
+    """
+
+    _config: ThrottleConfig
+    # username -> (consecutive failures, locked until)
+    _lockouts: "OrderedDict[str, Tuple[int, float]]"
+    _sync_task: Optional[asyncio.Task]
+
+    def __init__(self, config_file_path: Optional[str] = None) -> None:
+        """
+        Create a new throttle, if no configuration file is passed the default configuration is applied.
+
+        Args:
+            config_file_path (Optional[str], optional): absolute path of the configuration file. Defaults to None.
+        """
+        self._config = ThrottleConfig()
+        if config_file_path is not None:
+            self.file_config(config_file_path)
+
+        # Everything is only touched from the event loop thread, no lock required.
+        self._username_buckets = _Buckets(self._config.username, self._config.max_keys)
+        self._ip_buckets = _Buckets(self._config.ip, self._config.max_keys)
+        self._lockouts = OrderedDict()
+        self._sync_task = None
+        self._allowed = 0
+        self._rejected_ip = 0
+        self._rejected_username = 0
+        self._rejected_locked = 0
+        self._lockout_count = 0
+
+    def file_config(self, config_file_path: str) -> None:
+        """
+        Read the throttle configuration from a valid configuration file.
+
+        Args:
+            config_file_path (str): absolute path of the configuration file.
+        """
+        if not os_path_exists(config_file_path) or not os_path_isfile(config_file_path):
+            raise FileNotFoundError
+
+        configuration: dict = {}
+        try:
+            with open(config_file_path, "r") as config_file_stream:
+                configuration = safe_load(config_file_stream)
+        except Exception as e:
+            print(e)
+            sys.exit()
+
+        self._config = ThrottleConfig.parse_obj(configuration or {})
+
+    def check(self, username: str, client_ip: str) -> Optional[float]:
+        """
+        Consume a login attempt of the username and of the client ip.
+
+        Args:
+            username (str): username the client is logging in as.
+            client_ip (str): address of the client.
+
+        Returns:
+            Optional[float]: None if the attempt is allowed, otherwise the seconds to wait before retrying.
+        """
+        now = time()
+        lockout = self._lockouts.get(username)
+        if lockout is not None and lockout[1] > now:
+            self._rejected_locked += 1
+            return lockout[1] - now
+
+        # An attempt is consumed only if both buckets allow it.
+        retry_after = self._ip_buckets.peek(client_ip, now)
+        if retry_after > 0:
+            self._rejected_ip += 1
+            return retry_after
+
+        retry_after = self._username_buckets.peek(username, now)
+        if retry_after > 0:
+            self._rejected_username += 1
+            return retry_after
+
+        self._ip_buckets.consume(client_ip, now)
+        self._username_buckets.consume(username, now)
+        self._allowed += 1
+        return None
+
+    async def record_failure(self, username: str) -> None:
+        """
+        Record a failed login of the username, locking it out after too many consecutive failures.
+
+        Args:
+            username (str): username the client tried to log in as.
+        """
+        lockout_config = self._config.lockout
+        failures = self._lockouts.get(username, (0, 0.0))[0] + 1
+        locked_until = 0.0
+        if failures >= lockout_config.threshold:
+            exponent = failures - lockout_config.threshold
+            # The exponent is capped to avoid computing huge powers for long attacks.
+            lockout_seconds = min(
+                lockout_config.max_seconds,
+                lockout_config.base_seconds * 2 ** min(exponent, 32),
+            )
+            locked_until = time() + lockout_seconds
+            self._lockout_count += 1
+
+        self._set_lockout(username, failures, locked_until)
+        if locked_until and self._config.persist:
+            # Concurrent lockouts of the same username from many nodes keep the longest one.
+            await LoginLockout.get_motor_collection().update_one(
+                {"username": username},
+                {
+                    "$max": {
+                        "failures": failures,
+                        "locked_until": datetime.utcfromtimestamp(locked_until),
+                    }
+                },
+                upsert=True,
+            )
+
+    async def record_success(self, username: str, client_ip: str) -> None:
+        """
+        Record a successful login of the username, resetting its failures and
+        giving back the attempt consumed by the username and by the client ip.
+
+        Args:
+            username (str): logged in username.
+            client_ip (str): address of the client.
+        """
+        # Only the failed attempts count, so legitimate clients are never throttled.
+        self._username_buckets.refund(username)
+        self._ip_buckets.refund(client_ip)
+
+        # The lockouts of the other nodes are synced here, no failures means nothing to delete.
+        failures = self._lockouts.pop(username, None)
+        if failures is not None and self._config.persist:
+            await LoginLockout.get_motor_collection().delete_one({"username": username})
+
+    async def sync(self) -> None:
+        """
+        Read the active lockouts stored by every node.
+        """
+        active_lockouts = LoginLockout.get_motor_collection().find(
+            {"locked_until": {"$gt": datetime.utcnow()}},
+            {"_id": 0, "username": 1, "failures": 1, "locked_until": 1},
+        )
+        async for lockout in active_lockouts:
+            locked_until = (
+                lockout["locked_until"] - datetime(1970, 1, 1)
+            ).total_seconds()
+            failures, local_locked_until = self._lockouts.get(
+                lockout["username"], (0, 0.0)
+            )
+            self._set_lockout(
+                lockout["username"],
+                max(failures, lockout["failures"]),
+                max(local_locked_until, locked_until),
+            )
+
+    def start(self) -> None:
+        """
+        Start synchronizing the lockouts with the other nodes in background.
+        """
+        if self._config.persist and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_periodically())
+
+    def stop(self) -> None:
+        """
+        Stop the synchronization.
+        """
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+
+    def stats(self) -> ThrottleStats:
+        """
+        Return a snapshot of the throttle counters.
+
+        Returns:
+            ThrottleStats: throttle statistics.
+        """
+        now = time()
+        return ThrottleStats(
+            allowed=self._allowed,
+            rejected_ip=self._rejected_ip,
+            rejected_username=self._rejected_username,
+            rejected_locked=self._rejected_locked,
+            lockouts=self._lockout_count,
+            tracked_ips=len(self._ip_buckets),
+            tracked_usernames=len(self._username_buckets),
+            locked_usernames=sum(
+                locked_until > now for _, locked_until in self._lockouts.values()
+            ),
+        )
+
+    # Private methods.
+    def _set_lockout(self, username: str, failures: int, locked_until: float) -> None:
+        """Store the failures of the username, forgetting the least recent ones past max_keys."""
+        self._lockouts[username] = (failures, locked_until)
+        self._lockouts.move_to_end(username)
+        if len(self._lockouts) > self._config.max_keys:
+            self._lockouts.popitem(last=False)
+
+    async def _sync_periodically(self) -> None:
+        """Synchronize the lockouts every sync interval until cancelled."""
+        # Imported here because the container builds this class while importing this module.
+        from src.helpers.container import CONTAINER
+        from src.services.logger.interfaces.i_logger import ILogger
+
+        logger = CONTAINER.get(ILogger)
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error("core", f"Login lockouts sync failed: {e}")
+            await asyncio.sleep(self._config.sync_interval)
@@ -0,0 +1,58 @@
+from typing import Optional, Protocol, runtime_checkable
+
+from src.services.throttle.models.configuration import ThrottleStats
+
+
+@runtime_checkable
+class ILoginThrottle(Protocol):
+    """
+    Interface where the login attempts throttling behaviour is defined.
+    """
+
+    def check(self, username: str, client_ip: str) -> Optional[float]:
+        """
+        Consume a login attempt of the username and of the client ip.
+
+        Args:
+            username (str): username the client is logging in as.
+            client_ip (str): address of the client.
+
+        Returns:
+            Optional[float]: None if the attempt is allowed, otherwise the seconds to wait before retrying.
+        """
+
+    async def record_failure(self, username: str) -> None:
+        """
+        Record a failed login of the username, locking it out after too many consecutive failures.
+
+        Args:
+            username (str): username the client tried to log in as.
+        """
+
+    async def record_success(self, username: str, client_ip: str) -> None:
+        """
+        Record a successful login of the username, resetting its failures and
+        giving back the attempt consumed by the username and by the client ip.
+
+        Args:
+            username (str): logged in username.
+            client_ip (str): address of the client.
+        """
+
+    def start(self) -> None:
+        """
+        Start synchronizing the lockouts with the other nodes in background.
+        """
+
+    def stop(self) -> None:
+        """
+        Stop the synchronization.
+        """
+
+    def stats(self) -> ThrottleStats:
+        """
+        Return a snapshot of the throttle counters.
+
+        Returns:
+            ThrottleStats: throttle statistics.
+        """
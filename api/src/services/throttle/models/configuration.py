@@ -0,0 +1,43 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class BucketConfig(BaseModel):
+    # Attempts allowed in a burst.
+    capacity: Optional[int] = Field(default=5, gt=0)
+    # Seconds to regain a single attempt.
+    refill_seconds: Optional[float] = Field(default=60, gt=0)
+
+
+class LockoutConfig(BaseModel):
+    # Consecutive failures of an username before it is locked out.
+    threshold: Optional[int] = Field(default=5, gt=0)
+    # Duration of the first lockout, doubled at every further failure.
+    base_seconds: Optional[float] = Field(default=30, gt=0)
+    max_seconds: Optional[float] = Field(default=3600, gt=0)
+
+
+class ThrottleConfig(BaseModel):
+    username: Optional[BucketConfig] = BucketConfig()
+    ip: Optional[BucketConfig] = BucketConfig(capacity=20, refill_seconds=6)
+    lockout: Optional[LockoutConfig] = LockoutConfig()
+    # Usernames and ips tracked at once, the least recently seen are forgotten.
+    max_keys: Optional[int] = Field(default=100000, gt=0)
+    # When true the lockouts are also stored in the db and shared by every node.
+    persist: Optional[bool] = False
+    # Seconds between two reads of the lockouts stored by the other nodes.
+    sync_interval: Optional[float] = Field(default=10, gt=0)
+
+
+class ThrottleStats(BaseModel):
+    """Snapshot of the login throttle usage."""
+
+    allowed: int
+    rejected_ip: int
+    rejected_username: int
+    rejected_locked: int
+    lockouts: int
+    tracked_ips: int
+    tracked_usernames: int
+    locked_usernames: int
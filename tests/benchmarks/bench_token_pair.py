@@ -0,0 +1,63 @@
+"""Micro-benchmark of the token pair minted by login and refresh.
+
+Compares the former two create_token calls against create_token_pair, run it with:
+python -m tests.benchmarks.bench_token_pair
+"""
+from datetime import timedelta
+from os import environ
+from timeit import repeat
+from typing import Callable, Final
+
+from src.core import auth
+from src.models.user import Role, UserLogin
+
+_NUMBER: Final[int] = 2000
+_REPEAT: Final[int] = 5
+
+_USER: Final[UserLogin] = UserLogin(
+    email="mario.rossi@email.com",
+    username="mario.rossi",
+    roles=[Role.ADMIN, Role.USER],
+)
+
+
+def _create_token_twice() -> None:
+    """Former login path, two projections and two tokens signed from scratch."""
+    auth.create_token(
+        _USER.dict(),
+        timedelta(minutes=auth.JWT_CONFIG["access_expiration"]),
+        False,
+        environ["SECRET_KEY"],
+        auth.JWT_CONFIG["algorithm"],
+    )
+    auth.create_token(
+        _USER.dict(),
+        timedelta(minutes=auth.JWT_CONFIG["refresh_expiration"]),
+        True,
+        environ["SECRET_KEY"],
+        auth.JWT_CONFIG["algorithm"],
+    )
+
+
+def _create_token_pair() -> None:
+    """Current login path, compact claims serialized once for both tokens."""
+    auth.create_token_pair(auth.token_claims(_USER.username, _USER.roles, 0))
+
+
+def _best_microseconds(function: Callable[[], None]) -> float:
+    """Return the best time per call over the repetitions, in microseconds."""
+    return min(repeat(function, number=_NUMBER, repeat=_REPEAT)) / _NUMBER * 1e6
+
+
+def main() -> None:
+    before = _best_microseconds(_create_token_twice)
+    after = _best_microseconds(_create_token_pair)
+    print(f"create_token x2:   {before:8.2f} us/login")
+    print(f"create_token_pair: {after:8.2f} us/login")
+    print(
+        f"saved:             {before - after:8.2f} us/login ({1 - after / before:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Timing and baseline helpers of the benchmark suite.
+
+The benchmarks are skipped unless CDRT_BENCHMARK is set, timings are too noisy
+for the regular test runs. Every benchmark is compared against the JSON
+baseline at CDRT_BENCHMARK_BASELINE (tests/benchmarks/baseline.json by default)
+and fails when slower than the baseline by more than CDRT_BENCHMARK_THRESHOLD
+(0.25 by default, 25%). With CDRT_BENCHMARK_SAVE set the timings are written to
+the baseline instead, e.g.:
+CDRT_BENCHMARK=1 CDRT_BENCHMARK_SAVE=1 pytest tests/benchmarks
+"""
+import json
+import platform
+from os import environ
+from os.path import dirname, exists, join
+from timeit import Timer
+from typing import Callable, Dict, Final, Optional
+
+import pytest
+
+BENCHMARK_ENABLED: Final[bool] = environ.get("CDRT_BENCHMARK", "0") not in ("", "0")
+SAVE_BASELINE: Final[bool] = environ.get("CDRT_BENCHMARK_SAVE", "0") not in ("", "0")
+THRESHOLD: Final[float] = float(environ.get("CDRT_BENCHMARK_THRESHOLD", "0.25"))
+BASELINE_PATH: Final[str] = environ.get(
+    "CDRT_BENCHMARK_BASELINE", join(dirname(__file__), "baseline.json")
+)
+
+# Best of the repetitions, each one long at least 0.2 seconds (see Timer.autorange).
+_REPEAT: Final[int] = 5
+
+requires_benchmark = pytest.mark.skipif(
+    not BENCHMARK_ENABLED, reason="set CDRT_BENCHMARK=1 to run the benchmarks"
+)
+
+
+def measure(function: Callable[[], object]) -> float:
+    """Return the best time per call of the function over the repetitions, in microseconds."""
+    timer = Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=_REPEAT, number=number)) / number * 1e6
+
+
+def _load_baseline() -> Dict[str, dict]:
+    """Return the saved baseline, empty if none has been saved yet."""
+    if not exists(BASELINE_PATH):
+        return {"host": {}, "results": {}}
+    with open(BASELINE_PATH, "r") as baseline_stream:
+        return json.load(baseline_stream)
+
+
+def _save_result(name: str, microseconds: float) -> None:
+    """Write the timing of the benchmark to the baseline, keeping the other ones."""
+    baseline = _load_baseline()
+    baseline["host"] = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+    baseline["results"][name] = round(microseconds, 3)
+    with open(BASELINE_PATH, "w") as baseline_stream:
+        json.dump(baseline, baseline_stream, indent=2, sort_keys=True)
+        baseline_stream.write("\n")
+
+
+def check_benchmark(name: str, function: Callable[[], object]) -> float:
+    """Time the function, then save it as baseline or fail if it is slower than the baseline.
+
+    Args:
+        name (str): unique name of the benchmark in the baseline.
+        function (Callable[[], object]): function to time.
+
+    Returns:
+        float: the best time per call, in microseconds.
+    """
+    microseconds = measure(function)
+    if SAVE_BASELINE:
+        _save_result(name, microseconds)
+        return microseconds
+
+    baseline: Optional[float] = _load_baseline()["results"].get(name)
+    if baseline is None:
+        pytest.skip(f"{name}: {microseconds:.2f} us, no baseline to compare with")
+
+    slowdown = microseconds / baseline - 1
+    if slowdown > THRESHOLD:
+        pytest.fail(
+            f"{name} regressed: {microseconds:.2f} us against a baseline of "
+            f"{baseline:.2f} us, {slowdown:.0%} slower (threshold {THRESHOLD:.0%})"
+        )
+    return microseconds
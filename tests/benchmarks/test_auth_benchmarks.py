@@ -0,0 +1,140 @@
+from datetime import timedelta
+from os import environ
+from typing import Dict, Final
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from passlib.context import CryptContext
+from src.core import auth
+from src.core.roles import roles_mask
+from src.helpers.container import CONTAINER
+from src.models.user import Role, UserLogin
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from tests.benchmarks.harness import check_benchmark, requires_benchmark
+
+pytestmark = requires_benchmark
+
+# Realistic claims: the compact ones signed by login and refresh, the legacy
+# ones still accepted until the last old token expires.
+PAYLOADS: Final[Dict[str, dict]] = {
+    "compact": auth.token_claims("mario.rossi", [Role.USER], 1700000000),
+    "compact-admin": auth.token_claims(
+        "mario.rossi", [Role.ADMIN, Role.USER], 1700000000
+    ),
+    "legacy": UserLogin(
+        email="mario.rossi@email.com",
+        username="mario.rossi",
+        roles=[Role.ADMIN, Role.USER],
+    ).dict(),
+}
+# Shortest password accepted and a long passphrase, bcrypt ignores past 72 bytes.
+PASSWORDS: Final[Dict[str, str]] = {"short": "p4ssw0rd", "long": "p4ssw0rd" * 8}
+ALGORITHMS: Final[tuple] = ("HS256", "HS512", "RS256", "ES256")
+
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def _access_token(payload: dict) -> str:
+    """Return an access token signed as login does, for the compact or legacy claims."""
+    if "sub" in payload:
+        return auth.create_token_pair(payload)[0]
+    return auth.create_token(
+        payload,
+        timedelta(minutes=auth.JWT_CONFIG["access_expiration"]),
+        False,
+        environ["SECRET_KEY"],
+        auth.JWT_CONFIG["algorithm"],
+    )
+
+
+@pytest.fixture(scope="module")
+def signing_keys() -> Dict[str, str]:
+    return {
+        "HS256": environ["SECRET_KEY"],
+        "HS512": environ["SECRET_KEY"],
+        "RS256": _pem(rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+        "ES256": _pem(ec.generate_private_key(ec.SECP256R1())),
+    }
+
+
+@pytest.fixture(params=["bcrypt", "argon2"])
+def password_scheme(request, monkeypatch) -> str:
+    # The configured costs, with the benchmarked scheme as default one.
+    settings = CONTAINER.get(IPasswordHasher).context_settings()
+    settings["schemes"] = [request.param] + [
+        scheme for scheme in settings["schemes"] if scheme != request.param
+    ]
+    monkeypatch.setattr(auth, "_PWD_CONTEX", CryptContext(**settings))
+    return request.param
+
+
+@pytest.mark.parametrize("password", PASSWORDS.values(), ids=PASSWORDS.keys())
+def test_hash_password(request, password_scheme, password):
+    check_benchmark(request.node.name, lambda: auth.hash_password(password))
+
+
+@pytest.mark.parametrize("password", PASSWORDS.values(), ids=PASSWORDS.keys())
+def test_verify_password(request, password_scheme, password):
+    hashed_password = auth.hash_password(password)
+    check_benchmark(
+        request.node.name, lambda: auth.verify_password(password, hashed_password)
+    )
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+@pytest.mark.parametrize("payload", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_create_token(request, signing_keys, algorithm, payload):
+    expires_delta = timedelta(minutes=auth.JWT_CONFIG["access_expiration"])
+    check_benchmark(
+        request.node.name,
+        lambda: auth.create_token(
+            payload, expires_delta, False, signing_keys[algorithm], algorithm
+        ),
+    )
+
+
+@pytest.mark.parametrize("payload", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_create_token_pair(request, payload):
+    check_benchmark(request.node.name, lambda: auth.create_token_pair(payload))
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["cold", "cached"])
+@pytest.mark.parametrize("payload", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_decode_token(request, payload, cached):
+    token = _access_token(payload)
+
+    def decode() -> dict:
+        # Clearing the cache costs far less than verifying the signature.
+        if not cached:
+            auth.TOKEN_CACHE.clear()
+        return auth.decode_token(token)
+
+    check_benchmark(request.node.name, decode)
+
+
+@pytest.mark.parametrize("payload", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_valid_token(request, payload):
+    decoded_token = auth.decode_token(_access_token(payload))
+    check_benchmark(request.node.name, lambda: auth.valid_token(decoded_token))
+
+
+@pytest.mark.parametrize(
+    "user_roles, required_roles",
+    [
+        (roles_mask([Role.USER]), roles_mask([Role.ADMIN])),
+        ([Role.USER], [Role.ADMIN]),
+        ([Role.ADMIN, Role.USER], [Role.ADMIN, Role.USER]),
+    ],
+    ids=["masks", "roles", "all-roles"],
+)
+def test_has_roles(request, user_roles, required_roles):
+    check_benchmark(
+        request.node.name, lambda: auth.has_roles(user_roles, required_roles)
+    )
@@ -1,22 +1,33 @@
 from datetime import timedelta
+from hashlib import sha256
 from http.client import HTTPException
+from os import environ
 from typing import Final
 
 import pytest
 from jose import jwt
 from src.core.auth import (
+    ACCESS_TOKEN_TYPE,
+    TOKEN_CACHE,
     create_token,
+    create_token_pair,
+    decode_token,
     has_roles,
     hash_password,
+    introspect_token,
+    refresh_token_id,
     is_admin,
     is_authorized,
     require_admin,
+    token_claims,
     valid_access_token,
     valid_refresh_token,
     valid_token,
     verify_password,
 )
-from src.models.user import Role
+from src.core.principal import Principal
+from src.core.roles import roles_mask
+from src.models.user import Role, UserLogin
 from tests import admin_login, build_db_client, user_login
 
 PLAIN_PASSWORD: Final[str] = "test-pwd"
@@ -24,6 +35,12 @@ USER: Final[dict] = {"username": "mariorossi", "password": "secure-hashed-pwd"}
 SECRET_KEY: Final[str] = "secret-key"
 
 
+def _principal(token: str) -> Principal:
+    """Return the principal of the token, without the token version check of get_principal."""
+    decoded_token = decode_token(token)
+    return Principal.from_claims(decoded_token, valid_access_token(decoded_token))
+
+
 def test_hashing():
     assert PLAIN_PASSWORD != hash_password(PLAIN_PASSWORD)
 
@@ -62,6 +79,66 @@ def test_create_token():
         assert False
 
 
+def test_create_token_pair():
+    user = UserLogin(email="mario@rossi.com", username="mariorossi", roles=[Role.USER])
+
+    access_token, refresh_token = create_token_pair(
+        token_claims(user.username, user.roles, 3)
+    )
+
+    decoded_access_token = jwt.decode(
+        token=access_token, key=environ["SECRET_KEY"], algorithms="HS256"
+    )
+    decoded_refresh_token = jwt.decode(
+        token=refresh_token, key=environ["SECRET_KEY"], algorithms="HS256"
+    )
+    assert valid_access_token(decoded_access_token)
+    assert valid_refresh_token(decoded_refresh_token)
+    assert "jti" in decoded_refresh_token
+    assert "jti" not in decoded_access_token
+    assert decoded_access_token["sub"] == "mariorossi"
+    assert decoded_access_token["rl"] == roles_mask([Role.USER])
+    assert decoded_access_token["ver"] == 3
+    assert "email" not in decoded_access_token
+    assert decoded_refresh_token["exp"] > decoded_access_token["exp"]
+
+
+def test_decode_token_cache():
+    token = create_token(
+        data={"username": "cached-user"},
+        expires_delta=timedelta(minutes=5),
+        secret_key=environ["SECRET_KEY"],
+        is_refresh=False,
+        algorithm="HS256",
+    )
+    hits = TOKEN_CACHE.stats().hits
+
+    first_decode = decode_token(token)
+    second_decode = decode_token(token)
+
+    assert first_decode == second_decode
+    assert second_decode["username"] == "cached-user"
+    assert TOKEN_CACHE.stats().hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_introspect_token():
+    access_token, refresh_token = create_token_pair(
+        token_claims("mariorossi", ["user"], 0)
+    )
+
+    access_introspection = await introspect_token(access_token)
+    refresh_introspection = await introspect_token(refresh_token)
+    invalid_introspection = await introspect_token("pippo")
+
+    assert access_introspection.active
+    assert access_introspection.claims["sub"] == "mariorossi"
+    assert not refresh_introspection.active
+    assert refresh_introspection.claims is None
+    assert not invalid_introspection.active
+    assert invalid_introspection.error
+
+
 def test_valid_token():
     test_decoded_token = {
         "email": "",
@@ -106,15 +183,79 @@ def test_has_bad_roles():
     assert not has_roles(user_roles=[Role.USER], required_roles=[Role.ADMIN])
 
 
+def test_has_roles_bitmask():
+    user_roles = roles_mask([Role.ADMIN, Role.USER])
+
+    assert has_roles(user_roles=user_roles, required_roles=[Role.ADMIN])
+    assert has_roles(user_roles=["user"], required_roles=roles_mask([Role.USER]))
+    assert not has_roles(user_roles=0, required_roles=user_roles)
+
+
+def test_valid_compact_token():
+    access_claims = {**token_claims("admin", ["admin"], 0), "exp": 1, "typ": "a"}
+    refresh_claims = {**access_claims, "typ": "r", "jti": "id"}
+
+    assert valid_access_token(access_claims)
+    assert not valid_refresh_token(access_claims)
+    assert valid_refresh_token(refresh_claims)
+    assert not valid_access_token(refresh_claims)
+    assert not valid_token({**access_claims, "email": ""})
+
+
+def test_principal_from_compact_claims():
+    access_token, _ = create_token_pair(token_claims("admin", [Role.ADMIN], 0))
+    principal = _principal(access_token)
+
+    assert principal.is_authenticated
+    assert principal.is_admin
+    assert not principal.is_user
+    assert principal.username == "admin"
+    assert principal.roles == frozenset({Role.ADMIN})
+
+
+def test_principal_from_claims():
+    principal = _principal(
+        create_token(
+            data={"email": "", "username": "admin", "roles": ["admin"]},
+            expires_delta=timedelta(minutes=5),
+            secret_key=environ["SECRET_KEY"],
+            is_refresh=False,
+            algorithm="HS256",
+        )
+    )
+
+    assert principal.is_authenticated
+    assert principal.is_admin
+    assert not principal.is_user
+    assert principal.roles == frozenset({Role.ADMIN})
+    with pytest.raises(AttributeError):
+        principal.username = "user"
+
+
+def test_principal_from_refresh_token():
+    principal = _principal(
+        create_token(
+            data={"email": "", "username": "admin", "roles": ["admin"]},
+            expires_delta=timedelta(minutes=5),
+            secret_key=environ["SECRET_KEY"],
+            is_refresh=True,
+            algorithm="HS256",
+        )
+    )
+
+    assert not principal.is_authenticated
+    assert not principal.is_admin
+
+
 @pytest.mark.asyncio
 async def test_is_athorized():
     await build_db_client()
     login_response = await user_login()
 
-    authorized, decoded_token = is_authorized(login_response.access_token)
+    authorized, decoded_token = is_authorized(_principal(login_response.access_token))
 
     assert authorized
-    assert not decoded_token["is_refresh"]
+    assert decoded_token["typ"] == ACCESS_TOKEN_TYPE
 
 
 @pytest.mark.asyncio
@@ -122,11 +263,11 @@ async def test_is_admin():
     await build_db_client()
     login_response = await admin_login()
 
-    authorized, admin, decoded_token = is_admin(login_response.access_token)
+    authorized, admin, decoded_token = is_admin(_principal(login_response.access_token))
 
     assert authorized
     assert admin
-    assert not decoded_token["is_refresh"]
+    assert decoded_token["typ"] == ACCESS_TOKEN_TYPE
 
 
 @pytest.mark.asyncio
@@ -134,7 +275,7 @@ async def test_require_admin():
     await build_db_client()
     login_response = await admin_login()
 
-    require_admin(login_response.access_token)
+    require_admin(_principal(login_response.access_token))
 
     # The require_admin function does not return anything, but if an exception is raised,
     # test fail, if it complete everything then everything ok whith admin login.
@@ -147,10 +288,18 @@ async def test_require_admin_fail():
     login_response = await user_login()
 
     try:
-        require_admin(login_response.access_token)
+        require_admin(_principal(login_response.access_token))
     except Exception as e:
         assert e.status_code == 403
     else:
         # The require_admin function does not return anything, but if an exception is NOT raised,
         # with user_login test fail.
         assert False
+
+
+def test_refresh_token_id():
+    legacy_claims = {"email": "", "username": "admin", "roles": [], "exp": 1}
+
+    assert refresh_token_id("token", {**legacy_claims, "jti": "id"}) == "id"
+    # Legacy refresh tokens without a jti are revoked by their digest.
+    assert refresh_token_id("token", legacy_claims) == sha256(b"token").hexdigest()
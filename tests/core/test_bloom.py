@@ -0,0 +1,20 @@
+from src.core.bloom import BloomFilter
+
+
+def test_bloom_filter_no_false_negatives():
+    items = [f"jti-{i}" for i in range(1000)]
+    bloom_filter = BloomFilter.from_items(items, capacity=1000, error_rate=0.001)
+
+    assert all(item in bloom_filter for item in items)
+    assert bloom_filter.count == 1000
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter.from_items(
+        (f"jti-{i}" for i in range(1000)), capacity=1000, error_rate=0.01
+    )
+
+    false_positives = sum(f"other-{i}" in bloom_filter for i in range(10000))
+
+    # Generous bound, the expected value is around 100.
+    assert false_positives < 300
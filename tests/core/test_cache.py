@@ -0,0 +1,47 @@
+from time import time
+
+from src.core.cache import ExpiringLRUCache
+
+
+def test_cache_hit_and_miss():
+    cache: ExpiringLRUCache[str] = ExpiringLRUCache(max_size=2)
+    cache.put("key", "value", time() + 60)
+
+    assert cache.get("key") == "value"
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_ratio == 0.5
+
+
+def test_cache_expired_entry():
+    cache: ExpiringLRUCache[str] = ExpiringLRUCache(max_size=2)
+    cache.put("key", "value", time() - 1)
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache: ExpiringLRUCache[str] = ExpiringLRUCache(max_size=2)
+    cache.put("first", "value", time() + 60)
+    cache.put("second", "value", time() + 60)
+    cache.get("first")
+    cache.put("third", "value", time() + 60)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "value"
+    assert cache.stats().evictions == 1
+
+
+def test_cache_replace_keeps_expiration():
+    cache: ExpiringLRUCache[str] = ExpiringLRUCache(max_size=2)
+    cache.put("key", "value", time() + 60)
+
+    assert cache.replace("key", "new value")
+    assert not cache.replace("missing", "value")
+    assert cache.keys() == ["key"]
+    assert cache.get("key") == "new value"
+    assert cache.get("missing") is None
@@ -0,0 +1,76 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src.core import counters
+from src.models.user import Role
+
+
+@pytest.fixture
+def counters_collection(monkeypatch) -> MagicMock:
+    collection = MagicMock()
+    collection.update_one = AsyncMock()
+    monkeypatch.setattr(
+        counters.Counter, "get_motor_collection", MagicMock(return_value=collection)
+    )
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_add_and_remove_user(counters_collection):
+    await counters.add_user([Role.ADMIN, "user"])
+    await counters.remove_user(["user"])
+
+    increments = [
+        call.args[1]["$inc"] for call in counters_collection.update_one.call_args_list
+    ]
+    assert increments == [
+        {"total": 1, "roles.admin": 1, "roles.user": 1},
+        {"total": -1, "roles.user": -1},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_change_user_roles(counters_collection):
+    await counters.change_user_roles(["user"], [Role.ADMIN, Role.USER])
+    await counters.change_user_roles(["user"], [Role.USER])
+
+    # The unchanged roles are not touched, no update at all when nothing changed.
+    counters_collection.update_one.assert_awaited_once()
+    assert counters_collection.update_one.call_args.args[1] == {
+        "$inc": {"roles.admin": 1}
+    }
+
+
+@pytest.mark.asyncio
+async def test_change_user_claimed_roles(counters_collection):
+    await counters.change_user_roles(["admin", "user"], ["user"], ["admin"])
+
+    # The claimed role is already decremented.
+    counters_collection.update_one.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_claim_role_removal(counters_collection):
+    counters_collection.update_one.return_value = MagicMock(modified_count=1)
+
+    assert await counters.claim_role_removal("admin")
+    filters, update = counters_collection.update_one.call_args.args
+    assert filters["roles.admin"] == {"$gt": 1}
+    assert update == {"$inc": {"roles.admin": -1}}
+
+
+@pytest.mark.asyncio
+async def test_claim_last_role_removal(counters_collection):
+    counters_collection.update_one.return_value = MagicMock(modified_count=0)
+    counters_collection.find_one = AsyncMock(return_value={"_id": "users"})
+
+    assert not await counters.claim_role_removal("admin")
+
+
+@pytest.mark.asyncio
+async def test_remove_user_with_claimed_roles(counters_collection):
+    await counters.remove_user(["admin", "user"], claimed_roles=["admin"])
+
+    assert counters_collection.update_one.call_args.args[1] == {
+        "$inc": {"roles.user": -1, "total": -1}
+    }
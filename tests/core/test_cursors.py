@@ -0,0 +1,24 @@
+import pytest
+from src.core.cursors import decode_cursor, encode_cursor
+from src.core.exceptions import InvalidCursorError
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("mario.rossi")
+
+    assert "mario.rossi" not in cursor
+    assert decode_cursor(cursor) == "mario.rossi"
+
+
+def test_tampered_cursor():
+    value, signature = encode_cursor("mario.rossi").split(".")
+    forged_value = encode_cursor("zzz").split(".")[0]
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(f"{forged_value}.{signature}")
+
+
+@pytest.mark.parametrize("cursor", ["", "pippo", "a.b.c", "!!.!!"])
+def test_malformed_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
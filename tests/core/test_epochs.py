@@ -0,0 +1,34 @@
+import pytest
+from src.core.epochs import DELETED, TokenEpochs
+
+
+@pytest.mark.asyncio
+async def test_token_epochs_current_version():
+    epochs = TokenEpochs()
+    epochs.set("user", 3)
+
+    assert await epochs.is_current("user", 3)
+    assert await epochs.is_current("user", 4)
+    assert not await epochs.is_current("user", 2)
+
+    stats = epochs.stats()
+    assert stats.checks == 3
+    assert stats.database_reads == 0
+    assert stats.rejections == 1
+
+
+@pytest.mark.asyncio
+async def test_token_epochs_deleted_user():
+    epochs = TokenEpochs()
+    epochs.set("user", DELETED)
+
+    assert not await epochs.is_current("user", 1_000_000_000)
+
+
+def test_token_epochs_bounded():
+    epochs = TokenEpochs(max_size=2)
+    for username in ("first", "second", "third"):
+        epochs.set(username, 1)
+
+    # The least recently seen user is read again at its next token.
+    assert epochs.stats().size == 2
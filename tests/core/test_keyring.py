@@ -0,0 +1,42 @@
+import pytest
+from jose import jwt
+from src.core.keyring import KeyRing, generate_key
+
+
+def test_key_ring_sign_and_verify(tmp_path):
+    kid = generate_key(str(tmp_path), "ES256")
+    key_ring = KeyRing(str(tmp_path), "ES256", activation_delay=0)
+
+    token = key_ring.signer().sign({"username": "mariorossi"})
+
+    assert jwt.get_unverified_header(token)["kid"] == kid
+    decoded_token = jwt.decode(token, key_ring.verifying_key(kid), algorithms="ES256")
+    assert decoded_token == {"username": "mariorossi"}
+
+
+def test_key_ring_unknown_kid(tmp_path):
+    generate_key(str(tmp_path), "ES256")
+    key_ring = KeyRing(str(tmp_path), "ES256", reload_interval=3600)
+
+    assert key_ring.verifying_key("unknown") is None
+    assert key_ring.verifying_key(None) is None
+
+
+def test_key_ring_rotation(tmp_path):
+    old_kid = generate_key(str(tmp_path), "ES256")
+    key_ring = KeyRing(str(tmp_path), "ES256", activation_delay=3600, reload_interval=0)
+    new_kid = generate_key(str(tmp_path), "ES256")
+
+    # The new key is published right away, but not used to sign before the activation delay.
+    assert key_ring.signer().kid == old_kid
+    assert [key["kid"] for key in key_ring.jwks()["keys"]] == [new_kid, old_kid]
+    assert key_ring.verifying_key(new_kid) is not None
+
+
+def test_key_ring_missing_directory(tmp_path):
+    key_ring = KeyRing(str(tmp_path / "missing"), "ES256")
+
+    # An empty ring, signing raises the error of a ring without keys.
+    assert key_ring.jwks() == {"keys": []}
+    with pytest.raises(KeyError):
+        key_ring.signer()
@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from src.core.users import (
+    dummy_password_hash,
+    forget_unknown_user,
+    get_user,
+    invalidate_user,
+    is_unknown_user,
+    publish_user_change,
+    remember_unknown_user,
+    user_cache_stats,
+)
+from src.helpers.container import CONTAINER
+from src.services.hasher.interfaces.i_password_hasher import IPasswordHasher
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+
+
+def test_unknown_user_cache():
+    assert not is_unknown_user("ghost")
+
+    remember_unknown_user("ghost")
+    assert is_unknown_user("ghost")
+
+    forget_unknown_user("ghost")
+    assert not is_unknown_user("ghost")
+
+
+@pytest.mark.asyncio
+async def test_dummy_password_hash():
+    hasher = CONTAINER.get(IPasswordHasher)
+    dummy_hash = await dummy_password_hash()
+
+    assert dummy_hash == await dummy_password_hash()
+    assert not await hasher.verify("any-password", dummy_hash)
+    assert not hasher.needs_update(dummy_hash)
+
+
+@pytest.fixture
+def user_repository(monkeypatch) -> MagicMock:
+    async def get(*args):
+        # Slow enough for every concurrent lookup to miss the cache.
+        await asyncio.sleep(0.01)
+        return user_repository.user
+
+    user_repository = MagicMock()
+    user_repository.user = MagicMock(username="mariorossi")
+    user_repository.get = MagicMock(side_effect=get)
+    monkeypatch.setattr(CONTAINER.get(IUserRepository), "get", user_repository.get)
+    yield user_repository
+    invalidate_user("mariorossi")
+
+
+@pytest.mark.asyncio
+async def test_get_user_single_flight(user_repository):
+    found_users = await asyncio.gather(*(get_user("mariorossi") for _ in range(100)))
+
+    assert all(user is user_repository.user for user in found_users)
+    assert user_repository.get.call_count == 1
+
+    hits = user_cache_stats().hits
+    assert await get_user("mariorossi") is user_repository.user
+    assert user_repository.get.call_count == 1
+    assert user_cache_stats().hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user(user_repository):
+    await get_user("mariorossi")
+    invalidate_user("mariorossi")
+    await get_user("mariorossi")
+
+    assert user_repository.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_user_while_loading(user_repository):
+    load = asyncio.ensure_future(get_user("mariorossi"))
+    await asyncio.sleep(0)
+    invalidate_user("mariorossi")
+
+    # The read in flight completes, but its result is not cached.
+    assert await load is user_repository.user
+    await get_user("mariorossi")
+    assert user_repository.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_publish_user_change(user_repository):
+    await get_user("mariorossi")
+    remember_unknown_user("luigiverdi")
+
+    # The node subscribes its caches to its own events too.
+    await publish_user_change("mariorossi")
+    await publish_user_change("luigiverdi")
+
+    assert not is_unknown_user("luigiverdi")
+    await get_user("mariorossi")
+    assert user_repository.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_user_ignores_case(user_repository):
+    await get_user("mariorossi")
+    assert await get_user("MarioRossi") is user_repository.user
+    assert user_repository.get.call_count == 1
+
+    invalidate_user("MARIOROSSI")
+    await get_user("mariorossi")
+    assert user_repository.get.call_count == 2
@@ -0,0 +1,47 @@
+from pymongo import monitoring
+from src.db.monitoring import PoolMonitor
+
+ADDRESS = ("localhost", 27017)
+
+
+def test_pool_monitor_gauges():
+    pool_monitor = PoolMonitor()
+    pool_monitor.pool_created(
+        monitoring.PoolCreatedEvent(ADDRESS, {"maxPoolSize": 50, "minPoolSize": 5})
+    )
+    for connection_id in (1, 2):
+        pool_monitor.connection_created(
+            monitoring.ConnectionCreatedEvent(ADDRESS, connection_id)
+        )
+        pool_monitor.connection_check_out_started(
+            monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+        )
+        pool_monitor.connection_checked_out(
+            monitoring.ConnectionCheckedOutEvent(ADDRESS, connection_id)
+        )
+    pool_monitor.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+
+    stats = pool_monitor.stats()
+    assert (stats.max_pool_size, stats.min_pool_size) == (50, 5)
+    assert stats.open_connections == 2
+    assert stats.in_use == 1
+    assert stats.waiting == 0
+    assert stats.checkouts == 2
+    assert stats.checkout_wait_max_ms >= stats.checkout_wait_avg_ms >= 0
+
+
+def test_pool_monitor_checkout_failure():
+    pool_monitor = PoolMonitor()
+    pool_monitor.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(ADDRESS)
+    )
+    assert pool_monitor.stats().waiting == 1
+
+    pool_monitor.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout")
+    )
+
+    stats = pool_monitor.stats()
+    assert stats.waiting == 0
+    assert stats.checkout_failures == 1
+    assert stats.checkouts == 0
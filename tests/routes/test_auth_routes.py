@@ -1,8 +1,11 @@
 import json
+from hashlib import sha256
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from httpx import AsyncClient
-from tests import BASE_URL, build_db_client, fastapi_app, user_login
+from src.core import auth, users
+from tests import BASE_URL, admin_login, build_db_client, fastapi_app, user_login
 
 
 @pytest.mark.asyncio
@@ -94,6 +97,102 @@ async def test_refresh():
     assert "token_type" in response_json.keys()
 
 
+@pytest.mark.asyncio
+async def test_refresh_token_reuse():
+    await build_db_client()
+    login_response = await user_login()
+
+    # The first refresh revokes the token, the second one must be rejected.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        first_response = await ac.post(
+            "/auth/refresh", headers={"Refresh-Token": login_response.refresh_token}
+        )
+        second_response = await ac.post(
+            "/auth/refresh", headers={"Refresh-Token": login_response.refresh_token}
+        )
+
+    assert first_response.status_code == 200
+    assert second_response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_concurrent_reuse(monkeypatch):
+    # Another refresh claimed the opaque token first, every session of the user ends.
+    claims = {
+        **auth.token_claims("user", ["user"], 0),
+        "exp": 1,
+        "typ": "r",
+        "jti": "id",
+    }
+    monkeypatch.setattr(auth, "OPAQUE_TOKENS", True)
+    monkeypatch.setattr(auth, "resolve_token", AsyncMock(return_value=claims))
+    monkeypatch.setattr(auth, "revoke_refresh_token", AsyncMock(return_value=False))
+    monkeypatch.setattr(auth.REVOCATION_STORE, "is_revoked", AsyncMock())
+    monkeypatch.setattr(auth.TOKEN_EPOCHS, "revoke_all", AsyncMock())
+    monkeypatch.setattr(users, "publish_user_change", AsyncMock())
+    monkeypatch.setattr(
+        users,
+        "get_user",
+        AsyncMock(return_value=MagicMock(username="user", token_version=0)),
+    )
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.post("/auth/refresh", headers={"Refresh-Token": "token"})
+
+    assert response.status_code == 403
+    auth.TOKEN_EPOCHS.revoke_all.assert_awaited_once_with("user")
+    # The session deletion is the claim, the revocation store is not needed.
+    auth.REVOCATION_STORE.is_revoked.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refresh_legacy_token_without_id(monkeypatch):
+    # Refresh tokens issued before the token ids are revoked by their digest.
+    claims = {
+        "email": "",
+        "username": "user",
+        "roles": [],
+        "exp": 1,
+        "is_refresh": True,
+    }
+    monkeypatch.setattr(auth, "OPAQUE_TOKENS", False)
+    monkeypatch.setattr(auth, "resolve_token", AsyncMock(return_value=claims))
+    monkeypatch.setattr(
+        auth.REVOCATION_STORE, "is_revoked", AsyncMock(return_value=False)
+    )
+    monkeypatch.setattr(auth.REVOCATION_STORE, "revoke", AsyncMock(return_value=True))
+    monkeypatch.setattr(
+        users,
+        "get_user",
+        AsyncMock(return_value=MagicMock(username="user", roles=[], token_version=0)),
+    )
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.post("/auth/refresh", headers={"Refresh-Token": "token"})
+
+    assert response.status_code == 200
+    token_id = sha256(b"token").hexdigest()
+    auth.REVOCATION_STORE.is_revoked.assert_awaited_once_with(token_id)
+    auth.REVOCATION_STORE.revoke.assert_awaited_once_with(token_id, 1)
+
+
+@pytest.mark.asyncio
+async def test_logout():
+    await build_db_client()
+    login_response = await user_login()
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        logout_response = await ac.post(
+            "/auth/logout", headers={"Refresh-Token": login_response.refresh_token}
+        )
+        refresh_response = await ac.post(
+            "/auth/refresh", headers={"Refresh-Token": login_response.refresh_token}
+        )
+
+    assert logout_response.status_code == 200
+    assert refresh_response.status_code == 403
+
+
 @pytest.mark.asyncio
 async def test_expired_token_refresh():
     await build_db_client()
@@ -138,5 +237,49 @@ async def test_invalid_token_structure_refresh():
     assert response.status_code == 403
 
 
+@pytest.mark.asyncio
+async def test_introspect():
+    await build_db_client()
+    admin_login_response = await admin_login()
+    user_login_response = await user_login()
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.post(
+            "/auth/introspect",
+            headers={
+                "Authorization": f"{admin_login_response.token_type} {admin_login_response.access_token}"
+            },
+            json={
+                "tokens": [
+                    user_login_response.access_token,
+                    user_login_response.refresh_token,
+                    user_login_response.access_token,
+                ]
+            },
+        )
+
+    assert response.status_code == 200
+    response_json: list = json.loads(response.text)
+    assert [result["active"] for result in response_json] == [True, False, True]
+    assert response_json[0]["claims"]["sub"] == "user"
+
+
+@pytest.mark.asyncio
+async def test_introspect_as_user():
+    await build_db_client()
+    login_response = await user_login()
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.post(
+            "/auth/introspect",
+            headers={
+                "Authorization": f"{login_response.token_type} {login_response.access_token}"
+            },
+            json={"tokens": [login_response.access_token]},
+        )
+
+    assert response.status_code == 403
+
+
 # Maybe a test for bad payload ca be added, but the moment I am too lazy to do it.
 # Honestly it looks like it works :D.
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from json import JSONDecodeError
 from typing import List
@@ -5,6 +6,7 @@ from typing import List
 import pytest
 from httpx import AsyncClient
 from pydantic import parse_raw_as
+from src.core import counters
 from src.db.collections.user import User
 from src.models.user import (
     CurrentUserDetails,
@@ -324,6 +326,84 @@ async def test_get_all_user_as_admin():
     )
 
 
+@pytest.mark.asyncio
+async def test_get_all_users_pages():
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+    headers = {
+        "Authorization": f"{login_response.token_type} {login_response.access_token}"
+    }
+
+    # Endpoint test, one user per page until the last one.
+    usernames = []
+    params = {"limit": 1}
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        while True:
+            response = await ac.get("/user/all", headers=headers, params=params)
+            assert response.status_code == 200
+            usernames += [user["username"] for user in json.loads(response.text)]
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["after"] = response.headers["X-Next-Cursor"]
+
+        all_response = await ac.get("/user/all", headers=headers)
+
+    assert usernames == [user["username"] for user in json.loads(all_response.text)]
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_invalid_cursor():
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+
+    # Endpoint test.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.get(
+            "/user/all",
+            headers={
+                "Authorization": f"{login_response.token_type} {login_response.access_token}"
+            },
+            params={"after": "pippo"},
+        )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_users():
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+    headers = {
+        "Authorization": f"{login_response.token_type} {login_response.access_token}"
+    }
+
+    # Endpoint test.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.get("/user/export", headers=headers)
+        all_response = await ac.get("/user/all", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported_users = [
+        UserPartialDetailsAdmin.parse_raw(line) for line in response.text.splitlines()
+    ]
+    assert exported_users == parse_raw_as(
+        List[UserPartialDetailsAdmin], all_response.text
+    )
+
+
 @pytest.mark.asyncio
 async def test_get_users_count():
 
@@ -345,6 +425,34 @@ async def test_get_users_count():
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_get_users_count_modes():
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+    headers = {
+        "Authorization": f"{login_response.token_type} {login_response.access_token}"
+    }
+
+    # Endpoint test.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        exact_response = await ac.get("/user/count", headers=headers)
+        estimated_response = await ac.get(
+            "/user/count", headers=headers, params={"estimated": True}
+        )
+        admin_response = await ac.get(
+            "/user/count", headers=headers, params={"role": "admin"}
+        )
+
+    assert exact_response.status_code == 200
+    assert estimated_response.status_code == 200
+    assert admin_response.status_code == 200
+    assert 1 <= int(admin_response.text) <= int(exact_response.text)
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_id_username():
 
@@ -459,6 +567,39 @@ async def test_update_user():
     await user_check.save()
 
 
+@pytest.mark.asyncio
+async def test_update_user_if_match():
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await user_login()
+    headers = {
+        "Authorization": f"{login_response.token_type} {login_response.access_token}"
+    }
+    user_details = {"username": "user", "email": "user@email.com", "roles": ["user"]}
+
+    # Endpoint test, the second update is based on a stale revision.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        me_response = await ac.get("/user/me", headers=headers)
+        etag = me_response.headers["ETag"]
+        first_response = await ac.put(
+            "/user/username/user",
+            headers={**headers, "If-Match": etag},
+            json=user_details,
+        )
+        second_response = await ac.put(
+            "/user/username/user",
+            headers={**headers, "If-Match": etag},
+            json=user_details,
+        )
+
+    assert first_response.status_code == 200
+    assert first_response.headers["ETag"] != etag
+    assert second_response.status_code == 412
+
+
 @pytest.mark.asyncio
 async def test_update_user_bad_user():
 
@@ -570,6 +711,34 @@ async def test_update_user_admin_missing():
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_update_last_admin_roles():
+    # The admin role is never removed from the last admin.
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+
+    # Endpoint test.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.put(
+            f"/user/username/admin",
+            headers={
+                "Authorization": f"{login_response.token_type} {login_response.access_token}"
+            },
+            json={
+                "username": "admin",
+                "email": "admin@email.com",
+                "roles": ["user"],
+            },
+        )
+
+    assert response.status_code == 406
+    assert await counters.count_users("admin") == 1
+
+
 @pytest.mark.asyncio
 async def test_update_user_duplicate_uername_or_email():
 
@@ -693,6 +862,30 @@ async def test_delete_user_admin_missing():
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_delete_missing_user_with_last_admin():
+    # A missing user is not mistaken for the last admin.
+
+    # DB connection.
+    await build_db_client()
+
+    # Execute login.
+    login_response = await admin_login()
+    assert await counters.count_users("admin") == 1
+
+    # Endpoint test.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.delete(
+            f"/user/username/missing",
+            headers={
+                "Authorization": f"{login_response.token_type} {login_response.access_token}"
+            },
+        )
+
+    assert response.status_code == 404
+    assert await counters.count_users("admin") == 1
+
+
 @pytest.mark.asyncio
 async def test_delete_last_admin():
 
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from src.core.auth import hash_password
+from src.core.exceptions import HasherOverloadedError
+from src.services.hasher.calibration import calibrate_bcrypt
+from src.services.hasher.implementations.pool_hasher import PoolPasswordHasher
+
+PLAIN_PASSWORD = "test-pwd"
+
+
+@pytest.mark.asyncio
+async def test_pool_hash_and_verify():
+    hasher = PoolPasswordHasher()
+    hashed_password = await hasher.hash(PLAIN_PASSWORD)
+
+    assert hashed_password != PLAIN_PASSWORD
+    assert await hasher.verify(PLAIN_PASSWORD, hashed_password)
+    assert not await hasher.verify("bad-pwd", hashed_password)
+
+    stats = hasher.stats()
+    assert stats.completed == 3
+    assert stats.queue_depth == 0
+    assert stats.avg_hash_ms > 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_backlog_full(tmp_path):
+    config_file_path = tmp_path / "hasher.yaml"
+    config_file_path.write_text("workers: 1\nmax_pending: 0\n")
+    hasher = PoolPasswordHasher(config_file_path=str(config_file_path))
+
+    results = await asyncio.gather(
+        hasher.hash(PLAIN_PASSWORD),
+        hasher.hash(PLAIN_PASSWORD),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], HasherOverloadedError)
+    assert hasher.stats().rejected == 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_needs_update_on_cost_change(tmp_path):
+    old_config_file_path = tmp_path / "old.yaml"
+    old_config_file_path.write_text("bcrypt:\n  rounds: 4\n")
+    new_config_file_path = tmp_path / "new.yaml"
+    new_config_file_path.write_text("bcrypt:\n  rounds: 5\n")
+    old_hasher = PoolPasswordHasher(config_file_path=str(old_config_file_path))
+    new_hasher = PoolPasswordHasher(config_file_path=str(new_config_file_path))
+
+    hashed_password = await old_hasher.hash(PLAIN_PASSWORD)
+
+    assert not old_hasher.needs_update(hashed_password)
+    assert new_hasher.needs_update(hashed_password)
+    assert await new_hasher.verify(PLAIN_PASSWORD, hashed_password)
+    old_hasher.shutdown()
+    new_hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_argon2_upgrades_bcrypt(tmp_path):
+    pytest.importorskip("argon2")
+    config_file_path = tmp_path / "hasher.yaml"
+    config_file_path.write_text(
+        'scheme: "argon2"\nargon2:\n  memory_cost: 1024\n  time_cost: 1\n  parallelism: 1\n'
+    )
+    hasher = PoolPasswordHasher(config_file_path=str(config_file_path))
+
+    hashed_password = await hasher.hash(PLAIN_PASSWORD)
+
+    assert hashed_password.startswith("$argon2id$")
+    assert not hasher.needs_update(hashed_password)
+    assert hasher.needs_update(hash_password(PLAIN_PASSWORD))
+    assert await hasher.verify(PLAIN_PASSWORD, hash_password(PLAIN_PASSWORD))
+    hasher.shutdown()
+
+
+def test_calibrate_bcrypt():
+    assert calibrate_bcrypt(target_seconds=0)["rounds"] == 4
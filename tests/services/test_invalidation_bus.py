@@ -0,0 +1,78 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from src.services.invalidation.enums.backend import InvalidationBackend
+from src.services.invalidation.enums.kind import InvalidationKind
+from src.services.invalidation.implementations import tailing_invalidation_bus
+from src.services.invalidation.implementations.tailing_invalidation_bus import (
+    TailingInvalidationBus,
+)
+
+
+def _bus(tmp_path, configuration: str) -> TailingInvalidationBus:
+    config_file_path = tmp_path / "invalidation.yaml"
+    config_file_path.write_text(configuration)
+    return TailingInvalidationBus(config_file_path=str(config_file_path))
+
+
+@pytest.mark.asyncio
+async def test_bus_memory_loopback(tmp_path):
+    invalidation_bus = _bus(tmp_path, 'backend: "memory"\n')
+    evicted = []
+    invalidation_bus.subscribe(InvalidationKind.USER, evicted.append)
+    invalidation_bus.subscribe(InvalidationKind.USER, lambda key: evicted.append(key))
+
+    await invalidation_bus.publish(InvalidationKind.USER, "mariorossi")
+
+    assert evicted == ["mariorossi", "mariorossi"]
+    stats = invalidation_bus.stats()
+    assert stats.backend == InvalidationBackend.MEMORY
+    assert stats.subscribers == 2
+    assert stats.published == 1
+    assert stats.received == 0
+
+
+@pytest.mark.asyncio
+async def test_bus_failing_subscriber(tmp_path):
+    invalidation_bus = _bus(tmp_path, 'backend: "memory"\n')
+    evicted = []
+
+    def fail(key: str) -> None:
+        raise KeyError(key)
+
+    invalidation_bus.subscribe(InvalidationKind.USER, fail)
+    invalidation_bus.subscribe(InvalidationKind.USER, evicted.append)
+
+    await invalidation_bus.publish(InvalidationKind.USER, "mariorossi")
+
+    assert evicted == ["mariorossi"]
+    assert invalidation_bus.stats().callback_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_bus_mongo_broadcast(tmp_path, monkeypatch):
+    collection = MagicMock()
+    collection.insert_one = AsyncMock(side_effect=[None, ConnectionError("down")])
+    monkeypatch.setattr(
+        tailing_invalidation_bus.InvalidationEvent,
+        "get_motor_collection",
+        MagicMock(return_value=collection),
+    )
+    invalidation_bus = _bus(tmp_path, 'backend: "mongo"\n')
+    evicted = []
+    invalidation_bus.subscribe(InvalidationKind.USER, evicted.append)
+
+    # Not started, the events stay on this node.
+    await invalidation_bus.publish(InvalidationKind.USER, "mariorossi")
+    collection.insert_one.assert_not_called()
+
+    # Started, as if following the collection, the events are inserted too.
+    invalidation_bus._tail_task = MagicMock()
+    await invalidation_bus.publish(InvalidationKind.USER, "luigiverdi")
+    event = collection.insert_one.call_args.args[0]
+    assert (event["kind"], event["key"]) == ("user", "luigiverdi")
+
+    # A failed insert is counted, the local subscribers got the event anyway.
+    await invalidation_bus.publish(InvalidationKind.USER, "mariorossi")
+    assert evicted == ["mariorossi", "luigiverdi", "mariorossi"]
+    assert invalidation_bus.stats().publish_errors == 1
@@ -0,0 +1,70 @@
+import pytest
+from src.services.throttle.implementations.token_bucket_throttle import (
+    TokenBucketLoginThrottle,
+)
+
+
+def _throttle(tmp_path, configuration: str) -> TokenBucketLoginThrottle:
+    config_file_path = tmp_path / "throttling.yaml"
+    config_file_path.write_text(configuration)
+    return TokenBucketLoginThrottle(config_file_path=str(config_file_path))
+
+
+def test_throttle_username_bucket(tmp_path):
+    login_throttle = _throttle(
+        tmp_path, "username:\n  capacity: 2\n  refill_seconds: 60\n"
+    )
+
+    assert login_throttle.check("user", "10.0.0.1") is None
+    assert login_throttle.check("user", "10.0.0.2") is None
+    retry_after = login_throttle.check("user", "10.0.0.3")
+    assert 0 < retry_after <= 60
+    # Other usernames are not affected.
+    assert login_throttle.check("admin", "10.0.0.1") is None
+
+    stats = login_throttle.stats()
+    assert stats.allowed == 3
+    assert stats.rejected_username == 1
+
+
+def test_throttle_ip_bucket(tmp_path):
+    login_throttle = _throttle(tmp_path, "ip:\n  capacity: 1\n  refill_seconds: 60\n")
+
+    assert login_throttle.check("user", "10.0.0.1") is None
+    assert login_throttle.check("admin", "10.0.0.1") is not None
+    assert login_throttle.check("admin", "10.0.0.2") is None
+    assert login_throttle.stats().rejected_ip == 1
+
+
+@pytest.mark.asyncio
+async def test_throttle_exponential_lockout(tmp_path):
+    login_throttle = _throttle(
+        tmp_path,
+        "username:\n  capacity: 100\nlockout:\n  threshold: 2\n  base_seconds: 10\n  max_seconds: 25\n",
+    )
+
+    await login_throttle.record_failure("user")
+    assert login_throttle.check("user", "10.0.0.1") is None
+
+    await login_throttle.record_failure("user")
+    assert 9 < login_throttle.check("user", "10.0.0.1") <= 10
+
+    await login_throttle.record_failure("user")
+    assert 19 < login_throttle.check("user", "10.0.0.1") <= 20
+
+    # Capped to max_seconds.
+    await login_throttle.record_failure("user")
+    assert 24 < login_throttle.check("user", "10.0.0.1") <= 25
+
+    await login_throttle.record_success("user", "10.0.0.1")
+    assert login_throttle.check("user", "10.0.0.1") is None
+    assert login_throttle.stats().lockouts == 3
+
+
+@pytest.mark.asyncio
+async def test_throttle_success_gives_attempt_back(tmp_path):
+    login_throttle = _throttle(tmp_path, "ip:\n  capacity: 1\n  refill_seconds: 60\n")
+
+    for _ in range(3):
+        assert login_throttle.check("user", "10.0.0.1") is None
+        await login_throttle.record_success("user", "10.0.0.1")
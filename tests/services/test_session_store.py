@@ -0,0 +1,46 @@
+from time import time
+
+import pytest
+from src.services.session.implementations.sharded_session_store import (
+    ShardedSessionStore,
+)
+
+CLAIMS = {"username": "mariorossi", "roles": ["user"], "is_refresh": False}
+
+
+@pytest.mark.asyncio
+async def test_session_store_create_and_get():
+    session_store = ShardedSessionStore()
+    token = await session_store.create(CLAIMS, int(time()) + 60)
+
+    assert len(token) == 43
+    assert await session_store.get(token) == CLAIMS
+    assert await session_store.get("unknown-token") is None
+
+    stats = session_store.stats()
+    assert stats.sessions == 1
+    assert stats.hits == 1
+    assert stats.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_session_store_delete_once():
+    session_store = ShardedSessionStore()
+    token = await session_store.create(CLAIMS, int(time()) + 60)
+
+    assert await session_store.delete(token)
+    assert not await session_store.delete(token)
+    assert await session_store.get(token) is None
+
+
+@pytest.mark.asyncio
+async def test_session_store_expiration():
+    session_store = ShardedSessionStore()
+    expired_token = await session_store.create(CLAIMS, int(time()) - 1)
+    await session_store.create(CLAIMS, int(time()) - 1)
+    await session_store.create(CLAIMS, int(time()) + 60)
+
+    assert await session_store.get(expired_token) is None
+    assert session_store.sweep() == 1
+    assert session_store.stats().sessions == 1
+    assert session_store.stats().expirations == 2
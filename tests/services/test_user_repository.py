@@ -0,0 +1,272 @@
+from datetime import datetime, timedelta
+from json import loads as json_loads
+
+import pytest
+from httpx import AsyncClient
+from src.core.exceptions import DuplicateUserError, LastAdminError, StaleRevisionError
+from src.helpers.container import CONTAINER
+from src.models.user import UserPartialDetails
+from src.services.repository.implementations.beanie_user_repository import (
+    BeanieUserRepository,
+)
+from src.services.repository.implementations.memory_user_repository import (
+    MemoryUserRepository,
+)
+from src.services.repository.interfaces.i_user_repository import IUserRepository
+from src.services.repository.models.user import UserRecord
+from tests import BASE_URL, build_db_client, fastapi_app
+
+
+def _user(username: str, roles=("user",), email: str = None) -> UserRecord:
+    now_date = datetime.utcnow()
+    return UserRecord(
+        email=email or f"{username}@email.com",
+        username=username,
+        password="hashed",
+        roles=list(roles),
+        creation=now_date,
+        last_update=now_date,
+    )
+
+
+@pytest.fixture
+def user_repository(monkeypatch) -> MemoryUserRepository:
+    # As if the api was started with USER_REPOSITORY=memory.
+    user_repository = MemoryUserRepository()
+    container_get = CONTAINER.get
+    monkeypatch.setattr(
+        CONTAINER,
+        "get",
+        lambda interface: (
+            user_repository
+            if interface is IUserRepository
+            else container_get(interface)
+        ),
+    )
+    return user_repository
+
+
+async def _single_admin_repository(backend: str) -> IUserRepository:
+    """Return a repository of the backend holding a single admin, named admin."""
+    if backend == "memory":
+        user_repository = MemoryUserRepository()
+        await user_repository.create(_user("admin", roles=["admin"]))
+        return user_repository
+
+    # The test db holds a single admin, named admin.
+    await build_db_client()
+    return BeanieUserRepository()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "beanie"])
+async def test_repository_delete_missing_user(backend):
+    user_repository = await _single_admin_repository(backend)
+
+    assert await user_repository.delete("missing") is None
+    assert await user_repository.count("admin") == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "beanie"])
+async def test_repository_delete_last_admin(backend):
+    user_repository = await _single_admin_repository(backend)
+
+    with pytest.raises(LastAdminError):
+        await user_repository.delete("admin")
+
+    await user_repository.create(_user("contract_admin", roles=["admin"]))
+    assert (await user_repository.delete("Contract_Admin")).username == "contract_admin"
+    with pytest.raises(LastAdminError):
+        await user_repository.delete("ADMIN")
+    assert await user_repository.count("admin") == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_uniqueness():
+    user_repository = MemoryUserRepository()
+    await user_repository.create(_user("mario"))
+
+    with pytest.raises(DuplicateUserError):
+        await user_repository.create(_user("mario", email="other@email.com"))
+    with pytest.raises(DuplicateUserError):
+        await user_repository.create(_user("luigi", email="mario@email.com"))
+
+    await user_repository.create(_user("luigi"))
+    with pytest.raises(DuplicateUserError):
+        await user_repository.update("luigi", "luigi@email.com", "mario", ["user"])
+    with pytest.raises(DuplicateUserError):
+        await user_repository.update("luigi", "mario@email.com", "luigi", ["user"])
+    assert await user_repository.count() == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_ignores_case():
+    user_repository = MemoryUserRepository()
+    await user_repository.create(_user("mario", email="Mario.Rossi@email.com"))
+
+    with pytest.raises(DuplicateUserError):
+        await user_repository.create(_user("MARIO", email="other@email.com"))
+    with pytest.raises(DuplicateUserError):
+        await user_repository.create(_user("luigi", email="mario.rossi@EMAIL.com"))
+
+    assert (await user_repository.get("Mario")).username == "mario"
+    assert await user_repository.token_versions(["MARIO"]) == {"mario": 0}
+    assert (await user_repository.delete("mArIo")).username == "mario"
+    assert await user_repository.get("mario") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_pages():
+    user_repository = MemoryUserRepository()
+    for username in ("d", "b", "e", "a", "c"):
+        await user_repository.create(_user(username))
+
+    page = await user_repository.list(UserPartialDetails, limit=2)
+    assert [user.username for user in page] == ["a", "b"]
+    page = await user_repository.list(UserPartialDetails, after="b", limit=2)
+    assert [user.username for user in page] == ["c", "d"]
+    page = await user_repository.list(UserPartialDetails, skip=1, limit=0)
+    assert [user.username for user in page] == ["b", "c", "d", "e"]
+
+    exported = user_repository.iterate(UserPartialDetails, after="a")
+    assert [user.username async for user in exported] == ["b", "c", "d", "e"]
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_pages_collation():
+    user_repository = MemoryUserRepository()
+    for username in ("ab", "a0", "a.b", "a_b", "a", "0a", ".a", "_a"):
+        await user_repository.create(_user(username))
+
+    # As the db collation, "_" and "." come before the digits and the letters.
+    page = await user_repository.list(UserPartialDetails)
+    assert [user.username for user in page] == [
+        "_a",
+        ".a",
+        "0a",
+        "a",
+        "a_b",
+        "a.b",
+        "a0",
+        "ab",
+    ]
+    page = await user_repository.list(UserPartialDetails, after="a_b", limit=2)
+    assert [user.username for user in page] == ["a.b", "a0"]
+
+    await user_repository.delete("a.b")
+    exported = user_repository.iterate(UserPartialDetails, after="a")
+    assert [user.username async for user in exported] == ["a_b", "a0", "ab"]
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_update():
+    user_repository = MemoryUserRepository()
+    await user_repository.create(_user("mario"))
+
+    with pytest.raises(StaleRevisionError):
+        await user_repository.update(
+            "mario", "mario@email.com", "mario", ["user"], revision=1
+        )
+
+    previous_user = await user_repository.update(
+        "mario", "mario@email.com", "super.mario", ["admin", "user"], revision=0
+    )
+    assert previous_user.username == "mario"
+    assert await user_repository.get("mario") is None
+
+    user = await user_repository.get("super.mario")
+    assert (user.revision, user.token_version) == (1, 1)
+    assert await user_repository.count("admin") == 1
+    assert await user_repository.token_versions(["super.mario", "mario"]) == {
+        "super.mario": 1
+    }
+    assert await user_repository.token_versions_changed_since(
+        datetime.utcnow() - timedelta(seconds=5)
+    ) == {"super.mario": 1}
+    assert await user_repository.update("mario", "a@email.com", "a", ["user"]) is None
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_last_admin():
+    user_repository = MemoryUserRepository()
+    await user_repository.create(_user("admin", roles=["admin"]))
+    await user_repository.create(_user("root", roles=["admin", "user"]))
+
+    assert (await user_repository.delete("root")).roles == ["admin", "user"]
+    with pytest.raises(LastAdminError):
+        await user_repository.delete("admin")
+    assert await user_repository.delete("root") is None
+    assert await user_repository.count("admin") == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_last_admin_role():
+    user_repository = MemoryUserRepository()
+    await user_repository.create(_user("admin", roles=["admin"]))
+    await user_repository.create(_user("root", roles=["admin", "user"]))
+
+    await user_repository.update("root", "root@email.com", "root", ["user"])
+    with pytest.raises(LastAdminError):
+        await user_repository.update("admin", "admin@email.com", "admin", ["user"])
+    await user_repository.update("admin", "admin@email.com", "super.admin", ["admin"])
+    assert await user_repository.count("admin") == 1
+
+
+@pytest.mark.asyncio
+async def test_api_without_db(user_repository):
+    # Only the in-memory repository is used, no database is needed.
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        response = await ac.post(
+            "/user/register",
+            json={
+                "username": "memory_user",
+                "email": "memory_user@email.com",
+                "password": "memory_user",
+            },
+        )
+        assert response.status_code == 201
+
+        response = await ac.post(
+            "/auth/login",
+            data={"username": "Memory_User", "password": "memory_user"},
+        )
+        assert response.status_code == 200
+        access_token = json_loads(response.content)["access_token"]
+
+        response = await ac.get(
+            "/user/all", headers={"Authorization": f"Bearer {access_token}"}
+        )
+    assert response.status_code == 200
+    assert [user["username"] for user in json_loads(response.content)] == [
+        "memory_user"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_failure_without_db(user_repository, monkeypatch):
+    async def iterate(*args, **kwargs):
+        yield UserPartialDetails.parse_obj(_user("first").dict())
+        raise ConnectionError("connection lost")
+
+    async with AsyncClient(app=fastapi_app, base_url=BASE_URL) as ac:
+        await ac.post(
+            "/user/register",
+            json={
+                "username": "memory_user",
+                "email": "memory_user@email.com",
+                "password": "memory_user",
+            },
+        )
+        response = await ac.post(
+            "/auth/login",
+            data={"username": "memory_user", "password": "memory_user"},
+        )
+        access_token = json_loads(response.content)["access_token"]
+
+        # The failure aborts the response, it is never a complete export.
+        monkeypatch.setattr(user_repository, "iterate", iterate)
+        with pytest.raises(ConnectionError):
+            await ac.get(
+                "/user/export", headers={"Authorization": f"Bearer {access_token}"}
+            )